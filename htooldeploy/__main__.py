@@ -1,21 +1,40 @@
 """Entry point for CLI"""
 import argparse
+import atexit
 import logging
 import os
 import time
 import sys
 
-from .htool import HTool
-from .template import template_wizard
+from . import logs
+from .analyze import StartupAnalyzer
+from .copier import BACKENDS
+from .gitsource import GitError, GitTree
+from .hotl import expand_tool
+from .htool import HOUDINI_SITE_DIRS, HTool
+from .inventory import Inventory
+from .profiling import Profiler
+from .prune import StaleVersions
+from .shadowing import ShadowIndex
+from .slots import SlotManager
+from .throttle import parse_rate
+from .template import template_from_spec, template_wizard
 
 LOG_LEVELS = [logging.ERROR, logging.WARNING, logging.INFO, logging.DEBUG]
 
 
-def log(verbosity):
+def log(verbosity, keep_days=logs.KEEP_DAYS):
     """Setup logger to console and file.
 
+    Records are written by a listener thread, see :mod:`~htooldeploy.logs`.
+    Log files older than ``keep_days`` are removed.
+
     :param verbosity: Verbosity level from arguments. Range 0 - 3
     :type verbosity: int
+    :param keep_days: Days to keep old log files for, defaults to 14
+    :type keep_days: float, optional
+    :return: Path to the log file
+    :rtype: str
     """
     logger = logging.getLogger("htooldeploy")
     logger.setLevel(logging.DEBUG)
@@ -23,16 +42,14 @@ def log(verbosity):
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(logging.Formatter("%(message)s"))
     console_handler.setLevel(LOG_LEVELS[verbosity])
-    logger.addHandler(console_handler)
 
-    log_dir = "/tmp/htooldeploy/"
+    log_dir = logs.LOG_DIR
     try:
         os.makedirs(log_dir)
     except OSError:
         pass
-    log_file = (
-        "/tmp/htooldeploy/htooldeploy_{0}.log"
-        .format(time.time().__trunc__())
+    log_file = os.path.join(
+        log_dir, "htooldeploy_{0}.log".format(time.time().__trunc__())
     )
     file_handler = logging.FileHandler(log_file)
     file_handler.setLevel(logging.DEBUG)
@@ -41,7 +58,11 @@ def log(verbosity):
             fmt="%(asctime)s: %(levelname)s: [%(name)s]: %(message)s"
         )
     )
-    logger.addHandler(file_handler)
+
+    pipeline = logs.LogPipeline(logger, [console_handler, file_handler])
+    pipeline.start()
+    atexit.register(pipeline.stop)
+    logs.prune(log_dir, keep_days=keep_days, keep=[log_file])
     return log_file
 
 
@@ -108,6 +129,282 @@ def build_argument_parser():
         action="store_true",
         help="Force creation of target site directories if they do not exist",
     )
+    parser.add_argument(
+        "--index-otls",
+        action="store_true",
+        help=(
+            "Write an OPlibraries index into deployed otls directories and "
+            "report their library counts. Once written, an index is kept up "
+            "to date by every later install and uninstall"
+        )
+    )
+    parser.add_argument(
+        "--compile",
+        dest="compile_python",
+        action="store_true",
+        help=(
+            "Byte-compile deployed python libraries with the matching "
+            "python interpreter"
+        )
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        metavar="N",
+        default=4,
+        help="Number of parallel workers for post-install stages"
+    )
+    parser.add_argument(
+        "--collapse-hdas",
+        action="store_true",
+        help="Install expanded Digital Assets as binary libraries"
+    )
+    parser.add_argument(
+        "--expand-hdas",
+        action="store_true",
+        help=(
+            "Expand the binary Digital Assets in the tool's source "
+            "directory instead of installing"
+        )
+    )
+    parser.add_argument(
+        "--hotl",
+        type=str,
+        action="store",
+        default="hotl",
+        metavar="PATH",
+        help="hotl executable used to expand and collapse Digital Assets"
+    )
+    parser.add_argument(
+        "--store",
+        type=str,
+        action="store",
+        metavar="DIR",
+        help=(
+            "Keep one copy of each unique file in this shared store and "
+            "install by linking to it. Installed files are read-only"
+        )
+    )
+    parser.add_argument(
+        "--slots",
+        action="store_true",
+        help=(
+            "Install into a versioned slot and activate it through a "
+            "Houdini Package"
+        )
+    )
+    parser.add_argument(
+        "--activate",
+        type=str,
+        action="store",
+        metavar="VERSION",
+        help=(
+            "Activate an installed slot of the tool named by tool_source "
+            "instead of installing"
+        )
+    )
+    parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help=(
+            "Re-activate the previous slot of the tool named by "
+            "tool_source instead of installing"
+        )
+    )
+    parser.add_argument(
+        "--remote",
+        type=str,
+        action="store",
+        metavar="COMMAND",
+        help=(
+            "Stream the tool, compressed, to this receiver command instead "
+            "of copying. e.g. \"ssh host python -m htooldeploy.receiver "
+            "/path/to/houdini18.0\". --force is passed on to the receiver"
+        )
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        choices=range(10),
+        metavar="LEVEL",
+        help="Compression level from 0-9 when streaming with --remote"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1024 * 1024,
+        metavar="BYTES",
+        help="Bytes to compress at a time when streaming with --remote"
+    )
+    parser.add_argument(
+        "--push",
+        type=str,
+        nargs="+",
+        metavar="HOST",
+        help=(
+            "Push the tool to these hosts at the same time, sending only "
+            "changed files"
+        )
+    )
+    parser.add_argument(
+        "--remote-shell",
+        type=str,
+        default="ssh",
+        metavar="COMMAND",
+        help="Remote shell used to reach --push hosts"
+    )
+    parser.add_argument(
+        "--remote-python",
+        type=str,
+        default="python",
+        metavar="PATH",
+        help="Python interpreter with htooldeploy on --push hosts"
+    )
+    parser.add_argument(
+        "--copy-backend",
+        type=str,
+        default="auto",
+        choices=BACKENDS,
+        help=(
+            "How files are copied. 'auto' uses zero-copy where available, "
+            "which needs Python 3, and falls back to chunked streaming"
+        )
+    )
+    parser.add_argument(
+        "--buffer-size",
+        type=int,
+        default=1024 * 1024,
+        metavar="BYTES",
+        help="Bytes to copy at a time"
+    )
+    parser.add_argument(
+        "--only",
+        type=str,
+        action="append",
+        choices=HOUDINI_SITE_DIRS,
+        metavar="SITE_DIR",
+        help=(
+            "Only install this site directory. Can be used more than once. "
+            "Not available with --develop"
+        )
+    )
+    parser.add_argument(
+        "--include",
+        type=str,
+        action="append",
+        metavar="GLOB",
+        help=(
+            "Only install paths matching this glob, relative to the tool's "
+            "source directory. '*' doesn't match '/', '**' matches any "
+            "number of directories. Can be used more than once"
+        )
+    )
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        action="append",
+        metavar="GLOB",
+        help=(
+            "Never install paths matching this glob. Can be used more than "
+            "once"
+        )
+    )
+    parser.add_argument(
+        "--use-gitignore",
+        action="store_true",
+        help=(
+            "Skip files ignored by the tool repo's .gitignore instead of its "
+            ".htoolignore"
+        )
+    )
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        metavar="SECONDS",
+        help=(
+            "Seconds to wait for another deploy of the same tool into the "
+            "same target, when deploying or with --gc or --uninstall. Waits "
+            "until it finishes by default"
+        )
+    )
+    parser.add_argument(
+        "--no-journal",
+        dest="journal",
+        action="store_false",
+        help="Don't record progress for resuming an interrupted install"
+    )
+    parser.add_argument(
+        "--no-preflight",
+        dest="preflight",
+        action="store_false",
+        help="Don't check for free space and write access before copying"
+    )
+    parser.add_argument(
+        "--no-hash-cache",
+        dest="hash_cache",
+        action="store_false",
+        help="Hash every file in full, instead of reusing cached hashes"
+    )
+    parser.add_argument(
+        "--hash-xattrs",
+        action="store_true",
+        help="Also keep file hashes in the files' extended attributes"
+    )
+    parser.add_argument(
+        "--max-rate",
+        type=parse_rate,
+        metavar="BYTES",
+        help=(
+            "Most bytes per second to read and write, such as 512K or 20M. "
+            "Unlimited by default"
+        )
+    )
+    parser.add_argument(
+        "--max-file-rate",
+        type=float,
+        metavar="FILES",
+        help="Most files per second to read and write. Unlimited by default"
+    )
+    parser.add_argument(
+        "--idle-io",
+        action="store_true",
+        help="Run with idle I/O priority, so other jobs take precedence"
+    )
+    parser.add_argument(
+        "--git-ref",
+        type=str,
+        metavar="REF",
+        help=(
+            "Install the tool as it is at this branch, tag or commit of its "
+            "git repo, without a checkout"
+        )
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        type=str,
+        metavar="DIR",
+        help=(
+            "Write metrics of the run for the Prometheus textfile collector "
+            "reading DIR"
+        )
+    )
+    parser.add_argument(
+        "--metrics-log",
+        type=str,
+        metavar="PATH",
+        help="Append metrics of the run to a JSON lines file"
+    )
+    parser.add_argument(
+        "--inventory",
+        type=str,
+        metavar="PATH",
+        help=(
+            "Inventory database of installed tools. Defaults to "
+            "$HTOOLDEPLOY_INVENTORY or ~/.htooldeploy/inventory.db"
+        )
+    )
     parser.add_argument(
         "-v",
         "--verbosity",
@@ -120,6 +417,27 @@ def build_argument_parser():
         default=2,
         choices=range(4)
     )
+    parser.add_argument(
+        "--keep-logs",
+        type=float,
+        default=logs.KEEP_DAYS,
+        metavar="DAYS",
+        help="Remove log files older than this many days"
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        metavar="PATH",
+        help=(
+            "Profile the run with cProfile and write the stats to PATH. "
+            "Only the main thread is profiled"
+        )
+    )
+    parser.add_argument(
+        "--trace-io",
+        action="store_true",
+        help="Count and time file system calls, and log a summary"
+    )
     parser.add_argument(
         "--hou-version",
         type=str,
@@ -138,6 +456,72 @@ def build_argument_parser():
         action="store_true",
         help="Run the Template Tool wizard at the given path",
     )
+    parser.add_argument(
+        "--spec",
+        type=str,
+        metavar="PATH",
+        help=(
+            "With --template, create every tool in a JSON or YAML spec "
+            "without prompting"
+        )
+    )
+    parser.add_argument(
+        "--analyze",
+        action="store_true",
+        help=(
+            "Estimate the Houdini startup scan cost of the given User "
+            "Preferences or packages directory"
+        )
+    )
+    parser.add_argument(
+        "--shadowed",
+        action="store_true",
+        help=(
+            "Report files on HOUDINI_PATH that shadow each other, for the "
+            "given User Preferences or packages directory"
+        )
+    )
+    parser.add_argument(
+        "--git-diff",
+        type=str,
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help=(
+            "List the files in source/ that changed between two refs of the "
+            "git repo at tool_source"
+        )
+    )
+    parser.add_argument(
+        "--gc",
+        action="store_true",
+        help=(
+            "Remove old versioned packages and slots of the tools matching "
+            "the glob given as tool_source, instead of installing"
+        )
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Newest versions of each tool to keep with --gc"
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help=(
+            "List recorded installs of tools matching the glob given as "
+            "tool_source, optionally only in destination_path"
+        )
+    )
+    parser.add_argument(
+        "--uninstall",
+        action="store_true",
+        help=(
+            "Remove everything installed by the tool named by tool_source "
+            "instead of installing"
+        )
+    )
 
     return parser
 
@@ -147,20 +531,102 @@ def main():
     parser = build_argument_parser()
     args = parser.parse_args()
 
-    log_file = log(args.verbosity)
+    log_file = log(args.verbosity, keep_days=args.keep_logs)
     logger = logging.getLogger("htooldeploy")
     logger.info("Starting htooldeploy")
 
     logger.debug("Arguments are {0}".format(vars(args)))
-    if args.template:
-        template_wizard(args.source_tool_repo)
-    else:
-        del args.template
-        tool = HTool(**vars(args))
-        if tool.install():
-            logger.info("Installation complete")
+    with Profiler(args.profile, trace_io=args.trace_io):
+        if args.template and args.spec:
+            template_from_spec(args.spec, args.source_tool_repo)
+        elif args.template:
+            template_wizard(args.source_tool_repo)
+        elif args.analyze:
+            StartupAnalyzer(args.source_tool_repo).report()
+        elif args.shadowed:
+            ShadowIndex(args.source_tool_repo, jobs=args.jobs).report()
+        elif args.expand_hdas:
+            expand_tool(
+                args.source_tool_repo,
+                hotl=args.hotl,
+                jobs=args.jobs,
+                dry_run=args.dry_run
+            )
+        elif args.git_diff:
+            try:
+                changes = GitTree(
+                    args.source_tool_repo, args.git_diff[1]
+                ).diff(args.git_diff[0])
+            except GitError as error:
+                logger.error(error)
+                changes = list()
+            for status, relpath in changes:
+                logger.info("{0}\t{1}".format(status, relpath))
+        elif args.gc:
+            # pylint: disable=protected-access
+            StaleVersions(
+                args.install_destination
+                or HTool._find_user_prefs_dir(version=args.hou_version),
+                tool=args.source_tool_repo,
+                keep=args.keep,
+                jobs=args.jobs,
+                dry_run=args.dry_run,
+                lock_timeout=args.lock_timeout
+            ).prune()
+        elif args.list:
+            Inventory(args.inventory).report(
+                args.source_tool_repo, target=args.install_destination
+            )
+        elif args.uninstall:
+            # pylint: disable=protected-access
+            target = (
+                args.install_destination
+                or HTool._find_user_prefs_dir(version=args.hou_version)
+            )
+            Inventory(args.inventory).uninstall(
+                os.path.basename(HTool._strip_trailing_slash(
+                    args.source_tool_repo)),
+                target,
+                dry_run=args.dry_run,
+                lock_timeout=args.lock_timeout
+            )
+        elif args.activate or args.rollback:
+            # pylint: disable=protected-access
+            target = (
+                args.install_destination
+                or HTool._find_user_prefs_dir(version=args.hou_version)
+            )
+            manager = SlotManager(
+                target,
+                os.path.basename(HTool._strip_trailing_slash(
+                    args.source_tool_repo)),
+                dry_run=args.dry_run
+            )
+            if args.rollback:
+                manager.rollback()
+            else:
+                manager.activate(args.activate)
         else:
-            logger.warning("Installation failed")
+            del args.template
+            del args.spec
+            del args.analyze
+            del args.shadowed
+            del args.expand_hdas
+            del args.activate
+            del args.rollback
+            del args.list
+            del args.uninstall
+            del args.git_diff
+            del args.gc
+            del args.keep
+            del args.keep_logs
+            del args.profile
+            del args.trace_io
+            tool = HTool(**vars(args))
+            if tool.install():
+                logger.info("Installation complete")
+            else:
+                logger.warning("Installation failed")
 
     logger.log(100, "See log at {0} for detailed output".format(log_file))
     logger.info("Exiting")
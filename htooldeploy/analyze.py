@@ -0,0 +1,350 @@
+"""Startup Cost Analyzer
+
+Every directory Houdini finds on its search paths gets scanned when it
+launches. The more ``otls`` directories, package files and large python
+libraries there are, the longer artists wait for Houdini to open. The
+:class:`StartupAnalyzer` estimates this cost by inspecting a User
+Preferences directory (or a ``packages/`` directory) on disk.
+::
+    htooldeploy --analyze ~/houdini18.0
+
+No Houdini license is needed, only the filesystem is inspected.
+"""
+import json
+import logging
+import os
+
+logger = logging.getLogger("htooldeploy")
+
+SCAN_VARIABLES = {
+    "HOUDINI_OTLSCAN_PATH": ["otls"],
+    "HOUDINI_TOOLBAR_PATH": ["toolbar"],
+    "HOUDINI_SCRIPT_PATH": ["scripts"],
+    "HOUDINI_PYTHONPATH": ["python2.7libs", "python3.7libs"],
+    "HOUDINI_VEX_PATH": ["vex"],
+}
+STRING_TYPES = (str, type(u""))
+
+
+class ScanEntry(object):
+    """A single directory Houdini will scan for a given path variable"""
+
+    def __init__(self, variable, path, origin, implicit=True):
+        """Constructor for ScanEntry.
+
+        :param variable: Path variable the directory belongs to
+        :type variable: str
+        :param path: Directory on disk
+        :type path: str
+        :param origin: Where the entry came from. Either the prefs
+            directory or a package file
+        :type origin: str
+        :param implicit: Entry is derived from ``HOUDINI_PATH`` rather
+            than set explicitly, defaults to True
+        :type implicit: bool, optional
+        """
+        super(ScanEntry, self).__init__()
+        self.variable = variable
+        self.path = path
+        self.origin = origin
+        self.implicit = implicit
+        self.dirs = 0
+        self.files = 0
+        self.exists = os.path.isdir(path)
+        if self.exists:
+            self._count()
+
+    def __repr__(self):
+        return "{0}: {1} ({2} dirs, {3} files)".format(
+            self.variable, self.path, self.dirs, self.files
+        )
+
+    @property
+    def cost(self):
+        """Rough scan cost of the entry.
+
+        :return: Number of directories and files Houdini has to visit
+        :rtype: int
+        """
+        return self.dirs + self.files
+
+    def _count(self):
+        """Count the directories and files beneath the entry"""
+        for _, dirs, files in os.walk(self.path):
+            self.dirs += 1
+            self.files += len(files)
+            dirs[:] = [x for x in dirs if not x.startswith(".")]
+
+
+class StartupAnalyzer(object):
+    """Estimate the Houdini startup scan cost of a prefs directory"""
+
+    def __init__(self, path, hotspots=10):
+        """Constructor for StartupAnalyzer.
+
+        :param path: User Preferences directory, or a ``packages/``
+            directory within one
+        :type path: str
+        :param hotspots: Number of costliest entries to report,
+            defaults to 10
+        :type hotspots: int, optional
+        """
+        super(StartupAnalyzer, self).__init__()
+        path = os.path.abspath(path)
+        if os.path.basename(path) == "packages":
+            self.packages_dir = path
+            self.prefs_dir = os.path.dirname(path)
+        else:
+            self.prefs_dir = path
+            self.packages_dir = os.path.join(path, "packages")
+        self.hotspots = hotspots
+        self.packages = list()
+        self.invalid = list()
+        self.entries = list()
+
+    def analyze(self):
+        """Collect every scan entry for the prefs directory.
+
+        :return: All scan entries, in search path order
+        :rtype: list
+        """
+        houdini_path, explicit = self.search_path()
+        self.entries = list()
+        for root, origin in houdini_path[1:]:
+            if not os.path.isdir(root):
+                self.entries.append(
+                    ScanEntry("HOUDINI_PATH", root, origin, implicit=False)
+                )
+        for variable, subdirs in sorted(SCAN_VARIABLES.items()):
+            for root, origin in houdini_path:
+                for subdir in subdirs:
+                    path = os.path.join(root, subdir)
+                    if os.path.isdir(path):
+                        self.entries.append(ScanEntry(variable, path, origin))
+        for variable, path, origin in explicit:
+            self.entries.append(
+                ScanEntry(variable, path, origin, implicit=False)
+            )
+        return self.entries
+
+    def search_path(self):
+        """Read the packages and collect the directories they add.
+
+        :return: ``HOUDINI_PATH`` as a list of ``(path, origin)`` tuples,
+            starting with the prefs directory, and the explicitly set scan
+            directories as a list of ``(variable, path, origin)`` tuples
+        :rtype: tuple
+        """
+        self.packages = self._read_packages()
+        houdini_path = [(self.prefs_dir, self.prefs_dir)]
+        explicit = list()
+        for package_file, package in self.packages:
+            for path in self._package_paths(package):
+                houdini_path.append((path, package_file))
+            for variable, values in self._package_env(package):
+                if variable == "HOUDINI_PATH":
+                    houdini_path.extend([(x, package_file) for x in values])
+                elif variable in SCAN_VARIABLES:
+                    explicit.extend(
+                        [(variable, x, package_file) for x in values]
+                    )
+        return houdini_path, explicit
+
+    def duplicates(self):
+        """Find directories that appear more than once for a variable.
+
+        :return: Mapping of ``(variable, path)`` to duplicate entries
+        :rtype: dict
+        """
+        seen = dict()
+        for entry in self.entries:
+            key = (entry.variable, os.path.realpath(entry.path))
+            seen.setdefault(key, list()).append(entry)
+        return dict((k, v) for k, v in seen.items() if len(v) > 1)
+
+    def redundant_otlscan(self):
+        """Find explicitly appended ``otls`` directories.
+
+        Houdini already scans ``otls/`` in every ``HOUDINI_PATH`` entry,
+        so appending it to ``HOUDINI_OTLSCAN_PATH`` (see
+        ``--append-otlscan``) scans the same directory twice.
+
+        :return: Explicit entries that are already scanned implicitly
+        :rtype: list
+        """
+        implicit = set(
+            os.path.realpath(x.path) for x in self.entries
+            if x.variable == "HOUDINI_OTLSCAN_PATH" and x.implicit
+        )
+        return [
+            x for x in self.entries
+            if x.variable == "HOUDINI_OTLSCAN_PATH" and not x.implicit
+            and os.path.realpath(x.path) in implicit
+        ]
+
+    def missing(self):
+        """Explicit entries and package paths that do not exist on disk.
+
+        :return: Missing scan entries
+        :rtype: list
+        """
+        return [x for x in self.entries if not x.exists]
+
+    def totals(self):
+        """Sum the scan cost per path variable.
+
+        :return: Mapping of variable to ``(entries, dirs, files)``
+        :rtype: dict
+        """
+        totals = dict()
+        for entry in self.entries:
+            count, dirs, files = totals.get(entry.variable, (0, 0, 0))
+            totals[entry.variable] = (
+                count + 1, dirs + entry.dirs, files + entry.files
+            )
+        return totals
+
+    def report(self):
+        """Analyze and log a summary of the scan cost.
+
+        :return: Whether any problems were found
+        :rtype: bool
+        """
+        self.analyze()
+        logger.info("Startup scan cost for {0}".format(self.prefs_dir))
+        logger.info("Package files: {0}".format(len(self.packages)))
+        for variable, totals in sorted(self.totals().items()):
+            logger.info(
+                "{0}: {1} entries, {2} dirs, {3} files".format(
+                    variable, *totals)
+            )
+
+        logger.info("Hotspots:")
+        ranked = sorted(self.entries, key=lambda x: x.cost, reverse=True)
+        for entry in ranked[:self.hotspots]:
+            logger.info("\t{0} ({1})".format(entry, entry.origin))
+
+        problems = False
+        for package_file, error in self.invalid:
+            problems = True
+            logger.warning("{0} is not a valid Houdini Package: {1}".format(
+                package_file, error))
+        for (variable, path), entries in sorted(self.duplicates().items()):
+            problems = True
+            logger.warning(
+                "{0} scans {1} {2} times".format(variable, path, len(entries))
+            )
+        for entry in self.redundant_otlscan():
+            problems = True
+            logger.warning(
+                "{0} explicitly appends {1}, which is already scanned "
+                "through HOUDINI_PATH".format(entry.origin, entry.path)
+            )
+        for entry in self.missing():
+            problems = True
+            logger.warning(
+                "{0} points {1} to missing directory {2}".format(
+                    entry.origin, entry.variable, entry.path)
+            )
+        return problems
+
+    def _read_packages(self):
+        """Read all Houdini Package files in the packages directory.
+
+        Files that can't be read, or don't hold a JSON object, are left
+        out and recorded in :attr:`invalid`.
+
+        :return: List of ``(package_file, contents)`` tuples
+        :rtype: list
+        """
+        packages = list()
+        self.invalid = list()
+        if not os.path.isdir(self.packages_dir):
+            return packages
+        for item in sorted(os.listdir(self.packages_dir)):
+            package_file = os.path.join(self.packages_dir, item)
+            if not item.endswith(".json") or not os.path.isfile(package_file):
+                continue
+            try:
+                with open(package_file, "r") as file_:
+                    package = json.load(file_)
+            except (IOError, OSError, ValueError) as error:
+                self.invalid.append((package_file, error))
+                continue
+            if not isinstance(package, dict):
+                self.invalid.append(
+                    (package_file, "not a JSON object")
+                )
+                continue
+            packages.append((package_file, package))
+        return packages
+
+    @staticmethod
+    def _as_list(value):
+        """Normalize a package value to a list of expanded paths.
+
+        :param value: Package value. A string, list of strings or a
+            ``{"value": ..., "method": ...}`` mapping. Values that aren't
+            strings, such as numbers, are skipped
+        :type value: str, list, dict
+        :return: Expanded paths
+        :rtype: list
+        """
+        if isinstance(value, dict):
+            value = value.get("value", list())
+        if not isinstance(value, list):
+            value = [value]
+        paths = list()
+        for item in value:
+            if isinstance(item, dict):
+                paths.extend(StartupAnalyzer._as_list(item))
+                continue
+            if not isinstance(item, STRING_TYPES):
+                continue
+            for path in item.split(os.pathsep):
+                path = os.path.expanduser(os.path.expandvars(path))
+                if path and path != "&":
+                    paths.append(path)
+        return paths
+
+    @staticmethod
+    def _package_paths(package):
+        """``HOUDINI_PATH`` entries added by a package.
+
+        :param package: Package contents
+        :type package: dict
+        :return: Paths
+        :rtype: list
+        """
+        paths = list()
+        for key in ["path", "hpath"]:
+            if key in package:
+                paths.extend(StartupAnalyzer._as_list(package[key]))
+        return paths
+
+    @staticmethod
+    def _package_env(package):
+        """Search path variables modified by a package.
+
+        Only ``HOUDINI_PATH`` and :data:`SCAN_VARIABLES` are returned.
+        Other variables don't hold search paths.
+
+        :param package: Package contents
+        :type package: dict
+        :return: List of ``(variable, paths)`` tuples
+        :rtype: list
+        """
+        env = list()
+        items = package.get("env", list())
+        if not isinstance(items, list):
+            return env
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            for variable, value in item.items():
+                if variable != "HOUDINI_PATH" \
+                        and variable not in SCAN_VARIABLES:
+                    continue
+                env.append((variable, StartupAnalyzer._as_list(value)))
+        return env
+
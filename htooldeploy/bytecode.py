@@ -0,0 +1,202 @@
+"""Python Bytecode Precompilation
+
+Houdini compiles a tool's python libraries the first time they are
+imported. On a render farm every node does this at once, often racing
+to write the same ``.pyc`` files onto shared storage. Compiling the
+files a deploy writes into ``python*libs`` directories once at install
+time avoids this.
+
+Each library is compiled by the interpreter matching its directory name
+(``python2.7libs`` with ``python2.7``, etc.). Compilation is handed to
+:mod:`compileall`, which skips files whose bytecode is already up to
+date, so only changed sources are recompiled on later deploys.
+"""
+import logging
+import os
+import re
+import subprocess
+import sys
+
+from distutils.spawn import find_executable
+from multiprocessing.pool import ThreadPool
+
+logger = logging.getLogger("htooldeploy")
+
+PYTHON_LIBS_PATTERN = r"^python(\d+\.\d+)libs$"
+BYTECODE_MANIFEST = ".htooldeploy_bytecode"
+
+
+def lib_version(lib_dir):
+    """Python version a library directory is meant for.
+
+    :param lib_dir: Path to a ``python*libs`` directory
+    :type lib_dir: str
+    :return: ``MAJOR.MINOR`` version, None if not a python library
+    :rtype: str, None
+    """
+    match = re.match(PYTHON_LIBS_PATTERN, os.path.basename(lib_dir))
+    return match.groups()[0] if match else None
+
+
+def find_interpreter(version):
+    """Find a python interpreter for the given version.
+
+    :param version: ``MAJOR.MINOR`` version
+    :type version: str
+    :return: Path to the interpreter, None if it can't be found
+    :rtype: str, None
+    """
+    if "{0}.{1}".format(*sys.version_info[:2]) == version:
+        return sys.executable
+    return find_executable("python{0}".format(version))
+
+
+def compile_lib(lib_dir, paths=None, jobs=4, dry_run=False):
+    """Byte-compile a python library directory.
+
+    The files to compile, or the top level of the library, are split
+    into ``jobs`` batches which are compiled by separate interpreter
+    processes. Libraries without a matching interpreter are skipped
+    with a warning.
+
+    :param lib_dir: Path to a ``python*libs`` directory
+    :type lib_dir: str
+    :param paths: Only compile these files, such as the files a deploy
+        just installed, defaults to the whole library. Files outside the
+        library, or that aren't python sources, are ignored. Orphaned
+        bytecode is then only looked for in the top level packages and
+        modules these files belong to
+    :type paths: list, optional
+    :param jobs: Number of interpreters to run at once, defaults to 4
+    :type jobs: int, optional
+    :param dry_run: Don't compile anything, defaults to False
+    :type dry_run: bool, optional
+    :return: Success
+    :rtype: bool
+    """
+    version = lib_version(lib_dir)
+    interpreter = find_interpreter(version) if version else None
+    if not interpreter:
+        logger.warning(
+            "No python{0} interpreter found. Skipping {1}".format(
+                version, lib_dir)
+        )
+        return True
+
+    roots = None
+    if paths is None:
+        items = [
+            os.path.join(lib_dir, x) for x in sorted(os.listdir(lib_dir))
+            if not x.startswith(".")
+        ]
+    else:
+        prefix = os.path.join(os.path.abspath(lib_dir), "")
+        inside = [
+            x for x in (os.path.abspath(y) for y in paths)
+            if x.startswith(prefix)
+        ]
+        items = sorted(x for x in inside if x.endswith(".py"))
+        roots = set(x[len(prefix):].split(os.sep)[0] for x in inside)
+    if not items:
+        return True
+    jobs = max(1, min(jobs, len(items)))
+    batches = [items[i::jobs] for i in range(jobs)]
+    logger.info(
+        "Compiling {0} with {1} ({2} jobs)".format(lib_dir, interpreter, jobs)
+    )
+    if dry_run:
+        return True
+
+    def _compile(batch):
+        # Pass the batch on stdin, it may be too long for a command line
+        command = [interpreter, "-m", "compileall", "-q", "-i", "-"]
+        logger.debug("Running {0} on {1} paths".format(
+            " ".join(command), len(batch)))
+        process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, universal_newlines=True
+        )
+        process.communicate("\n".join(batch) + "\n")
+        return process.returncode == 0
+
+    pool = ThreadPool(jobs)
+    try:
+        results = pool.map(_compile, batches)
+    finally:
+        pool.close()
+        pool.join()
+    remove_orphans(lib_dir, roots=roots)
+    return all(results)
+
+
+def bytecode_source(path):
+    """Find the source file a bytecode file was compiled from.
+
+    :param path: Path to a ``.pyc`` or ``.pyo`` file
+    :type path: str
+    :return: Path to the source file
+    :rtype: str
+    """
+    parent, name = os.path.split(path)
+    if os.path.basename(parent) == "__pycache__":
+        return os.path.join(
+            os.path.dirname(parent), "{0}.py".format(name.split(".")[0])
+        )
+    return path[:-1]
+
+
+def remove_orphans(lib_dir, roots=None):
+    """Track compiled files and remove those whose source is gone.
+
+    Bytecode written by a previous deploy is listed in a hidden
+    manifest inside the library. Entries whose source file no longer
+    exists are removed, so a deleted module can't still be imported.
+    Bytecode shipped without sources is never touched.
+
+    A library is often shared by many tools, so ``roots`` limits the
+    check to the top level packages and modules of one tool. Manifest
+    entries of other tools are kept as they are.
+
+    :param lib_dir: Path to a ``python*libs`` directory
+    :type lib_dir: str
+    :param roots: Top level names in the library to check, defaults to
+        the whole library
+    :type roots: set, optional
+    :return: Removed files
+    :rtype: list
+    """
+    manifest = os.path.join(lib_dir, BYTECODE_MANIFEST)
+    previous = list()
+    if os.path.isfile(manifest):
+        with open(manifest, "r") as file_:
+            previous = file_.read().splitlines()
+
+    def _checked(path):
+        if roots is None:
+            return True
+        source = os.path.relpath(bytecode_source(path), lib_dir)
+        return source.split(os.sep)[0] in roots
+
+    removed = list()
+    compiled = list()
+    for relpath in previous:
+        path = os.path.join(lib_dir, relpath)
+        if not _checked(path):
+            compiled.append(relpath)
+        elif os.path.isfile(path) and not os.path.isfile(
+                bytecode_source(path)):
+            logger.debug("Removing orphaned {0}".format(path))
+            os.remove(path)
+            removed.append(path)
+
+    for root, dirs, files in os.walk(lib_dir):
+        dirs[:] = [x for x in dirs if not x.startswith(".")]
+        if roots is not None and root == lib_dir:
+            dirs[:] = [x for x in dirs if x in roots or x == "__pycache__"]
+        for file_ in files:
+            path = os.path.join(root, file_)
+            if (file_.endswith((".pyc", ".pyo")) and _checked(path)
+                    and os.path.isfile(bytecode_source(path))):
+                compiled.append(os.path.relpath(path, lib_dir))
+    with open(manifest, "w") as file_:
+        file_.write("\n".join(sorted(compiled)))
+    return removed
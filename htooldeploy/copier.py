@@ -0,0 +1,151 @@
+"""File Copy Backends
+
+The copy path can use one of several backends:
+
+``sendfile``
+    Zero-copy in the kernel with :func:`os.copy_file_range` or
+    :func:`os.sendfile`, where the platform supports them. Both need
+    Python 3, :func:`os.sendfile` 3.3 and :func:`os.copy_file_range`
+    3.8, so on Python 2.7 this warns and streams instead.
+``stream``
+    Chunked copy through a single reusable buffer.
+``distutils``
+    :func:`distutils.file_util.copy_file`, the original behaviour.
+``auto``
+    ``sendfile`` where available, otherwise ``stream``, which is always
+    the case on Python 2.7.
+
+The ``sendfile`` and ``stream`` backends never hold more than one
+buffer's worth of a file in memory, no matter how large the file is.
+::
+    htooldeploy --copy-backend stream --buffer-size 4194304 ~/dev/test_tool
+"""
+import errno
+import logging
+import os
+import shutil
+
+from distutils.file_util import copy_file as distutils_copy_file
+
+from . import throttle
+
+logger = logging.getLogger("htooldeploy")
+
+BACKENDS = ["auto", "sendfile", "stream", "distutils"]
+BUFFER_SIZE = 1024 * 1024
+
+_warned = False
+
+
+def zero_copy_available():
+    """Whether this platform supports a zero-copy backend.
+
+    Only Python 3 has the functions needed, so this is always False on
+    Python 2.7.
+
+    :return: Zero-copy is available
+    :rtype: bool
+    """
+    return hasattr(os, "copy_file_range") or hasattr(os, "sendfile")
+
+
+def copy_file(source, target, backend="auto", buffer_size=BUFFER_SIZE):
+    """Copy a file, preserving its mode and times.
+
+    :param source: File to copy
+    :type source: str
+    :param target: Path to copy to
+    :type target: str
+    :param backend: One of :data:`BACKENDS`, defaults to "auto"
+    :type backend: str, optional
+    :param buffer_size: Bytes to copy at a time, defaults to 1MB
+    :type buffer_size: int, optional
+    :return: Number of bytes copied
+    :rtype: int
+    """
+    global _warned  # pylint: disable=global-statement
+    if backend == "distutils":
+        throttle.consume(os.path.getsize(source))
+        distutils_copy_file(source, target)
+        return os.path.getsize(source)
+    if backend == "auto":
+        backend = "sendfile" if zero_copy_available() else "stream"
+    elif backend == "sendfile" and not zero_copy_available():
+        if not _warned:
+            _warned = True
+            logger.warning(
+                "Zero-copy needs Python 3.3 or newer, streaming instead"
+            )
+        backend = "stream"
+
+    with open(source, "rb") as source_file, open(target, "wb") as target_file:
+        copied = None
+        if backend == "sendfile":
+            copied = _copy_zero(source_file, target_file, buffer_size)
+        if copied is None:
+            copied = _copy_stream(source_file, target_file, buffer_size)
+    shutil.copystat(source, target)
+    return copied
+
+
+def _copy_zero(source_file, target_file, buffer_size):
+    """Copy between open files in the kernel.
+
+    :param source_file: File to read from
+    :type source_file: file
+    :param target_file: File to write to
+    :type target_file: file
+    :param buffer_size: Bytes to copy per call
+    :type buffer_size: int
+    :return: Number of bytes copied, None if the files don't support
+        zero-copy and nothing was copied
+    :rtype: int, None
+    """
+    source_fd = source_file.fileno()
+    target_fd = target_file.fileno()
+    for name in ["copy_file_range", "sendfile"]:
+        function = getattr(os, name, None)
+        if function is None:
+            continue
+        copied = 0
+        try:
+            while True:
+                if name == "sendfile":
+                    sent = function(target_fd, source_fd, copied, buffer_size)
+                else:
+                    sent = function(source_fd, target_fd, buffer_size)
+                if not sent:
+                    return copied
+                copied += sent
+                throttle.consume(sent)
+        except OSError as error:
+            if copied or error.errno not in (
+                    errno.EINVAL, errno.ENOSYS, errno.EXDEV,
+                    errno.EOPNOTSUPP, errno.ENOTSOCK):
+                raise
+            logger.debug("{0} not supported: {1}".format(name, error))
+    return None
+
+
+def _copy_stream(source_file, target_file, buffer_size):
+    """Copy between open files through a single reusable buffer.
+
+    :param source_file: File to read from
+    :type source_file: file
+    :param target_file: File to write to
+    :type target_file: file
+    :param buffer_size: Size of the buffer
+    :type buffer_size: int
+    :return: Number of bytes copied
+    :rtype: int
+    """
+    buffer_ = bytearray(buffer_size)
+    view = memoryview(buffer_)
+    copied = 0
+    while True:
+        read = source_file.readinto(buffer_)
+        if not read:
+            return copied
+        target_file.write(view[:read])
+        copied += read
+        throttle.consume(read)
@@ -0,0 +1,85 @@
+"""SQLite Databases
+
+The inventory and the hash cache are SQLite databases shared by every
+deploy on a host, so several deploys can open one for the first time at
+once. Creating the schema from all of them at the same time races, and
+SQLite reports ``database schema has changed`` or ``database is
+locked``.
+
+:func:`connect` creates the schema in a write transaction, so only one
+connection creates it, and records it in ``PRAGMA user_version``, so
+later connections don't touch the schema at all.
+"""
+import errno
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger("htooldeploy")
+
+SCHEMA_RETRIES = 5
+RETRY_INTERVAL = 0.1
+
+
+def connect(path, schema, version=1, timeout=30, **kwargs):
+    """Open a database, creating its schema if needed.
+
+    :param path: Database file
+    :type path: str
+    :param schema: SQL script creating the tables and indexes
+    :type schema: str
+    :param version: Version of the schema, stored as the database's
+        ``user_version``, defaults to 1
+    :type version: int, optional
+    :param timeout: Seconds to wait for another connection's lock,
+        defaults to 30
+    :type timeout: float, optional
+    :param kwargs: Passed on to :func:`sqlite3.connect`
+    :raises sqlite3.Error: The database can't be opened or created
+    :return: Database connection
+    :rtype: :class:`sqlite3.Connection`
+    """
+    parent = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(parent):
+        try:
+            os.makedirs(parent)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+    connection = sqlite3.connect(path, timeout=timeout, **kwargs)
+    try:
+        _create_schema(connection, schema, version)
+    except sqlite3.Error:
+        connection.close()
+        raise
+    return connection
+
+
+def _create_schema(connection, schema, version):
+    """Create the schema, unless it is already at this version.
+
+    :param connection: Database connection
+    :type connection: :class:`sqlite3.Connection`
+    :param schema: SQL script creating the tables and indexes
+    :type schema: str
+    :param version: Version of the schema
+    :type version: int
+    """
+    script = "BEGIN IMMEDIATE;\n{0}\nPRAGMA user_version = {1};\nCOMMIT;"
+    for attempt in range(SCHEMA_RETRIES):
+        try:
+            current = connection.execute("PRAGMA user_version").fetchall()
+            if current[0][0] >= version:
+                return
+            connection.executescript(script.format(schema, int(version)))
+            return
+        except sqlite3.OperationalError as error:
+            try:
+                connection.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            if attempt + 1 == SCHEMA_RETRIES:
+                raise
+            logger.debug("Retrying database schema: {0}".format(error))
+            time.sleep(RETRY_INTERVAL * (attempt + 1))
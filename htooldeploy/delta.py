@@ -0,0 +1,246 @@
+"""Delta Transfer
+
+The building blocks of an ``rsync`` style delta. A target file is split
+into blocks, and each block is fingerprinted with a weak rolling
+checksum and a strong hash. The source is then scanned for those blocks
+at every byte offset, giving the ranges of the source that changed.
+
+Deploys don't use a delta. Both files are read in full and the scan
+runs in pure Python, so against a local or mounted target it is far
+slower than a plain copy, and the file is still rewritten whole. A
+delta only pays off where :func:`signature` runs on the far side of a
+slow link, so that just the signature and the changed bytes cross it.
+
+:func:`sync_file` builds the new file beside the target and renames it
+over it, so the target is never seen half written. Scanning gives up
+once the changed bytes pass :data:`MAX_LITERAL_BYTES` or
+:data:`MAX_LITERAL_RATIO` of the file.
+
+Memory use is bounded by the block size, not by the size of the file.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import zlib
+
+from . import throttle
+
+logger = logging.getLogger("htooldeploy")
+
+BLOCK_SIZE = 64 * 1024
+READ_SIZE = 1024 * 1024
+MOD_ADLER = 65521
+MAX_LITERAL_BYTES = 64 * 1024 * 1024
+MAX_LITERAL_RATIO = 0.5
+
+
+def signature(path, block_size=BLOCK_SIZE):
+    """Fingerprint every block of a file.
+
+    :param path: File to fingerprint, typically the existing target
+    :type path: str
+    :param block_size: Size of each block in bytes, defaults to 64KB
+    :type block_size: int, optional
+    :return: Mapping of ``(weak, length)`` to a mapping of strong hash
+        to block index
+    :rtype: dict
+    """
+    blocks = dict()
+    with open(path, "rb") as file_:
+        index = 0
+        block = file_.read(block_size)
+        while block:
+            throttle.consume(len(block))
+            weak = zlib.adler32(block) & 0xffffffff
+            strong = hashlib.md5(block).digest()
+            blocks.setdefault((weak, len(block)), dict())
+            blocks[(weak, len(block))].setdefault(strong, index)
+            index += 1
+            block = file_.read(block_size)
+    return blocks
+
+
+def delta(path, blocks, block_size=BLOCK_SIZE, max_literal=None):
+    """Describe a file in terms of the blocks of another.
+
+    Literal data is not held in memory, it is referenced by its offset
+    in the source file.
+
+    :param path: Source file
+    :type path: str
+    :param blocks: Signature of the target, see :func:`signature`
+    :type blocks: dict
+    :param block_size: Size of each block in bytes, defaults to 64KB
+    :type block_size: int, optional
+    :param max_literal: Give up once more than this many bytes of the
+        source match no block, defaults to no limit
+    :type max_literal: int, optional
+    :return: List of ``("copy", index, length)`` and
+        ``("data", offset, length)`` operations, None if the limit was
+        passed
+    :rtype: list, None
+    """
+    # pylint: disable=too-many-locals,too-many-branches
+    operations = list()
+    size = os.path.getsize(path)
+    buffer_ = bytearray()
+    base = 0
+    offset = 0
+    literal = 0
+    literal_total = 0
+    rolling = None
+    eof = False
+    with open(path, "rb") as file_:
+        while True:
+            index = offset - base
+            if not eof and len(buffer_) - index <= block_size:
+                if max_literal is not None \
+                        and literal_total + offset - literal > max_literal:
+                    return None
+                del buffer_[:index]
+                base = offset
+                chunk = file_.read(max(READ_SIZE, block_size * 4))
+                if chunk:
+                    throttle.consume(len(chunk))
+                    buffer_.extend(chunk)
+                else:
+                    eof = True
+                continue
+            length = min(block_size, len(buffer_) - index)
+            if length <= 0:
+                break
+            if rolling is None:
+                window = bytes(buffer_[index:index + length])
+                weak = zlib.adler32(window) & 0xffffffff
+                rolling = [weak & 0xffff, weak >> 16]
+            else:
+                weak = (rolling[1] << 16) | rolling[0]
+
+            match = blocks.get((weak, length))
+            if match:
+                window = bytes(buffer_[index:index + length])
+                block_index = match.get(hashlib.md5(window).digest())
+                if block_index is not None:
+                    if literal < offset:
+                        operations.append(("data", literal, offset - literal))
+                        literal_total += offset - literal
+                    operations.append(("copy", block_index, length))
+                    offset += length
+                    literal = offset
+                    rolling = None
+                    continue
+            if length < block_size:
+                break
+
+            out_byte = buffer_[index]
+            if index + block_size < len(buffer_):
+                in_byte = buffer_[index + block_size]
+                rolling[0] = (rolling[0] - out_byte + in_byte) % MOD_ADLER
+                rolling[1] = (
+                    rolling[1] - block_size * out_byte + rolling[0] - 1
+                ) % MOD_ADLER
+            else:
+                rolling = None
+            offset += 1
+
+    if literal < size:
+        operations.append(("data", literal, size - literal))
+    return operations
+
+
+def up_to_date(source, target):
+    """Whether a target looks unchanged since it was synced.
+
+    Like ``rsync``, files with the same size and modification time, to
+    the second, are assumed to be the same.
+
+    :param source: Source file
+    :type source: str
+    :param target: Target file
+    :type target: str
+    :return: Same size and modification time
+    :rtype: bool
+    """
+    source_stat = os.stat(source)
+    target_stat = os.stat(target)
+    return (
+        source_stat.st_size == target_stat.st_size
+        and int(source_stat.st_mtime) == int(target_stat.st_mtime)
+    )
+
+
+def sync_file(source, target, block_size=BLOCK_SIZE,
+              max_literal=MAX_LITERAL_BYTES, max_ratio=MAX_LITERAL_RATIO):
+    """Rebuild a target file from its unchanged blocks and the changes.
+
+    :param source: Source file
+    :type source: str
+    :param target: Existing target file
+    :type target: str
+    :param block_size: Size of each block in bytes, defaults to 64KB
+    :type block_size: int, optional
+    :param max_literal: Most changed bytes worth a delta, defaults to
+        :data:`MAX_LITERAL_BYTES`
+    :type max_literal: int, optional
+    :param max_ratio: Most changed bytes worth a delta, as a fraction of
+        the source size, defaults to :data:`MAX_LITERAL_RATIO`
+    :type max_ratio: float, optional
+    :return: Number of bytes taken from the source, None if the file
+        changed too much and should be copied instead
+    :rtype: int, None
+    """
+    if up_to_date(source, target):
+        logger.debug("%s is up to date", target)
+        return 0
+    limit = min(max_literal, int(os.path.getsize(source) * max_ratio))
+    operations = delta(
+        source, signature(target, block_size), block_size, max_literal=limit
+    )
+    if operations is None:
+        logger.debug("%s changed too much for a delta", target)
+        return None
+
+    written = 0
+    temp = "{0}.{1}.tmp".format(target, os.getpid())
+    try:
+        with open(source, "rb") as source_file, \
+                open(target, "rb") as target_file, \
+                open(temp, "wb") as temp_file:
+            for kind, value, length in operations:
+                if kind == "data":
+                    source_file.seek(value)
+                    _copy_range(source_file, temp_file, length)
+                    written += length
+                else:
+                    target_file.seek(value * block_size)
+                    _copy_range(target_file, temp_file, length)
+        shutil.copystat(source, temp)
+        if os.name == "nt":
+            os.remove(target)
+        os.rename(temp, target)
+    except (IOError, OSError):
+        if os.path.isfile(temp):
+            os.remove(temp)
+        raise
+    logger.debug("Rebuilt %s from %s changed bytes", target, written)
+    return written
+
+
+def _copy_range(source_file, target_file, length):
+    """Copy a number of bytes between open files.
+
+    :param source_file: File to read from, at the right position
+    :type source_file: file
+    :param target_file: File to write to, at the right position
+    :type target_file: file
+    :param length: Number of bytes to copy
+    :type length: int
+    """
+    while length > 0:
+        chunk = source_file.read(min(READ_SIZE, length))
+        if not chunk:
+            break
+        throttle.consume(len(chunk))
+        target_file.write(chunk)
+        length -= len(chunk)
@@ -0,0 +1,313 @@
+"""Selective Install Filters
+
+Hot-fixes rarely need the whole tool. A :class:`PathFilter` limits an
+install to chosen site directories and glob patterns. Patterns match
+paths relative to the tool's ``source/`` directory, such as
+``otls/my_asset.hda`` or ``python2.7libs/my_tool/*``.
+::
+    htooldeploy --only python2.7libs ~/dev/test_tool
+    htooldeploy --include "otls/my_asset.hda" ~/dev/test_tool
+    htooldeploy --exclude "*.bak" --exclude "geo/cache" ~/dev/test_tool
+
+Tools can also keep files out of every install with :class:`IgnoreRules`
+in a ``.htoolignore`` file at the root of the tool repo, written the same
+way as a ``.gitignore``. The repo's ``.gitignore`` can be used instead
+with ``--use-gitignore``.
+
+Patterns and ignore rules share the same glob syntax, where wildcards
+never match a ``/`` and a ``**`` component matches any number of
+directories.
+
+Directories that can't contain anything included, or that are ignored,
+are pruned while walking, so their contents are never visited.
+"""
+import os
+import re
+
+IGNORE_FILE = ".htoolignore"
+
+
+class PathFilter(object):
+    """Decide which site directories, directories and files to install"""
+
+    def __init__(self, site_dirs=None, include=None, exclude=None,
+                 ignore=None):
+        """Constructor for PathFilter.
+
+        :param site_dirs: Only install these site directories, defaults
+            to all of them
+        :type site_dirs: list, optional
+        :param include: Only install paths matching these globs, or
+            inside directories matching them, defaults to everything
+        :type include: list, optional
+        :param exclude: Never install paths matching these globs. A glob
+            without a ``/`` also matches names at any depth, defaults
+            to nothing
+        :type exclude: list, optional
+        :param ignore: Ignore rules of the tool repo, defaults to None
+        :type ignore: :class:`IgnoreRules`, optional
+        """
+        super(PathFilter, self).__init__()
+        self.site_dirs = set(site_dirs or [])
+        self.include = [x.strip("/") for x in include or []]
+        self.exclude = [x.strip("/") for x in exclude or []]
+        self.ignore = ignore
+        self._include = [compile_glob(x) for x in self.include]
+        self._exclude = [
+            compile_glob(x, anchored="/" in x) for x in self.exclude
+        ]
+
+    def __nonzero__(self):
+        return bool(
+            self.site_dirs or self.include or self.exclude or self.ignore
+        )
+
+    __bool__ = __nonzero__
+
+    @property
+    def selective(self):
+        """Whether the install is limited to chosen directories or
+        patterns, rather than only skipping ignored files.
+
+        :return: Site directories, includes or excludes are set
+        :rtype: bool
+        """
+        return bool(self.site_dirs or self.include or self.exclude)
+
+    def site_dir_allowed(self, name):
+        """Whether a site directory should be installed at all.
+
+        :param name: Site directory name, such as ``otls``
+        :type name: str
+        :return: Site directory is allowed
+        :rtype: bool
+        """
+        if self.site_dirs and name not in self.site_dirs:
+            return False
+        return self.dir_allowed(name)
+
+    def dir_allowed(self, relpath):
+        """Whether to walk into a directory.
+
+        :param relpath: Directory path relative to ``source/``
+        :type relpath: str
+        :return: Directory may contain installable files
+        :rtype: bool
+        """
+        relpath = relpath.replace("\\", "/")
+        if self._excluded(relpath):
+            return False
+        if self.ignore and self.ignore.ignored(relpath, is_dir=True):
+            return False
+        if not self.include or self._included(relpath):
+            return True
+        parts = relpath.split("/")
+        return any(self._prefix_of(parts, x) for x in self.include)
+
+    def file_allowed(self, relpath):
+        """Whether to install a file.
+
+        :param relpath: File path relative to ``source/``
+        :type relpath: str
+        :return: File is allowed
+        :rtype: bool
+        """
+        relpath = relpath.replace("\\", "/")
+        if self._excluded(relpath):
+            return False
+        if self.ignore and self.ignore.ignored(relpath):
+            return False
+        return not self.include or self._included(relpath)
+
+    def _excluded(self, relpath):
+        """Whether a path matches an exclude glob.
+
+        :param relpath: Path relative to ``source/``
+        :type relpath: str
+        :return: Path is excluded
+        :rtype: bool
+        """
+        return any(x.match(relpath) for x in self._exclude)
+
+    def _included(self, relpath):
+        """Whether a path, or one of its parents, matches an include glob.
+
+        :param relpath: Path relative to ``source/``
+        :type relpath: str
+        :return: Path is included
+        :rtype: bool
+        """
+        parts = relpath.split("/")
+        for index in range(1, len(parts) + 1):
+            path = "/".join(parts[:index])
+            if any(x.match(path) for x in self._include):
+                return True
+        return False
+
+    @staticmethod
+    def _prefix_of(parts, pattern):
+        """Whether a directory could contain paths matching a glob.
+
+        :param parts: Directory path components
+        :type parts: list
+        :param pattern: Include glob
+        :type pattern: str
+        :return: Directory may contain matches
+        :rtype: bool
+        """
+        pattern_parts = pattern.split("/")
+        for part, pattern_part in zip(parts, pattern_parts):
+            if pattern_part == "**":
+                return True
+            if not re.match("^{0}$".format(_translate(pattern_part)), part):
+                return False
+        return len(pattern_parts) > len(parts)
+
+
+class IgnoreRules(object):
+    """Compiled ``.gitignore`` style rules"""
+
+    def __init__(self, lines, base=""):
+        """Constructor for IgnoreRules.
+
+        :param lines: Lines of an ignore file
+        :type lines: list
+        :param base: Path of the tool's ``source/`` directory relative
+            to the ignore file, so anchored rules like ``/source/geo``
+            line up, defaults to ""
+        :type base: str, optional
+        """
+        super(IgnoreRules, self).__init__()
+        self.base = base.replace("\\", "/").strip("/")
+        self.rules = list()
+        for line in lines:
+            rule = self._compile(line)
+            if rule:
+                self.rules.append(rule)
+
+    def __len__(self):
+        return len(self.rules)
+
+    @classmethod
+    def from_file(cls, path, base=""):
+        """Read ignore rules from a file.
+
+        :param path: Ignore file
+        :type path: str
+        :param base: See :class:`IgnoreRules`, defaults to ""
+        :type base: str, optional
+        :return: Ignore rules, None if the file doesn't exist
+        :rtype: :class:`IgnoreRules`, None
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r") as file_:
+            return cls(file_.read().splitlines(), base=base)
+
+    def ignored(self, relpath, is_dir=False):
+        """Whether a path is ignored.
+
+        As with git, the last matching rule wins. Parent directories are
+        not checked, as an ignored directory is never walked into.
+
+        :param relpath: Path relative to the tool's ``source/``
+        :type relpath: str
+        :param is_dir: The path is a directory, defaults to False
+        :type is_dir: bool, optional
+        :return: Path is ignored
+        :rtype: bool
+        """
+        path = relpath.replace("\\", "/").strip("/")
+        if self.base:
+            path = "{0}/{1}".format(self.base, path)
+        for regex, negated, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                return not negated
+        return False
+
+    @staticmethod
+    def _compile(line):
+        """Compile a single ignore rule.
+
+        :param line: Line of an ignore file
+        :type line: str
+        :return: Tuple of ``(regex, negated, dir_only)``, None for blank
+            lines and comments
+        :rtype: tuple, None
+        """
+        line = line.rstrip("\n").rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negated = line.startswith("!")
+        if negated or line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        anchored = "/" in line
+        line = line.lstrip("/")
+        if not line:
+            return None
+        return compile_glob(line, anchored=anchored), negated, dir_only
+
+
+def compile_glob(glob, anchored=True):
+    """Compile a glob matching whole relative paths.
+
+    Wildcards never match a ``/``, and a ``**`` component matches any
+    number of directories.
+
+    :param glob: Glob, such as ``otls/*.hda`` or ``**/backup``
+    :type glob: str
+    :param anchored: Only match from the start of the path, otherwise
+        also match at any depth, defaults to True
+    :type anchored: bool, optional
+    :return: Compiled regex
+    :rtype: :class:`re.RegexObject`
+    """
+    regex = list()
+    parts = glob.split("/")
+    for index, part in enumerate(parts):
+        last = index == len(parts) - 1
+        if part == "**":
+            regex.append(".*" if last else "(?:.*/)?")
+            continue
+        regex.append(_translate(part))
+        if not last:
+            regex.append("/")
+    pattern = "".join(regex)
+    if not anchored:
+        pattern = "(?:.*/)?" + pattern
+    return re.compile("^{0}$".format(pattern))
+
+
+def _translate(glob):
+    """Translate one path component of a glob into a regex.
+
+    Unlike :func:`fnmatch.translate`, wildcards never match a ``/``.
+
+    :param glob: Glob without any ``/``
+    :type glob: str
+    :return: Regex
+    :rtype: str
+    """
+    regex = list()
+    index = 0
+    while index < len(glob):
+        char = glob[index]
+        index += 1
+        if char == "*":
+            regex.append("[^/]*")
+        elif char == "?":
+            regex.append("[^/]")
+        elif char == "[" and "]" in glob[index + 1:]:
+            end = glob.index("]", index + 1)
+            chars = glob[index:end].replace("\\", "\\\\")
+            if chars.startswith("!"):
+                chars = "^" + chars[1:]
+            regex.append("[{0}]".format(chars))
+            index = end + 1
+        else:
+            regex.append(re.escape(char))
+    return "".join(regex)
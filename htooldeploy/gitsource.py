@@ -0,0 +1,423 @@
+"""Deploy From Git
+
+Releasing a tool usually means cloning its repo, checking out a tag,
+copying the checkout and deleting it again. Instead, a :class:`GitTree`
+reads the files in the tool's ``source/`` straight out of a local git
+repo at any ref, with ``git ls-tree`` and ``git cat-file --batch``. No
+checkout is needed, and only files whose blob differs from what is
+already installed are written.
+::
+    htooldeploy --git-ref v1.2.0 ~/dev/test_tool /opt/houdini
+
+The same plumbing lists what changed in ``source/`` between two refs,
+without touching any files.
+::
+    htooldeploy --git-diff v1.1.0 v1.2.0 ~/dev/test_tool
+"""
+import hashlib
+import logging
+import os
+import re
+import stat
+import subprocess
+
+from . import throttle
+
+logger = logging.getLogger("htooldeploy")
+
+BLOB_ALGORITHM = "git-blob"
+MODE_EXECUTABLE = "100755"
+MODE_SYMLINK = "120000"
+READ_SIZE = 1024 * 1024
+
+
+class GitError(Exception):
+    """A git command failed"""
+
+
+class GitEntry(object):
+    """A file in a git tree"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, relpath, mode, sha, size):
+        """Constructor for GitEntry.
+
+        :param relpath: Path relative to the tree's prefix
+        :type relpath: str
+        :param mode: Git file mode, such as ``100644``
+        :type mode: str
+        :param sha: Blob hash
+        :type sha: str
+        :param size: Blob size in bytes
+        :type size: int
+        """
+        super(GitEntry, self).__init__()
+        self.relpath = relpath
+        self.mode = mode
+        self.sha = sha
+        self.size = size
+
+    def __repr__(self):
+        return "{0} {1} {2}".format(self.mode, self.sha, self.relpath)
+
+
+class GitTree(object):
+    """Files beneath a directory of a git repo, at a ref"""
+
+    def __init__(self, repo, ref="HEAD", prefix="source", git="git"):
+        """Constructor for GitTree.
+
+        :param repo: Local git repo, with or without a working tree
+        :type repo: str
+        :param ref: Branch, tag or commit, defaults to "HEAD"
+        :type ref: str, optional
+        :param prefix: Directory of the repo to read, defaults to
+            "source"
+        :type prefix: str, optional
+        :param git: ``git`` executable, defaults to "git"
+        :type git: str, optional
+        """
+        super(GitTree, self).__init__()
+        self.repo = os.path.abspath(repo)
+        self.ref = ref
+        self.prefix = prefix.strip("/")
+        self.git = git
+        self._entries = None
+
+    def __repr__(self):
+        return "{0}@{1}:{2}".format(self.repo, self.ref, self.prefix)
+
+    def entries(self):
+        """Every file beneath the prefix.
+
+        :return: Entries, keyed by path relative to the prefix
+        :rtype: dict
+        """
+        if self._entries is None:
+            output = self._run(
+                "ls-tree", "-r", "-l", "-z", self.ref, "--",
+                self.prefix + "/"
+            )
+            self._entries = dict()
+            for line in output.split(b"\0"):
+                if not line:
+                    continue
+                info, path = line.split(b"\t", 1)
+                mode, kind, sha, size = info.split()
+                if kind != b"blob":
+                    continue
+                relpath = self._relpath(path)
+                self._entries[relpath] = GitEntry(
+                    relpath, mode.decode("ascii"), sha.decode("ascii"),
+                    int(size)
+                )
+        return self._entries
+
+    def site_dirs(self):
+        """Top level directories beneath the prefix.
+
+        :return: Directory names
+        :rtype: list
+        """
+        return sorted(set(
+            x.split("/", 1)[0] for x in self.entries() if "/" in x
+        ))
+
+    def read(self, path, max_size=None):
+        """Contents of a file anywhere in the repo.
+
+        :param path: Path relative to the repo root
+        :type path: str
+        :param max_size: Don't read files larger than this, defaults to
+            no limit
+        :type max_size: int, optional
+        :return: Contents, None if the file is missing or too large
+        :rtype: bytes, None
+        """
+        spec = "{0}:{1}".format(self.ref, path)
+        try:
+            size = int(self._run("cat-file", "-s", spec))
+        except (GitError, ValueError):
+            return None
+        if max_size is not None and size > max_size:
+            return None
+        return self._run("cat-file", "blob", spec)
+
+    def root_files(self):
+        """Files at the top of the repo.
+
+        :return: File names
+        :rtype: list
+        """
+        output = self._run("ls-tree", "-z", self.ref)
+        names = list()
+        for line in output.split(b"\0"):
+            if not line:
+                continue
+            info, path = line.split(b"\t", 1)
+            if info.split()[1] == b"blob":
+                names.append(path.decode("utf-8"))
+        return names
+
+    def changed(self, target_dir, relpaths=None, cache=None):
+        """Files whose installed copy differs from the tree.
+
+        Sizes and the executable bit are compared first, so only files
+        that match on both are hashed.
+
+        :param target_dir: Installation target
+        :type target_dir: str
+        :param relpaths: Only check these files, defaults to all of them
+        :type relpaths: list, optional
+        :param cache: Cache of file hashes, defaults to None
+        :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+        :return: Entries to write
+        :rtype: list
+        """
+        changed = list()
+        entries = self.entries()
+        if relpaths is None:
+            relpaths = entries.keys()
+        for relpath in sorted(relpaths):
+            entry = entries[relpath]
+            target = os.path.join(target_dir, relpath)
+            if entry.mode == MODE_SYMLINK:
+                link = self.read("/".join([self.prefix, relpath])) or b""
+                if not os.path.islink(target) \
+                        or os.readlink(target) != link.decode("utf-8"):
+                    changed.append(entry)
+                continue
+            if not os.path.isfile(target) or os.path.islink(target) \
+                    or os.path.getsize(target) != entry.size \
+                    or _mode_differs(entry, target) \
+                    or blob_hash(target, cache=cache) != entry.sha:
+                changed.append(entry)
+        return changed
+
+    def write(self, entries, target_dir):
+        """Write files out of the object database.
+
+        Blobs are streamed through a single ``git cat-file --batch``
+        process, a chunk at a time. Files get the permissions of their
+        git mode, less the current umask, like a checkout would.
+
+        :param entries: Entries to write
+        :type entries: list
+        :param target_dir: Installation target
+        :type target_dir: str
+        :raises GitError: A blob can't be read
+        :return: Number of bytes written
+        :rtype: int
+        """
+        written = 0
+        umask = current_umask()
+        process = subprocess.Popen(
+            [self.git, "-C", self.repo, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        finished = False
+        try:
+            for entry in entries:
+                process.stdin.write("{0}\n".format(entry.sha).encode("ascii"))
+                process.stdin.flush()
+                header = process.stdout.readline().split()
+                if len(header) != 3 or header[1] != b"blob":
+                    raise GitError("Unable to read {0}".format(entry))
+                size = int(header[2])
+                target = os.path.join(target_dir, entry.relpath)
+                self._write_entry(
+                    entry, process.stdout, size, target, umask)
+                process.stdout.read(1)
+                written += size
+            finished = True
+        finally:
+            if not finished:
+                # cat-file may be blocked writing the rest of a blob
+                process.kill()
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                pass
+            process.stdout.close()
+            process.wait()
+        if process.returncode:
+            raise GitError("git cat-file exited with code {0}".format(
+                process.returncode))
+        return written
+
+    def diff(self, other_ref):
+        """Files beneath the prefix that changed since another ref.
+
+        :param other_ref: Ref to compare against
+        :type other_ref: str
+        :return: List of ``(status, relative_path)``, where status is
+            ``A``, ``M`` or ``D`` and so on
+        :rtype: list
+        """
+        output = self._run(
+            "diff-tree", "-r", "-z", "--no-renames", "--no-commit-id",
+            "--name-status", other_ref, self.ref, "--", self.prefix + "/"
+        )
+        fields = [x for x in output.split(b"\0") if x]
+        return [
+            (status.decode("ascii"), self._relpath(path))
+            for status, path in zip(fields[::2], fields[1::2])
+        ]
+
+    def _relpath(self, path):
+        """Path relative to the prefix.
+
+        :param path: Path relative to the repo root, from git
+        :type path: bytes
+        :return: Relative path
+        :rtype: str
+        """
+        return path.decode("utf-8")[len(self.prefix) + 1:]
+
+    @staticmethod
+    def _write_entry(entry, stream, size, target, umask=0o022):
+        """Write one blob from a stream to its target.
+
+        The file is written beside the target and renamed over it.
+
+        :param entry: Entry being written
+        :type entry: :class:`GitEntry`
+        :param stream: ``cat-file`` output, at the start of the blob
+        :type stream: file
+        :param size: Blob size in bytes
+        :type size: int
+        :param target: File to write
+        :type target: str
+        :param umask: Permission bits to clear, defaults to 0o022
+        :type umask: int, optional
+        """
+        parent = os.path.dirname(target)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        temp = "{0}.{1}.tmp".format(target, os.getpid())
+        try:
+            if entry.mode == MODE_SYMLINK:
+                os.symlink(stream.read(size).decode("utf-8"), temp)
+            else:
+                with open(temp, "wb") as file_:
+                    remaining = size
+                    while remaining:
+                        chunk = stream.read(min(READ_SIZE, remaining))
+                        if not chunk:
+                            raise GitError(
+                                "Truncated blob {0}".format(entry))
+                        throttle.consume(len(chunk))
+                        file_.write(chunk)
+                        remaining -= len(chunk)
+                mode = 0o777 if entry.mode == MODE_EXECUTABLE else 0o666
+                os.chmod(temp, mode & ~umask)
+            if os.name == "nt" and (
+                    os.path.islink(target) or os.path.isfile(target)):
+                os.remove(target)
+            os.rename(temp, target)
+        except (GitError, IOError, OSError):
+            if os.path.lexists(temp):
+                os.remove(temp)
+            raise
+
+    def _run(self, *args):
+        """Run a git command in the repo.
+
+        :param args: Arguments for ``git``
+        :type args: str
+        :return: Output
+        :rtype: bytes
+        :raises GitError: The command failed
+        """
+        command = [self.git, "-C", self.repo] + list(args)
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        output, error = process.communicate()
+        if process.returncode:
+            raise GitError(
+                "{0} failed: {1}".format(
+                    " ".join(command), error.decode("utf-8", "replace"))
+            )
+        return output
+
+
+def current_umask():
+    """The process umask, which can only be read by setting it.
+
+    :return: Permission bits new files don't get
+    :rtype: int
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def _mode_differs(entry, target):
+    """Whether an installed file's executable bit differs from git's.
+
+    Windows has no executable bit, so it never differs there.
+
+    :param entry: Entry in the tree
+    :type entry: :class:`GitEntry`
+    :param target: Installed file
+    :type target: str
+    :return: Executable bit differs
+    :rtype: bool
+    """
+    if os.name == "nt":
+        return False
+    executable = bool(os.stat(target).st_mode & stat.S_IXUSR)
+    return executable != (entry.mode == MODE_EXECUTABLE)
+
+
+def blob_hash(path, cache=None):
+    """Git blob hash of a file.
+
+    :param path: File to hash
+    :type path: str
+    :param cache: Cache to look the hash up in first, defaults to None
+    :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+    :return: Hex digest
+    :rtype: str
+    """
+    file_stat = os.stat(path)
+    if cache:
+        digest = cache.lookup(path, file_stat, BLOB_ALGORITHM)
+        if digest:
+            return digest
+    hasher = hashlib.sha1()
+    hasher.update("blob {0}\0".format(file_stat.st_size).encode("ascii"))
+    throttle.consume(files=1)
+    with open(path, "rb") as file_:
+        chunk = file_.read(READ_SIZE)
+        while chunk:
+            throttle.consume(len(chunk))
+            hasher.update(chunk)
+            chunk = file_.read(READ_SIZE)
+    digest = hasher.hexdigest()
+    if cache:
+        cache.store(path, file_stat, BLOB_ALGORITHM, digest)
+    return digest
+
+
+def version(tree, pattern=r"__version__\s+=\s+[\"\'](.+)[\"\']"):
+    """Find a version string in the files at the top of a tree's repo.
+
+    :param tree: Tree to look in
+    :type tree: :class:`GitTree`
+    :param pattern: Regex with the version as its first group
+    :type pattern: str, optional
+    :return: Version, None if not found
+    :rtype: str, None
+    """
+    for name in tree.root_files():
+        data = tree.read(name, max_size=64 * 1024)
+        if not data:
+            continue
+        for line in data.decode("utf-8", "replace").splitlines():
+            match = re.match(pattern, line)
+            if match:
+                return match.groups()[0]
+    return None
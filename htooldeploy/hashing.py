@@ -0,0 +1,401 @@
+"""File Hashing
+
+Content hashes used to detect unchanged files and directories between
+deploys.
+
+Hashing a large Digital Asset means reading all of it, so hashes are
+remembered in a :class:`HashCache`, keyed by the file's device, inode,
+size and modification time. A file that hasn't changed since it was last
+hashed is never read again. Hashes can also be stored in the file's own
+extended attributes, where the filesystem supports them, so they follow
+the file across machines sharing it.
+::
+    htooldeploy --push farm01 --hash-xattrs ~/dev/test_tool
+    htooldeploy --push farm01 --no-hash-cache ~/dev/test_tool
+
+The cache lives in ``~/.htooldeploy/hashes.db`` by default. Set
+``HTOOLDEPLOY_HASH_CACHE`` to keep it elsewhere. The cache is only ever
+an optimisation: if the database can't be read or written, files are
+simply hashed again.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from . import throttle
+from .database import connect
+
+logger = logging.getLogger("htooldeploy")
+
+CHUNK_SIZE = 1024 * 1024
+CACHE_VARIABLE = "HTOOLDEPLOY_HASH_CACHE"
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    device TEXT NOT NULL,
+    inode TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (device, inode, algorithm)
+);
+CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used);
+"""
+MAX_AGE = 30 * 24 * 60 * 60
+MAX_ENTRIES = 1000000
+RACY_SECONDS = 2
+XATTR_PREFIX = "user.htooldeploy."
+
+try:
+    import xattr as _xattr  # pylint: disable=import-error
+except ImportError:
+    _xattr = None
+
+
+def default_cache_path():
+    """Location of the hash cache database.
+
+    :return: Path to the database
+    :rtype: str
+    """
+    return os.environ.get(CACHE_VARIABLE) or os.path.join(
+        os.path.expanduser("~"), ".htooldeploy", "hashes.db"
+    )
+
+
+def xattrs_available():
+    """Whether extended attributes can be read and written.
+
+    :return: Extended attributes are available
+    :rtype: bool
+    """
+    return hasattr(os, "getxattr") or _xattr is not None
+
+
+class HashCache(object):
+    """Persistent cache of file hashes"""
+
+    def __init__(self, path=None, xattrs=False, max_age=MAX_AGE,
+                 max_entries=MAX_ENTRIES):
+        """Constructor for HashCache.
+
+        :param path: Database file, defaults to
+            :func:`default_cache_path`
+        :type path: str, optional
+        :param xattrs: Also keep hashes in extended attributes of the
+            files themselves, defaults to False
+        :type xattrs: bool, optional
+        :param max_age: Seconds an unused entry is kept, defaults to 30
+            days
+        :type max_age: int, optional
+        :param max_entries: Entries kept, the least recently used are
+            evicted first, defaults to 1000000
+        :type max_entries: int, optional
+        """
+        super(HashCache, self).__init__()
+        self.path = os.path.abspath(path or default_cache_path())
+        self.xattrs = xattrs and xattrs_available()
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        self._disabled = False
+        self._pending = dict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "Hash cache {0}".format(self.path)
+
+    def connection(self):
+        """Open the database, creating it if needed.
+
+        :return: Database connection
+        :rtype: :class:`sqlite3.Connection`
+        """
+        if self._connection is None:
+            self._connection = connect(
+                self.path, CACHE_SCHEMA, check_same_thread=False
+            )
+        return self._connection
+
+    def lookup(self, path, stat, algorithm):
+        """Cached hash of a file, if it hasn't changed since.
+
+        :param path: File
+        :type path: str
+        :param stat: Result of :func:`os.stat` on the file
+        :type stat: :class:`os.stat_result`
+        :param algorithm: :mod:`hashlib` algorithm
+        :type algorithm: str
+        :return: Hex digest, None if not cached
+        :rtype: str, None
+        """
+        key = _key(stat, algorithm)
+        mtime = _mtime_ns(stat)
+        digest = None
+        if self.xattrs:
+            digest = self._read_xattr(path, stat, algorithm)
+        with self._lock:
+            if digest is None and key in self._pending:
+                entry = self._pending[key]
+                if entry[:2] == (stat.st_size, mtime):
+                    digest = entry[2]
+            if digest is None and not self._disabled:
+                try:
+                    row = self.connection().execute(
+                        "SELECT size, mtime, digest FROM hashes WHERE "
+                        "device = ? AND inode = ? AND algorithm = ?", key
+                    ).fetchone()
+                except (sqlite3.Error, OSError) as error:
+                    self._disable(error)
+                    row = None
+                if row and tuple(row[:2]) == (stat.st_size, mtime):
+                    digest = str(row[2])
+            if digest is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._pending[key] = (stat.st_size, mtime, digest)
+        return digest
+
+    def store(self, path, stat, algorithm, digest):
+        """Remember the hash of a file.
+
+        Files modified in the last couple of seconds aren't cached, as
+        they could change again without their modification time
+        changing.
+
+        :param path: File
+        :type path: str
+        :param stat: Result of :func:`os.stat` on the file, taken
+            before it was hashed
+        :type stat: :class:`os.stat_result`
+        :param algorithm: :mod:`hashlib` algorithm
+        :type algorithm: str
+        :param digest: Hex digest
+        :type digest: str
+        """
+        if time.time() - stat.st_mtime < RACY_SECONDS:
+            return
+        key = _key(stat, algorithm)
+        with self._lock:
+            self._pending[key] = (stat.st_size, _mtime_ns(stat), digest)
+        if self.xattrs:
+            self._write_xattr(path, stat, algorithm, digest)
+
+    def close(self):
+        """Write new and used entries to the database, evict stale
+        ones, and close it.
+
+        Errors writing the database are logged, and never raised.
+        """
+        with self._lock:
+            if self._pending and not self._disabled:
+                now = time.time()
+                try:
+                    with self.connection() as connection:
+                        connection.executemany(
+                            "INSERT OR REPLACE INTO hashes VALUES "
+                            "(?, ?, ?, ?, ?, ?, ?)",
+                            [
+                                key + value + (now,)
+                                for key, value in self._pending.items()
+                            ]
+                        )
+                    self.evict()
+                except (sqlite3.Error, OSError) as error:
+                    self._disable(error)
+            self._pending = dict()
+            if self._connection is not None:
+                try:
+                    self._connection.close()
+                except sqlite3.Error:
+                    pass
+                self._connection = None
+        logger.debug(
+            "{0}: {1} hits, {2} misses".format(self, self.hits, self.misses)
+        )
+
+    def evict(self):
+        """Remove entries that haven't been used recently, and the least
+        recently used entries beyond the maximum.
+        """
+        with self.connection() as connection:
+            connection.execute(
+                "DELETE FROM hashes WHERE used < ?",
+                (time.time() - self.max_age,)
+            )
+            connection.execute(
+                "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes "
+                "ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def _disable(self, error):
+        """Stop using the database for the rest of the run.
+
+        :param error: Error the database raised
+        :type error: Exception
+        """
+        if not self._disabled:
+            logger.warning(
+                "Unable to use {0}, hashing without it: {1}".format(
+                    self, error)
+            )
+        self._disabled = True
+
+    @staticmethod
+    def _read_xattr(path, stat, algorithm):
+        """Hash kept in a file's extended attributes.
+
+        :param path: File
+        :type path: str
+        :param stat: Result of :func:`os.stat` on the file
+        :type stat: :class:`os.stat_result`
+        :param algorithm: :mod:`hashlib` algorithm
+        :type algorithm: str
+        :return: Hex digest, None if missing or stale
+        :rtype: str, None
+        """
+        name = XATTR_PREFIX + algorithm
+        try:
+            if hasattr(os, "getxattr"):
+                value = os.getxattr(path, name)
+            else:
+                value = _xattr.getxattr(path, name)
+        except (IOError, OSError):
+            return None
+        try:
+            size, mtime, digest = value.decode("ascii").split(":")
+        except ValueError:
+            return None
+        if (int(size), int(mtime)) != (stat.st_size, _mtime_ns(stat)):
+            return None
+        return str(digest)
+
+    @staticmethod
+    def _write_xattr(path, stat, algorithm, digest):
+        """Keep a hash in a file's extended attributes, if possible.
+
+        :param path: File
+        :type path: str
+        :param stat: Result of :func:`os.stat` on the file
+        :type stat: :class:`os.stat_result`
+        :param algorithm: :mod:`hashlib` algorithm
+        :type algorithm: str
+        :param digest: Hex digest
+        :type digest: str
+        """
+        name = XATTR_PREFIX + algorithm
+        value = "{0}:{1}:{2}".format(
+            stat.st_size, _mtime_ns(stat), digest
+        ).encode("ascii")
+        try:
+            if hasattr(os, "setxattr"):
+                os.setxattr(path, name, value)
+            else:
+                _xattr.setxattr(path, name, value)
+        except (IOError, OSError) as error:
+            logger.debug(
+                "Unable to set extended attributes on {0}: {1}".format(
+                    path, error)
+            )
+
+
+def _key(stat, algorithm):
+    """Cache key of a file.
+
+    Device and inode numbers are kept as text, as they don't always fit
+    in a SQLite integer.
+
+    :param stat: Result of :func:`os.stat`
+    :type stat: :class:`os.stat_result`
+    :param algorithm: :mod:`hashlib` algorithm
+    :type algorithm: str
+    :return: ``(device, inode, algorithm)``
+    :rtype: tuple
+    """
+    return str(stat.st_dev), str(stat.st_ino), algorithm
+
+
+def _mtime_ns(stat):
+    """Modification time of a file in nanoseconds.
+
+    :param stat: Result of :func:`os.stat`
+    :type stat: :class:`os.stat_result`
+    :return: Modification time
+    :rtype: int
+    """
+    return getattr(stat, "st_mtime_ns", None) or int(stat.st_mtime * 1e9)
+
+
+def file_hash(path, algorithm="sha1", cache=None):
+    """Hash the contents of a file.
+
+    The file is read in chunks, so memory use does not grow with the
+    size of the file.
+
+    :param path: File to hash
+    :type path: str
+    :param algorithm: :mod:`hashlib` algorithm, defaults to "sha1"
+    :type algorithm: str, optional
+    :param cache: Cache to look the hash up in first, defaults to None
+    :type cache: :class:`HashCache`, optional
+    :return: Hex digest
+    :rtype: str
+    """
+    if cache:
+        stat = os.stat(path)
+        digest = cache.lookup(path, stat, algorithm)
+        if digest is None:
+            digest = file_hash(path, algorithm=algorithm)
+            cache.store(path, stat, algorithm, digest)
+        return digest
+
+    hasher = hashlib.new(algorithm)
+    throttle.consume(files=1)
+    with open(path, "rb") as file_:
+        chunk = file_.read(CHUNK_SIZE)
+        while chunk:
+            throttle.consume(len(chunk))
+            hasher.update(chunk)
+            chunk = file_.read(CHUNK_SIZE)
+    return hasher.hexdigest()
+
+
+def tree_hash(path, algorithm="sha1", cache=None):
+    """Hash a file, or a directory including all of its contents.
+
+    Relative paths are part of the hash, so renaming a file inside the
+    directory changes it.
+
+    :param path: File or directory to hash
+    :type path: str
+    :param algorithm: :mod:`hashlib` algorithm, defaults to "sha1"
+    :type algorithm: str, optional
+    :param cache: Cache to look file hashes up in first, defaults to
+        None
+    :type cache: :class:`HashCache`, optional
+    :return: Hex digest
+    :rtype: str
+    """
+    if not os.path.isdir(path):
+        return file_hash(path, algorithm=algorithm, cache=cache)
+    hasher = hashlib.new(algorithm)
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file_ in sorted(files):
+            file_path = os.path.join(root, file_)
+            relpath = os.path.relpath(file_path, path).replace(os.sep, "/")
+            if not isinstance(relpath, bytes):
+                relpath = relpath.encode("utf-8")
+            hasher.update(relpath)
+            hasher.update(
+                file_hash(file_path, algorithm, cache=cache).encode("ascii")
+            )
+    return hasher.hexdigest()
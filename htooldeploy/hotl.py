@@ -0,0 +1,232 @@
+"""Digital Asset Conversion
+
+Binary Digital Assets don't diff well in version control, so tool repos
+usually keep them expanded (as directories) with ``hotl -t``, and
+collapse them back to binary files with ``hotl -l`` for Houdini.
+
+:class:`HDAConverter` runs these conversions for a whole ``otls/``
+directory with a pool of workers, and skips libraries whose source has
+not changed since the last conversion.
+::
+    htooldeploy --expand-hdas ~/dev/test_tool
+    htooldeploy --collapse-hdas ~/dev/test_tool
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+
+from multiprocessing.pool import ThreadPool
+
+from . import hashing
+from .otls import hda_files, otls_dirs
+
+logger = logging.getLogger("htooldeploy")
+
+HOTL_MANIFEST = ".htooldeploy_hotl"
+
+
+class HDAConverter(object):
+    """Expand and collapse the Digital Assets in a directory"""
+
+    def __init__(self, hotl="hotl", jobs=4, dry_run=False, cache=None):
+        """Constructor for HDAConverter.
+
+        :param hotl: ``hotl`` executable, defaults to "hotl"
+        :type hotl: str, optional
+        :param jobs: Number of conversions to run at once, defaults
+            to 4
+        :type jobs: int, optional
+        :param dry_run: Don't convert anything, defaults to False
+        :type dry_run: bool, optional
+        :param cache: Cache of file hashes, defaults to None
+        :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+        """
+        super(HDAConverter, self).__init__()
+        self.hotl = hotl
+        self.jobs = max(1, jobs)
+        self.dry_run = dry_run
+        self.cache = cache
+
+    def expand(self, source_dir, target_dir=None):
+        """Expand binary libraries into directories.
+
+        :param source_dir: Directory containing binary libraries
+        :type source_dir: str
+        :param target_dir: Directory to expand into, defaults to
+            ``source_dir`` (expand in place)
+        :type target_dir: str, optional
+        :return: Mapping of library name to result
+        :rtype: dict
+        """
+        names = [
+            x for x in hda_files(source_dir)
+            if os.path.isfile(os.path.join(source_dir, x))
+        ]
+        return self._convert("-t", names, source_dir, target_dir)
+
+    def collapse(self, source_dir, target_dir=None, allowed=None):
+        """Collapse expanded libraries into binary files.
+
+        :param source_dir: Directory containing expanded libraries
+        :type source_dir: str
+        :param target_dir: Directory to collapse into, defaults to
+            ``source_dir`` (collapse in place)
+        :type target_dir: str, optional
+        :param allowed: Takes a library name and returns whether to
+            collapse it, defaults to collapsing every library
+        :type allowed: callable, optional
+        :return: Mapping of library name to result
+        :rtype: dict
+        """
+        names = [
+            x for x in hda_files(source_dir)
+            if os.path.isdir(os.path.join(source_dir, x))
+            and (allowed is None or allowed(x))
+        ]
+        return self._convert("-l", names, source_dir, target_dir)
+
+    def _convert(self, flag, names, source_dir, target_dir):
+        """Convert libraries in parallel.
+
+        Each library is converted into a temporary location inside the
+        target directory, then moved over the existing target.
+
+        :param flag: ``hotl`` flag, ``-t`` to expand or ``-l`` to
+            collapse
+        :type flag: str
+        :param names: Library names to convert
+        :type names: list
+        :param source_dir: Directory to read libraries from
+        :type source_dir: str
+        :param target_dir: Directory to write libraries to
+        :type target_dir: str
+        :return: Mapping of library name to ``converted``, ``skipped``
+            or ``failed``
+        :rtype: dict
+        """
+        target_dir = target_dir or source_dir
+        in_place = os.path.abspath(source_dir) == os.path.abspath(target_dir)
+        if not self.dry_run and not os.path.isdir(target_dir):
+            os.makedirs(target_dir)
+        manifest = self._read_manifest(target_dir)
+
+        def _run(name):
+            source = os.path.join(source_dir, name)
+            target = os.path.join(target_dir, name)
+            digest = None
+            if not in_place:
+                digest = hashing.tree_hash(source, cache=self.cache)
+            if (not in_place and os.path.exists(target)
+                    and manifest.get(name) == digest):
+                logger.debug("{0} is unchanged".format(name))
+                return name, "skipped", digest
+            logger.info("Converting {0}".format(source))
+            if self.dry_run:
+                return name, "converted", digest
+            temp_dir = tempfile.mkdtemp(prefix=".hotl_", dir=target_dir)
+            temp = os.path.join(temp_dir, name)
+            if flag == "-t":
+                command = [self.hotl, flag, temp, source]
+            else:
+                command = [self.hotl, flag, source, temp]
+            try:
+                with open(os.devnull, "w") as devnull:
+                    returncode = subprocess.call(
+                        command, stdout=devnull, stderr=subprocess.STDOUT
+                    )
+                if returncode or not os.path.exists(temp):
+                    logger.error("Unable to convert {0}".format(source))
+                    return name, "failed", None
+                self._remove(target)
+                os.rename(temp, target)
+            except OSError as error:
+                logger.error(
+                    "Unable to convert {0}: {1}".format(source, error)
+                )
+                return name, "failed", None
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            return name, "converted", digest
+
+        pool = ThreadPool(min(self.jobs, max(1, len(names))))
+        try:
+            results = pool.map(_run, names)
+        finally:
+            pool.close()
+            pool.join()
+
+        for name, result, digest in results:
+            if result == "failed" or in_place:
+                manifest.pop(name, None)
+            else:
+                manifest[name] = digest
+        if not self.dry_run and not in_place:
+            self._write_manifest(target_dir, manifest)
+        return dict((name, result) for name, result, _ in results)
+
+    @staticmethod
+    def _remove(path):
+        """Remove a file or directory if it exists.
+
+        :param path: Path to remove
+        :type path: str
+        """
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _read_manifest(target_dir):
+        """Read the source hashes of previously converted libraries.
+
+        :param target_dir: Directory containing converted libraries
+        :type target_dir: str
+        :return: Mapping of library name to source hash
+        :rtype: dict
+        """
+        manifest = os.path.join(target_dir, HOTL_MANIFEST)
+        try:
+            with open(manifest, "r") as file_:
+                return json.load(file_)
+        except (IOError, OSError, ValueError):
+            return dict()
+
+    @staticmethod
+    def _write_manifest(target_dir, hashes):
+        """Record the source hashes of converted libraries.
+
+        :param target_dir: Directory containing converted libraries
+        :type target_dir: str
+        :param hashes: Mapping of library name to source hash
+        :type hashes: dict
+        """
+        manifest = os.path.join(target_dir, HOTL_MANIFEST)
+        with open(manifest, "w") as file_:
+            json.dump(hashes, file_, indent=4, sort_keys=True)
+
+
+def expand_tool(source_tool_repo, hotl="hotl", jobs=4, dry_run=False):
+    """Expand every binary library in a tool repo's ``source/``.
+
+    :param source_tool_repo: Tool repository root
+    :type source_tool_repo: str
+    :param hotl: ``hotl`` executable, defaults to "hotl"
+    :type hotl: str, optional
+    :param jobs: Number of conversions to run at once, defaults to 4
+    :type jobs: int, optional
+    :param dry_run: Don't convert anything, defaults to False
+    :type dry_run: bool, optional
+    :return: Success
+    :rtype: bool
+    """
+    converter = HDAConverter(hotl=hotl, jobs=jobs, dry_run=dry_run)
+    success = True
+    for otls_dir in otls_dirs(os.path.join(source_tool_repo, "source")):
+        results = converter.expand(otls_dir)
+        if "failed" in results.values():
+            success = False
+    return success
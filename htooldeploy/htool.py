@@ -26,10 +26,31 @@ import json
 import logging
 import os
 import re
+import shlex
 import shutil
+import sqlite3
+import subprocess
 import sys
+import time
 
-from distutils.dir_util import copy_tree
+from . import bytecode
+from . import copier
+from . import otls
+from . import throttle
+from . import transfer
+from . import transport
+from .filters import IGNORE_FILE, IgnoreRules, PathFilter
+from .gitsource import GitError, GitTree
+from .gitsource import version as git_version
+from .hashing import HashCache
+from .hotl import HDAConverter
+from .inventory import Inventory
+from .journal import InstallJournal
+from .locking import SHARED_LOCK, DeployLock, LockTimeout
+from .metrics import RunMetrics
+from .preflight import check as preflight_check
+from .slots import SlotManager
+from .store import ObjectStore
 
 HOUDINI_SITE_DIRS = [
     "desktop", "dso", "gallery", "geo", "help", "ocio", "otls", "presets",
@@ -56,7 +77,38 @@ class HTool(object):
             cleanup=False,
             hou_version=None,
             verbosity=3,
-            dry_run=False
+            dry_run=False,
+            index_otls=False,
+            compile_python=False,
+            jobs=4,
+            collapse_hdas=False,
+            hotl="hotl",
+            store=None,
+            slots=False,
+            remote=None,
+            compress_level=transfer.COMPRESS_LEVEL,
+            chunk_size=transfer.CHUNK_SIZE,
+            push=None,
+            remote_shell="ssh",
+            remote_python="python",
+            copy_backend="auto",
+            buffer_size=copier.BUFFER_SIZE,
+            only=None,
+            include=None,
+            exclude=None,
+            use_gitignore=False,
+            lock_timeout=None,
+            journal=True,
+            preflight=True,
+            inventory=None,
+            hash_cache=True,
+            hash_xattrs=False,
+            max_rate=None,
+            max_file_rate=None,
+            idle_io=False,
+            git_ref=None,
+            metrics_dir=None,
+            metrics_log=None
     ):
         """Constructor for HTool object.
 
@@ -80,6 +132,101 @@ class HTool(object):
         :param dry_run: Execute all selected functions without creating
             or removing directories, defaults to False
         :type dry_run: bool, optional
+        :param index_otls: Write an ``OPlibraries`` index into deployed
+            ``otls/`` directories, defaults to False
+        :type index_otls: bool, optional
+        :param compile_python: Byte-compile deployed python libraries,
+            defaults to False
+        :type compile_python: bool, optional
+        :param jobs: Number of parallel workers for post-install
+            stages, defaults to 4
+        :type jobs: int, optional
+        :param collapse_hdas: Install expanded Digital Assets as binary
+            libraries, defaults to False
+        :type collapse_hdas: bool, optional
+        :param hotl: ``hotl`` executable used to collapse Digital
+            Assets, defaults to "hotl"
+        :type hotl: str, optional
+        :param store: Shared object store directory. Installed files
+            are read-only links to the store instead of copies, defaults
+            to None
+        :type store: str, optional
+        :param slots: Install into a versioned slot and activate it
+            through a Houdini Package, defaults to False
+        :type slots: bool, optional
+        :param remote: Receiver command to stream the tool to instead
+            of copying, defaults to None
+        :type remote: str, optional
+        :param compress_level: Compression level from 0-9 when
+            streaming to a receiver, defaults to 6
+        :type compress_level: int, optional
+        :param chunk_size: Bytes to compress at a time when streaming
+            to a receiver, defaults to 1MB
+        :type chunk_size: int, optional
+        :param push: Hosts to push the tool to instead of copying,
+            defaults to None
+        :type push: list, optional
+        :param remote_shell: Remote shell used to reach ``push`` hosts,
+            defaults to "ssh"
+        :type remote_shell: str, optional
+        :param remote_python: Python interpreter on ``push`` hosts,
+            defaults to "python"
+        :type remote_python: str, optional
+        :param copy_backend: One of :data:`~htooldeploy.copier.BACKENDS`,
+            defaults to "auto"
+        :type copy_backend: str, optional
+        :param buffer_size: Bytes to copy at a time, defaults to 1MB
+        :type buffer_size: int, optional
+        :param only: Only install these site directories, defaults to
+            None
+        :type only: list, optional
+        :param include: Only install paths matching these globs,
+            relative to the tool's ``source/``, defaults to None
+        :type include: list, optional
+        :param exclude: Never install paths matching these globs,
+            defaults to None
+        :type exclude: list, optional
+        :param use_gitignore: Skip files ignored by the tool repo's
+            ``.gitignore`` rather than its ``.htoolignore``, defaults to
+            False
+        :type use_gitignore: bool, optional
+        :param lock_timeout: Seconds to wait for another deploy of this
+            tool into the same target to finish, and for the target's
+            shared files. None waits for as long as it takes, defaults
+            to None
+        :type lock_timeout: float, optional
+        :param journal: Record progress while copying, so an interrupted
+            install can be resumed, defaults to True
+        :type journal: bool, optional
+        :param preflight: Check for free space and write access before
+            copying anything, defaults to True
+        :type preflight: bool, optional
+        :param inventory: Inventory database to record the install in,
+            defaults to :func:`~htooldeploy.inventory.default_path`
+        :type inventory: str, optional
+        :param hash_cache: Reuse hashes of files that haven't changed
+            since they were last hashed, defaults to True
+        :type hash_cache: bool, optional
+        :param hash_xattrs: Also keep hashes in the extended attributes
+            of the files, defaults to False
+        :type hash_xattrs: bool, optional
+        :param max_rate: Most bytes per second to read and write,
+            defaults to unlimited
+        :type max_rate: float, optional
+        :param max_file_rate: Most files per second to read and write,
+            defaults to unlimited
+        :type max_file_rate: float, optional
+        :param idle_io: Run with idle I/O priority, defaults to False
+        :type idle_io: bool, optional
+        :param git_ref: Install the tool as it is at this ref of its git
+            repo, without needing a checkout, defaults to None
+        :type git_ref: str, optional
+        :param metrics_dir: Write metrics of the run into this Prometheus
+            textfile collector directory, defaults to None
+        :type metrics_dir: str, optional
+        :param metrics_log: Append metrics of the run to this JSON lines
+            file, defaults to None
+        :type metrics_log: str, optional
         """
 
         super(HTool, self).__init__()
@@ -92,6 +239,52 @@ class HTool(object):
         self.cleanup = cleanup
         self.verbosity = verbosity
         self.dry_run = dry_run
+        self.index_otls = index_otls
+        self.compile_python = compile_python
+        self.jobs = jobs
+        self.collapse_hdas = collapse_hdas
+        self.hotl = hotl
+        self.throttle = throttle.Throttle(max_rate, max_file_rate)
+        self.idle_io = idle_io
+        self.hash_cache = (
+            HashCache(xattrs=hash_xattrs) if hash_cache else None
+        )
+        self.store = (
+            ObjectStore(store, dry_run=dry_run, cache=self.hash_cache)
+            if store else None
+        )
+        self.slots = slots
+        self.remote = remote
+        self.compress_level = compress_level
+        self.chunk_size = chunk_size
+        self.push = push
+        self.remote_shell = remote_shell
+        self.remote_python = remote_python
+        self.copy_backend = copy_backend
+        self.buffer_size = buffer_size
+        self.git_tree = (
+            GitTree(self.source_repo, git_ref) if git_ref else None
+        )
+        self.filter = PathFilter(
+            site_dirs=only,
+            include=include,
+            exclude=exclude,
+            ignore=self._ignore_rules(use_gitignore)
+        )
+        self.lock_timeout = lock_timeout
+        self.lock_wait = 0.0
+        self.journal = journal
+        self.preflight = preflight
+        self.inventory = Inventory(inventory)
+        self.installed_paths = list()
+        self._journal = None
+        self._listings = None
+        self.bytes_copied = 0
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.packages_written = 0
+        self.metrics_dir = metrics_dir
+        self.metrics_log = metrics_log
 
         self._user_prefs_dir = self._find_user_prefs_dir(
             version=hou_version
@@ -110,9 +303,19 @@ class HTool(object):
         :return: Whether or not the tool can be installed
         :rtype: bool
         """
-        for dir_ in os.listdir(self.source_path()):
-            dir_path = os.path.join(self.source_path(), dir_)
-            if dir_ in HOUDINI_SITE_DIRS and os.path.isdir(dir_path):
+        if self.git_tree:
+            try:
+                dirs = self.git_tree.site_dirs()
+            except GitError as error:
+                logger.error(error)
+                sys.exit()
+        else:
+            dirs = [
+                x for x in os.listdir(self.source_path())
+                if os.path.isdir(os.path.join(self.source_path(), x))
+            ]
+        for dir_ in dirs:
+            if dir_ in HOUDINI_SITE_DIRS:
                 logger.info("{0} is installable".format(self.tool_name()))
                 return True
 
@@ -126,6 +329,179 @@ class HTool(object):
     def install(self):
         """Install the tool.
 
+        Local installs hold a :class:`~htooldeploy.locking.DeployLock`
+        on the tool in the installation target while they run. A
+        missing target is only created, to hold the lock, with the
+        ``force`` flag.
+
+        :return: Success
+        :rtype: bool
+        """
+        if self.idle_io:
+            throttle.idle_priority()
+        start = time.time()
+        success = False
+        try:
+            with self.throttle:
+                if self.dry_run or self.push or self.remote:
+                    success = self._install()
+                else:
+                    success = self._locked_install()
+            return success
+        finally:
+            if self.throttle.waited:
+                logger.info("Throttled for {0:.2f}s".format(
+                    self.throttle.waited))
+            if self.hash_cache:
+                self.hash_cache.close()
+            if not self.dry_run:
+                self._export_metrics(success, time.time() - start)
+
+    def _export_metrics(self, success, duration):
+        """Write metrics of the run, if any destination is set.
+
+        :param success: Whether the install succeeded
+        :type success: bool
+        :param duration: Seconds the install took
+        :type duration: float
+        """
+        if not (self.metrics_dir or self.metrics_log):
+            return
+        # Exporting must never fail the deploy
+        try:
+            run = RunMetrics(
+                self.tool_name(),
+                self.install_root(),
+                self.install_mode(),
+                version=self.tool_version()
+            )
+            run.duration_seconds = duration
+            run.success = success
+            run.bytes_copied = self.bytes_copied
+            run.files_copied = self.files_copied
+            run.files_skipped = self.files_skipped
+            run.packages_written = self.packages_written
+            run.lock_wait_seconds = self.lock_wait
+            run.throttle_wait_seconds = self.throttle.waited
+            run.export(
+                textfile_dir=self.metrics_dir, json_path=self.metrics_log
+            )
+        except (GitError, IOError, OSError, ValueError) as error:
+            logger.warning("Unable to export metrics: {0}".format(error))
+
+    def _locked_install(self):
+        """Install the tool while holding its deploy lock.
+
+        :return: Success
+        :rtype: bool
+        """
+        root = self.install_root()
+        if not os.path.isdir(root):
+            if not self.force:
+                logger.error(
+                    "Installation target {0} doesn't exist. Try running "
+                    "again with the \"--force\" flag".format(root)
+                )
+                return False
+            logger.debug("Creating installation target {0}".format(root))
+            os.makedirs(root)
+        lock = DeployLock(root, self.tool_name(), timeout=self.lock_timeout)
+        try:
+            with lock:
+                return self._record(self._install())
+        except LockTimeout as error:
+            logger.error("Another deploy is running: {0}".format(error))
+            return False
+        finally:
+            self.lock_wait = lock.wait_seconds
+            if lock.contended:
+                logger.info(
+                    "Waited {0:.2f}s for {1}".format(lock.wait_seconds, lock)
+                )
+
+    def _shared(self, function, *args):
+        """Run a step that writes files shared by every tool in the
+        installation target, while holding the target's shared lock.
+
+        :param function: Step to run
+        :type function: callable
+        :param args: Arguments for the step
+        :return: Result of the step, False if the lock timed out
+        :rtype: object
+        """
+        if self.dry_run:
+            return function(*args)
+        lock = DeployLock(
+            self.install_root(), SHARED_LOCK, timeout=self.lock_timeout
+        )
+        try:
+            with lock:
+                return function(*args)
+        except LockTimeout as error:
+            logger.error("Another deploy is running: {0}".format(error))
+            return False
+
+    def install_root(self):
+        """Installation target, without ``packages/`` in Development
+        Mode.
+
+        :return: Installation target
+        :rtype: str
+        """
+        return os.path.abspath(
+            self._install_destination or self._user_prefs_dir
+        )
+
+    def install_mode(self):
+        """How the tool is installed.
+
+        :return: ``develop``, ``slots``, ``push``, ``remote`` or ``copy``
+        :rtype: str
+        """
+        for mode in ["develop", "slots", "push", "remote"]:
+            if getattr(self, mode):
+                return mode
+        return "copy"
+
+    def _record(self, success):
+        """Record a successful install in the inventory.
+
+        :param success: Whether the install succeeded
+        :type success: bool
+        :return: Success, passed straight through
+        :rtype: bool
+        """
+        if not success:
+            return success
+        root = self.install_root()
+        if self.develop:
+            paths = [self._package_file()]
+        elif self.slots:
+            manager = SlotManager(root, self.tool_name())
+            paths = [manager.root(), manager.package_file()]
+        else:
+            paths = self.installed_paths
+        try:
+            self.inventory.record(
+                self.tool_name(),
+                root,
+                self.install_mode(),
+                [os.path.relpath(x, root) for x in paths],
+                version=self.tool_version(),
+                source=os.path.abspath(self.source_repo),
+                size=self.bytes_copied
+            )
+        except (sqlite3.Error, OSError) as error:
+            logger.warning(
+                "Unable to update {0}: {1}".format(self.inventory, error)
+            )
+        finally:
+            self.inventory.close()
+        return success
+
+    def _install(self):
+        """Install the tool.
+
         Install in Development Mode if user input requires.
 
         :return: Success
@@ -133,14 +509,42 @@ class HTool(object):
         """
         success = False
 
-        logger.debug("Tool source: {0}".format(self.source_path()))
+        logger.debug("Tool source: {0}".format(
+            self.git_tree or self.source_path()))
         logger.debug("Install path: {0}".format(self.target_path()))
 
-        if self.develop:
+        if self.git_tree and (
+                self.develop or self.push or self.remote or self.slots):
+            logger.error(
+                "Installing from a git ref only supports copying into the "
+                "installation target"
+            )
+        elif self.git_tree:
+            logger.info("Installing {0} from {1}".format(
+                self.tool_name(), self.git_tree))
+            success = self._copy_from_git()
+        elif self.develop and self.filter.selective:
+            logger.error(
+                "Development Mode adds the whole source directory to "
+                "HOUDINI_PATH, so --only, --include and --exclude can't be "
+                "used with it"
+            )
+        elif self.develop:
             logger.info("Installing in Development Mode")
             logger.debug("Creating JSON Package")
             logger.debug("Adding package to {0}".format(self.target_path()))
             success = self._add_json_package()
+        elif self.push:
+            logger.info("Pushing {0} to {1} hosts".format(
+                self.tool_name(), len(self.push)))
+            success = self._push_to_hosts()
+        elif self.remote:
+            logger.info("Sending {0} to {1}".format(
+                self.tool_name(), self.remote))
+            success = self._send_to_remote()
+        elif self.slots:
+            logger.info("Installing {0} into a slot".format(self.tool_name()))
+            success = self._install_slot()
         else:
             logger.info("Installing {0}".format(self.tool_name()))
             success = self._copy_source_to_target()
@@ -179,6 +583,34 @@ class HTool(object):
 
         return os.path.abspath(source_dir)
 
+    def _ignore_rules(self, use_gitignore=False):
+        """Read the ignore rules at the root of the tool repo.
+
+        :param use_gitignore: Read ``.gitignore`` instead of
+            ``.htoolignore``, defaults to False
+        :type use_gitignore: bool, optional
+        :return: Ignore rules, None if the repo has none
+        :rtype: :class:`~htooldeploy.filters.IgnoreRules`, None
+        """
+        if not self.source_repo:
+            return None
+        name = ".gitignore" if use_gitignore else IGNORE_FILE
+        path = os.path.join(self.source_repo, name)
+        if self.git_tree:
+            data = self.git_tree.read(name)
+            rules = None
+            if data is not None:
+                rules = IgnoreRules(
+                    data.decode("utf-8").splitlines(), base="source"
+                )
+        else:
+            rules = IgnoreRules.from_file(path, base="source")
+        if rules:
+            logger.debug(
+                "Ignoring {0} patterns from {1}".format(len(rules), path)
+            )
+        return rules
+
     def target_path(self):
         """Directory to copy source files to.
 
@@ -205,7 +637,10 @@ class HTool(object):
         :return: Tool name
         :rtype: str
         """
-        return os.path.basename(self.source_repo)
+        name = os.path.basename(self.source_repo)
+        if self.git_tree and name.endswith(".git"):
+            name = name[:-len(".git")]
+        return name
 
     def tool_version(self):
         """Attempt to find the source tool's version.
@@ -220,6 +655,8 @@ class HTool(object):
         logger.debug(
             "Searching for version string for {0}".format(self.tool_name())
         )
+        if self.git_tree:
+            return git_version(self.git_tree)
         root = self.source_repo
         root_files = [
             x for x in os.listdir(root)
@@ -247,36 +684,80 @@ class HTool(object):
 
         return version_str
 
-    def _copy_source_to_target(self):
+    def _copy_source_to_target(self, target_root=None, force=None):
         """Copy dirctories in the repo's ``source/`` to the installation
         target.
 
+        :param target_root: Directory to copy to, defaults to
+            :meth:`target_path`
+        :type target_root: str, optional
+        :param force: Create missing target directories, defaults to
+            the tool's ``force`` flag
+        :type force: bool, optional
         :raises Exception: Missing target directories, no force flag.
         """
-        source_dirs = [
-            x for x in os.listdir(self.source_path())
-            if not x.startswith(".") and x in HOUDINI_SITE_DIRS
-        ]
-        missing_dirs = [
-            x for x in source_dirs
-            if x not in os.listdir(self.target_path())
-        ]
-        if missing_dirs and not self.force:
-            error_msg = (
-                "Missing the following site directories in installation "
-                "target:\n\t{0}\nTry running again with the \"--force\" flag"
-                .format(
-                    "\n\t".join(["{0}/".format(x) for x in missing_dirs]))
-            )
-            logger.error(error_msg)
+        target_root = target_root or self.target_path()
+        force = self.force if force is None else force
+        source_dirs = self.source_site_dirs()
+        if not self._check_only(source_dirs):
+            return False
+        if not self._check_target_dirs(source_dirs, target_root, force):
             return False
 
-        for dir_name in source_dirs:
-            source = os.path.join(self.source_path(), dir_name)
-            target = os.path.join(self.target_path(), dir_name)
-            logger.info("Copying {0} to {1}".format(source, target))
-            if not self.dry_run:
-                copy_tree(source, target)
+        # Walk the source once, for both the pre-flight check and the copy
+        self._listings = dict()
+        if self.preflight:
+            report = preflight_check(
+                [
+                    (path, os.path.join(target_root, relpath))
+                    for path, relpath in self.source_files()
+                ],
+                store=self.store
+            )
+            if not report:
+                logger.error(report)
+                self._listings = None
+                return False
+            logger.debug(report)
+
+        if self.journal and not self.dry_run:
+            self._journal = InstallJournal(target_root, self.tool_name())
+        start = time.time()
+        try:
+            for dir_name in source_dirs:
+                source = os.path.join(self.source_path(), dir_name)
+                target = os.path.join(target_root, dir_name)
+                logger.info("Copying {0} to {1}".format(source, target))
+                if dir_name == "otls" and self.collapse_hdas:
+                    if not self._copy_collapsed(source, target):
+                        return False
+                elif not self.dry_run:
+                    self._copy_tree(source, target)
+        finally:
+            self._listings = None
+            if self._journal:
+                self._journal.close()
+        if self._journal:
+            self._journal.complete()
+            self._journal = None
+
+        elapsed = time.time() - start
+        logger.info(
+            "Copied {0} files ({1} bytes) in {2:.2f}s ({3:.2f} MB/s)".format(
+                self.files_copied,
+                self.bytes_copied,
+                elapsed,
+                self.bytes_copied / max(elapsed, 1e-6) / (1024.0 * 1024.0)
+            )
+        )
+        if self.files_skipped:
+            logger.info(
+                "Skipped {0} files that were already up to date".format(
+                    self.files_skipped)
+            )
+
+        if not self._shared(self._post_copy, target_root, source_dirs):
+            return False
 
         if self.cleanup:
             try:
@@ -290,18 +771,460 @@ class HTool(object):
 
         return True
 
-    def _add_json_package(self):
-        """Add a Houdini Package entry to the installation target.
+    @staticmethod
+    def _check_target_dirs(source_dirs, target_root, force):
+        """Check the installation target has every site directory.
 
-        Append the tool's source directory to ``HOUDINI_PATH`` so that
-        Houdini can pick up the tool while it still lives in a
-        convenient development area.
+        :param source_dirs: Site directories to install
+        :type source_dirs: list
+        :param target_root: Directory to install to
+        :type target_root: str
+        :param force: Missing directories will be created
+        :type force: bool
+        :return: Target is ready
+        :rtype: bool
+        """
+        target_dirs = (
+            os.listdir(target_root) if os.path.isdir(target_root) else []
+        )
+        missing_dirs = [x for x in source_dirs if x not in target_dirs]
+        if missing_dirs and not force:
+            error_msg = (
+                "Missing the following site directories in installation "
+                "target:\n\t{0}\nTry running again with the \"--force\" flag"
+                .format(
+                    "\n\t".join(["{0}/".format(x) for x in missing_dirs]))
+            )
+            logger.error(error_msg)
+            return False
+        return True
+
+    def _copy_from_git(self, target_root=None):
+        """Write the files of the tool at a git ref to the installation
+        target, skipping files that are already installed.
 
+        :param target_root: Directory to write to, defaults to
+            :meth:`target_path`
+        :type target_root: str, optional
         :return: Success
         :rtype: bool
         """
-        success = False
+        target_root = target_root or self.target_path()
+        try:
+            relpaths = [
+                x for x in self.git_tree.entries() if self._git_allowed(x)
+            ]
+        except GitError as error:
+            logger.error(error)
+            return False
+        source_dirs = sorted(set(
+            x.split("/", 1)[0] for x in relpaths
+            if x.split("/", 1)[0] in HOUDINI_SITE_DIRS
+        ))
+        relpaths = [x for x in relpaths if x.split("/", 1)[0] in source_dirs]
+        if not self._check_only(source_dirs):
+            return False
+        if not self._check_target_dirs(source_dirs, target_root, self.force):
+            return False
+
+        changed = self.git_tree.changed(
+            target_root, relpaths, cache=self.hash_cache
+        )
+        logger.info("{0} of {1} files differ from {2}".format(
+            len(changed), len(relpaths), target_root))
+        self.installed_paths.extend(
+            os.path.join(target_root, x) for x in relpaths
+        )
+        self.files_skipped += len(relpaths) - len(changed)
+        if not self.dry_run:
+            start = time.time()
+            try:
+                self.bytes_copied += self.git_tree.write(changed, target_root)
+            except (GitError, IOError, OSError) as error:
+                logger.error(error)
+                return False
+            self.files_copied += len(changed)
+            logger.info(
+                "Wrote {0} files ({1} bytes) in {2:.2f}s".format(
+                    self.files_copied, self.bytes_copied,
+                    time.time() - start)
+            )
+        if self.cleanup:
+            logger.warning("Not removing the git repo {0}".format(
+                self.source_repo))
 
+        return self._shared(self._post_copy, target_root, source_dirs)
+
+    def _git_allowed(self, relpath):
+        """Whether a file in the git tree passes the install filters.
+
+        :param relpath: Path relative to ``source/``
+        :type relpath: str
+        :return: File is allowed
+        :rtype: bool
+        """
+        parts = relpath.split("/")
+        if len(parts) < 2 or not self.filter.site_dir_allowed(parts[0]):
+            return False
+        for index in range(2, len(parts)):
+            if not self.filter.dir_allowed("/".join(parts[:index])):
+                return False
+        return self.filter.file_allowed(relpath)
+
+    def _post_copy(self, target_root, source_dirs):
+        """Index Digital Assets and compile Python libraries after
+        copying.
+
+        Only the files this install wrote into the libraries are
+        compiled, other tools' modules in the same libraries are left
+        alone.
+
+        :param target_root: Directory copied to
+        :type target_root: str
+        :param source_dirs: Site directories copied
+        :type source_dirs: list
+        :return: Success
+        :rtype: bool
+        """
+        self._index_otls([os.path.join(target_root, "otls")])
+        if not self.compile_python:
+            return True
+        lib_dirs = [
+            os.path.join(target_root, x) for x in source_dirs
+            if bytecode.lib_version(x)
+        ]
+        for lib_dir in lib_dirs:
+            if not bytecode.compile_lib(
+                    lib_dir,
+                    paths=self.installed_paths,
+                    jobs=self.jobs,
+                    dry_run=self.dry_run):
+                logger.error("Unable to compile {0}".format(lib_dir))
+                return False
+        return True
+
+    def source_site_dirs(self):
+        """Site directories in the tool's source to install.
+
+        :return: Site directory names
+        :rtype: list
+        """
+        return sorted(
+            x for x in os.listdir(self.source_path())
+            if not x.startswith(".") and x in HOUDINI_SITE_DIRS
+            and self.filter.site_dir_allowed(x)
+        )
+
+    def source_files(self):
+        """List every file in the tool's site directories.
+
+        :return: List of ``(path, relative_path)`` tuples, relative to
+            :meth:`source_path`
+        :rtype: list
+        """
+        files = list()
+        for dir_name in self.source_site_dirs():
+            source = os.path.join(self.source_path(), dir_name)
+            for root, _, names in self._walk(source):
+                for name in names:
+                    path = os.path.join(root, name)
+                    files.append(
+                        (path, os.path.relpath(path, self.source_path()))
+                    )
+        return files
+
+    def _walk(self, source):
+        """Walk a source directory, pruning anything filtered out.
+
+        During a copy the listing is kept, so the pre-flight check and
+        the copy share a single walk of the source.
+
+        :param source: Directory inside :meth:`source_path` to walk
+        :type source: str
+        :return: ``(root, dirs, files)`` for each directory visited
+        :rtype: list
+        """
+        if self._listings and source in self._listings:
+            return self._listings[source]
+        listing = list()
+        for root, dirs, files in os.walk(source, followlinks=True):
+            relroot = os.path.relpath(root, self.source_path())
+            dirs[:] = sorted(
+                x for x in dirs
+                if self.filter.dir_allowed(os.path.join(relroot, x))
+            )
+            files = sorted(
+                x for x in files
+                if self.filter.file_allowed(os.path.join(relroot, x))
+            )
+            listing.append((root, list(dirs), files))
+        if self._listings is not None:
+            self._listings[source] = listing
+        return listing
+
+    def _send_to_remote(self):
+        """Stream the tool's site directories to a receiver command.
+
+        The site directories are sent ahead of the files, so the
+        receiver can refuse to create missing ones. ``--force`` is
+        passed on to the receiver with the ``force`` flag.
+
+        :return: Success
+        :rtype: bool
+        """
+        files = self.source_files()
+        logger.info("Sending {0} files".format(len(files)))
+        if self.dry_run:
+            return True
+        dirs = [
+            (os.path.join(self.source_path(), x), x)
+            for x in self.source_site_dirs()
+        ]
+        command = shlex.split(self.remote)
+        if self.force:
+            command.append("--force")
+        process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        try:
+            bytes_in, bytes_out = transfer.send(
+                dirs + files,
+                process.stdin,
+                level=self.compress_level,
+                chunk_size=self.chunk_size
+            )
+        except (IOError, OSError) as error:
+            logger.error("Unable to send to receiver: {0}".format(error))
+            process.kill()
+            return False
+        finally:
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                # The receiver has already gone, its exit code says why
+                pass
+            process.wait()
+        if process.returncode:
+            logger.error(
+                "Receiver exited with code {0}".format(process.returncode)
+            )
+            return False
+        logger.info(
+            "Sent {0} bytes as {1} bytes".format(bytes_in, bytes_out)
+        )
+        return True
+
+    def _push_to_hosts(self):
+        """Push a single snapshot of the tool to many hosts at once.
+
+        :return: Whether every host succeeded
+        :rtype: bool
+        """
+        snapshot = transport.Snapshot(
+            self.source_files(), cache=self.hash_cache
+        )
+        transports = [
+            transport.ShellTransport(
+                host,
+                self.target_path(),
+                shell=self.remote_shell,
+                python=self.remote_python,
+                compress_level=self.compress_level,
+                chunk_size=self.chunk_size,
+                force=self.force
+            )
+            for host in self.push
+        ]
+        if self.dry_run:
+            for item in transports:
+                logger.info("Pushing {0} files to {1}".format(
+                    len(snapshot), item))
+            return True
+        results = transport.push(snapshot, transports, jobs=self.jobs)
+        return not [x for x in results if x.error]
+
+    def _install_slot(self):
+        """Install the tool into its own versioned slot and activate it.
+
+        A version that is already installed is only re-copied with the
+        ``force`` flag, otherwise it is simply activated. The slot is
+        only marked complete once the copy succeeds.
+
+        :return: Success
+        :rtype: bool
+        """
+        version = self.tool_version()
+        if not version:
+            logger.error(
+                "Install slots need a tool version. Add a __version__ to "
+                "{0}".format(self.source_repo)
+            )
+            return False
+        manager = SlotManager(
+            self.target_path(), self.tool_name(), dry_run=self.dry_run
+        )
+        slot_dir = manager.slot_path(version)
+        if version in manager.versions() and not self.force:
+            logger.info(
+                "{0} {1} is already installed in {2}".format(
+                    self.tool_name(), version, slot_dir)
+            )
+        else:
+            manager.set_complete(version, False)
+            if not self._copy_source_to_target(slot_dir, force=True):
+                return False
+            manager.set_complete(version)
+        return manager.activate(version)
+
+    def _copy_collapsed(self, source, target):
+        """Copy an ``otls/`` directory, collapsing expanded libraries.
+
+        Expanded libraries are collapsed straight into the target,
+        everything else is copied as normal.
+
+        :param source: Source ``otls/`` directory
+        :type source: str
+        :param target: Target ``otls/`` directory
+        :type target: str
+        :return: Success
+        :rtype: bool
+        """
+        converter = HDAConverter(
+            hotl=self.hotl,
+            jobs=self.jobs,
+            dry_run=self.dry_run,
+            cache=self.hash_cache
+        )
+        results = self._shared(
+            converter.collapse, source, target, self._library_allowed
+        )
+        if results is False or "failed" in results.values():
+            logger.error("Unable to collapse libraries in {0}".format(source))
+            return False
+        self.installed_paths.extend(
+            os.path.join(target, x) for x in results
+        )
+        if not self.dry_run:
+            self._copy_tree(source, target, skip=results.keys())
+        return True
+
+    def _library_allowed(self, name):
+        """Whether an expanded library in ``otls/`` passes the install
+        filters.
+
+        The library is collapsed into a single file, so it has to pass
+        as both a directory and a file.
+
+        :param name: Library name
+        :type name: str
+        :return: Library is allowed
+        :rtype: bool
+        """
+        relpath = "otls/{0}".format(name)
+        return (
+            self.filter.dir_allowed(relpath)
+            and self.filter.file_allowed(relpath)
+        )
+
+    def _check_only(self, site_dirs):
+        """Make sure the site directories asked for are in the source.
+
+        :param site_dirs: Site directories that will be installed
+        :type site_dirs: list
+        :return: Anything is left to install
+        :rtype: bool
+        """
+        missing = sorted(self.filter.site_dirs - set(site_dirs))
+        if missing:
+            logger.warning("{0} has no {1}".format(
+                self.tool_name(), ", ".join(x + "/" for x in missing)))
+        if self.filter.selective and not site_dirs:
+            logger.error("Nothing in {0} matches the install filters".format(
+                self.tool_name()))
+            return False
+        return True
+
+    def _copy_tree(self, source, target, skip=()):
+        """Copy a directory tree file by file.
+
+        :param source: Directory to copy
+        :type source: str
+        :param target: Directory to copy to
+        :type target: str
+        :param skip: Names at the top of ``source`` not to copy,
+            defaults to ()
+        :type skip: list, optional
+        """
+        for root, _, files in self._walk(source):
+            relroot = os.path.relpath(root, source)
+            if relroot.split(os.sep)[0] in skip:
+                continue
+            target_root = os.path.normpath(os.path.join(target, relroot))
+            if root == source:
+                files = [x for x in files if x not in skip]
+            if self.filter and not files:
+                continue
+            if not os.path.isdir(target_root):
+                os.makedirs(target_root)
+            for file_ in files:
+                self._copy_file(
+                    os.path.join(root, file_), os.path.join(target_root, file_)
+                )
+
+    def _copy_file(self, source, target):
+        """Copy a single file, skipping it if an interrupted install
+        already copied it.
+
+        :param source: File to copy
+        :type source: str
+        :param target: Path to copy to
+        :type target: str
+        """
+        self.installed_paths.append(target)
+        if self._journal:
+            if self._journal.done(source, target):
+                logger.debug("Already copied %s", target)
+                self.files_skipped += 1
+                return
+            self._journal.start(target)
+            self._copy_file_to(source, target)
+            self._journal.finish(source, target)
+        else:
+            self._copy_file_to(source, target)
+
+    def _copy_file_to(self, source, target):
+        """Copy a single file, or link it from the shared object store.
+
+        :param source: File to copy
+        :type source: str
+        :param target: Path to copy to
+        :type target: str
+        """
+        logger.debug("Copying %s to %s", source, target)
+        throttle.consume(files=1)
+        if self.store:
+            if not self.store.materialize(self.store.add(source), target):
+                self.files_skipped += 1
+                return
+            self.files_copied += 1
+            self.bytes_copied += os.path.getsize(source)
+            return
+        if os.path.islink(target) or (
+                os.path.isfile(target) and os.stat(target).st_nlink > 1):
+            # Don't write through a link into the shared object store
+            os.remove(target)
+        self.bytes_copied += copier.copy_file(
+            source,
+            target,
+            backend=self.copy_backend,
+            buffer_size=self.buffer_size
+        )
+        self.files_copied += 1
+
+    def _package_file(self):
+        """Houdini Package file written in Development Mode.
+
+        :return: Path to the package file
+        :rtype: str
+        """
         package_name = "{0}.json".format(self.tool_name())
         tool_version = self.tool_version()
         if tool_version:
@@ -309,7 +1232,21 @@ class HTool(object):
                 self.tool_name(),
                 tool_version
             )
-        package_file = os.path.join(self.target_path(), package_name)
+        return os.path.join(self.target_path(), package_name)
+
+    def _add_json_package(self):
+        """Add a Houdini Package entry to the installation target.
+
+        Append the tool's source directory to ``HOUDINI_PATH`` so that
+        Houdini can pick up the tool while it still lives in a
+        convenient development area.
+
+        :return: Success
+        :rtype: bool
+        """
+        success = False
+
+        package_file = self._package_file()
         if os.path.isfile(package_file) and not self.force:
             logger.warning("A Houdini Package with this name already exists.")
             input_ = None
@@ -341,9 +1278,7 @@ class HTool(object):
         package_entry = {"path": self.source_path()}
         if self.append_otlscan:
             logger.debug("Appending to HOUDINI_OTLSCAN_PATH")
-            otls_dir = os.path.join(self.source_path(), "otls")
-            hda_dir = os.path.join(self.source_path(), "hda")
-            append_dirs = [x for x in [otls_dir, hda_dir] if os.path.isdir(x)]
+            append_dirs = otls.otls_dirs(self.source_path())
             if append_dirs:
                 otlscan = [
                     {
@@ -354,23 +1289,59 @@ class HTool(object):
                     }
                 ]
                 package_entry["env"] = otlscan
+        self._index_otls(otls.otls_dirs(self.source_path()))
 
         if self.dry_run:
             logger.debug("Package contents: {0}".format(package_entry))
             return True
 
-        with open(package_file, "w") as file_:
+        # Write beside the package and rename over it, so Houdini and
+        # other deploys never see a half written file.
+        temp = "{0}.{1}.tmp".format(package_file, os.getpid())
+        with open(temp, "w") as file_:
             json.dump(package_entry, file_, indent=4)
 
-        with open(package_file, "r") as file_:
+        with open(temp, "r") as file_:
             data = json.load(file_)
             if data == package_entry:
                 logger.debug("JSON readback successful")
                 success = True
 
+        if success:
+            if os.name == "nt" and os.path.isfile(package_file):
+                os.remove(package_file)
+            os.rename(temp, package_file)
+            self.packages_written += 1
+        else:
+            os.remove(temp)
         return success
 
-    def _find_user_prefs_dir(self, version=None):
+    def _index_otls(self, dirs):
+        """Report library counts and index Digital Asset directories.
+
+        New indexes are only written when the tool was created with
+        ``index_otls``, but an index an earlier deploy wrote is always
+        refreshed, or Houdini would skip the libraries just copied. In
+        Development Mode the directories are the tool's source, so they
+        are only counted, never indexed.
+
+        :param dirs: ``otls/`` directories to index
+        :type dirs: list
+        """
+        if self.develop:
+            if self.index_otls:
+                for otls_dir, count in sorted(otls.hda_counts(dirs).items()):
+                    logger.info("{0}: {1} libraries".format(otls_dir, count))
+            return
+        for otls_dir, count in sorted(otls.hda_counts(dirs).items()):
+            if not self.index_otls:
+                otls.refresh_index(otls_dir, dry_run=self.dry_run)
+                continue
+            logger.info("{0}: {1} libraries".format(otls_dir, count))
+            otls.build_index(otls_dir, dry_run=self.dry_run)
+
+    @staticmethod
+    def _find_user_prefs_dir(version=None):
         """Find the user's Houdini Preferences directory.
 
         Use the version override if provided, otherwise search for
@@ -389,12 +1360,12 @@ class HTool(object):
         :rtype: str
         """
         user_prefs = os.getenv("HOUDINI_USER_PREF_DIR")
-        version = version if version else self._latest_houdini_version()
+        version = version if version else HTool._latest_houdini_version()
         logger.debug("Searching Houdini version: {0}".format(version))
         if not user_prefs:
             user_prefs = os.path.join(
                 os.path.expanduser("~"),
-                "houdini{0}".format(self._latest_houdini_version())
+                "houdini{0}".format(HTool._latest_houdini_version())
             )
         elif "__HVER__" in user_prefs:
             user_prefs = user_prefs.replace("__HVER__", version)
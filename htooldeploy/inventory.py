@@ -0,0 +1,378 @@
+"""Install Inventory
+
+Finding out which tools, and which versions of them, are installed on a
+host would otherwise mean walking every site directory and reading every
+Houdini Package. Instead, every install, Development Mode package and
+uninstall is recorded in a small SQLite database, which can be queried
+straight away.
+::
+    htooldeploy --list "*"
+    htooldeploy --list "test_*" /opt/houdini
+    htooldeploy --uninstall test_tool
+
+The database lives in ``~/.htooldeploy/inventory.db`` by default. Set
+``HTOOLDEPLOY_INVENTORY``, or use ``--inventory``, to keep it elsewhere.
+
+Tools installed into the same target share its site directories, so
+uninstalling one leaves alone any path another tool in the target also
+recorded, such as a shared ``python2.7libs/__init__.py``.
+"""
+import logging
+import os
+import shutil
+import socket
+import time
+
+from . import otls
+from .database import connect
+from .locking import DeployLock, LockTimeout
+
+logger = logging.getLogger("htooldeploy")
+
+INVENTORY_VARIABLE = "HTOOLDEPLOY_INVENTORY"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS installs (
+    tool TEXT NOT NULL,
+    target TEXT NOT NULL,
+    version TEXT,
+    mode TEXT NOT NULL,
+    source TEXT,
+    host TEXT,
+    files INTEGER,
+    bytes INTEGER,
+    installed REAL,
+    PRIMARY KEY (tool, target)
+);
+CREATE INDEX IF NOT EXISTS installs_target ON installs (target);
+CREATE TABLE IF NOT EXISTS paths (
+    tool TEXT NOT NULL,
+    target TEXT NOT NULL,
+    relpath TEXT NOT NULL,
+    PRIMARY KEY (tool, target, relpath)
+);
+"""
+COLUMNS = [
+    "tool", "target", "version", "mode", "source", "host", "files", "bytes",
+    "installed"
+]
+
+
+def default_path():
+    """Location of the inventory database.
+
+    :return: Path to the database
+    :rtype: str
+    """
+    return os.environ.get(INVENTORY_VARIABLE) or os.path.join(
+        os.path.expanduser("~"), ".htooldeploy", "inventory.db"
+    )
+
+
+class Inventory(object):
+    """SQLite record of the tools installed on this host"""
+
+    def __init__(self, path=None):
+        """Constructor for Inventory.
+
+        :param path: Database file, defaults to :func:`default_path`
+        :type path: str, optional
+        """
+        super(Inventory, self).__init__()
+        self.path = os.path.abspath(path or default_path())
+        self._connection = None
+
+    def __repr__(self):
+        return "Inventory {0}".format(self.path)
+
+    def connection(self):
+        """Open the database, creating it if needed.
+
+        :return: Database connection
+        :rtype: :class:`sqlite3.Connection`
+        """
+        if self._connection is None:
+            self._connection = connect(self.path, SCHEMA)
+        return self._connection
+
+    def close(self):
+        """Close the database."""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # pylint: disable=too-many-arguments
+    def record(self, tool, target, mode, relpaths, version=None,
+               source=None, size=0):
+        """Record an install, replacing any earlier one of the tool.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        :param mode: How the tool was installed, such as ``copy``,
+            ``develop`` or ``slots``
+        :type mode: str
+        :param relpaths: Files and directories the install created,
+            relative to the target
+        :type relpaths: list
+        :param version: Tool version, defaults to None
+        :type version: str, optional
+        :param source: Tool repo installed from, defaults to None
+        :type source: str, optional
+        :param size: Bytes written, defaults to 0
+        :type size: int, optional
+        """
+        target = os.path.abspath(target)
+        relpaths = sorted(set(x.replace("\\", "/") for x in relpaths))
+        with self.connection() as connection:
+            self._delete(connection, tool, target)
+            connection.execute(
+                "INSERT INTO installs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (tool, target, version, mode, source, socket.gethostname(),
+                 len(relpaths), size, time.time())
+            )
+            connection.executemany(
+                "INSERT INTO paths VALUES (?, ?, ?)",
+                [(tool, target, x) for x in relpaths]
+            )
+        logger.debug(
+            "Recorded {0} in {1}".format(tool, self.path)
+        )
+
+    def remove(self, tool, target):
+        """Forget an install.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        """
+        with self.connection() as connection:
+            self._delete(connection, tool, os.path.abspath(target))
+
+    def query(self, tool="*", target=None, version=None):
+        """Find installs.
+
+        :param tool: Glob matching tool names, defaults to "*"
+        :type tool: str, optional
+        :param target: Only installs in this target, defaults to None
+        :type target: str, optional
+        :param version: Only this version, defaults to None
+        :type version: str, optional
+        :return: One dictionary per install, keyed by :data:`COLUMNS`
+        :rtype: list
+        """
+        sql = "SELECT {0} FROM installs WHERE tool GLOB ?".format(
+            ", ".join(COLUMNS)
+        )
+        values = [tool]
+        if target:
+            sql += " AND target = ?"
+            values.append(os.path.abspath(target))
+        if version:
+            sql += " AND version = ?"
+            values.append(version)
+        sql += " ORDER BY tool, target"
+        rows = self.connection().execute(sql, values).fetchall()
+        return [dict(zip(COLUMNS, x)) for x in rows]
+
+    def paths(self, tool, target):
+        """Files and directories created by an install.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        :return: Paths relative to the target
+        :rtype: list
+        """
+        rows = self.connection().execute(
+            "SELECT relpath FROM paths WHERE tool = ? AND target = ? "
+            "ORDER BY relpath",
+            (tool, os.path.abspath(target))
+        ).fetchall()
+        return [x[0] for x in rows]
+
+    def shared_paths(self, tool, target):
+        """Paths of an install that other tools in the target also own.
+
+        A path is shared if another tool recorded it, or recorded a path
+        inside it or a directory holding it.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        :return: Shared paths relative to the target
+        :rtype: set
+        """
+        rows = self.connection().execute(
+            "SELECT relpath FROM paths WHERE tool != ? AND target = ?",
+            (tool, os.path.abspath(target))
+        ).fetchall()
+        others = set(x[0] for x in rows)
+        shared = set()
+        for relpath in self.paths(tool, target):
+            prefix = relpath + "/"
+            parts = relpath.split("/")
+            parents = ("/".join(parts[:x]) for x in range(1, len(parts)))
+            if relpath in others or any(x in others for x in parents) \
+                    or any(x.startswith(prefix) for x in others):
+                shared.add(relpath)
+        return shared
+
+    def report(self, tool="*", target=None):
+        """Log the installs matching a query.
+
+        :param tool: Glob matching tool names, defaults to "*"
+        :type tool: str, optional
+        :param target: Only installs in this target, defaults to None
+        :type target: str, optional
+        :return: Matching installs
+        :rtype: list
+        """
+        installs = self.query(tool, target=target)
+        for install in installs:
+            logger.info(
+                "{tool}\t{version}\t{mode}\t{target}\t{files} paths\t"
+                "{installed}".format(
+                    **dict(
+                        install,
+                        version=install["version"] or "-",
+                        installed=time.strftime(
+                            "%Y-%m-%d %H:%M",
+                            time.localtime(install["installed"]))
+                    )
+                )
+            )
+        if not installs:
+            logger.info("No installs of {0} recorded in {1}".format(
+                tool, self.path))
+        return installs
+
+    def uninstall(self, tool, target, dry_run=False, lock_timeout=None):
+        """Remove everything an install created, then forget it.
+
+        Directories left empty are removed too, apart from the site
+        directories at the top of the target. Paths other tools in the
+        target also own are kept. The tool's deploy lock is held
+        throughout, so an uninstall never races a deploy.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        :param dry_run: Only log what would be removed, defaults to False
+        :type dry_run: bool, optional
+        :param lock_timeout: Seconds to wait for the deploy lock,
+            defaults to waiting as long as it takes
+        :type lock_timeout: float, optional
+        :return: Success
+        :rtype: bool
+        """
+        target = os.path.abspath(target)
+        if not self.query(tool, target=target):
+            logger.error("No install of {0} recorded in {1}".format(
+                tool, target))
+            return False
+        try:
+            with DeployLock(target, tool, timeout=lock_timeout):
+                self._uninstall(tool, target, dry_run)
+        except LockTimeout as error:
+            logger.error("Another deploy is running: {0}".format(error))
+            return False
+        except OSError as error:
+            logger.error("Unable to uninstall {0}: {1}".format(tool, error))
+            return False
+        logger.info("Uninstalled {0} from {1}".format(tool, target))
+        return True
+
+    def _uninstall(self, tool, target, dry_run):
+        """Remove the paths of an install that no other tool owns.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Absolute installation target
+        :type target: str
+        :param dry_run: Only log what would be removed
+        :type dry_run: bool
+        """
+        shared = self.shared_paths(tool, target)
+        for relpath in self.paths(tool, target):
+            path = os.path.join(target, relpath)
+            if relpath in shared:
+                logger.info("Keeping {0}, which other tools use".format(
+                    path))
+                continue
+            logger.debug("Removing {0}".format(path))
+            if dry_run:
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.remove(path)
+            if path.endswith(".py"):
+                _remove_bytecode(path)
+            _remove_empty_parents(os.path.dirname(path), target)
+        for otls_dir in otls.otls_dirs(target):
+            otls.refresh_index(otls_dir, dry_run=dry_run)
+        if not dry_run:
+            self.remove(tool, target)
+
+    @staticmethod
+    def _delete(connection, tool, target):
+        """Delete the rows of an install.
+
+        :param connection: Database connection
+        :type connection: :class:`sqlite3.Connection`
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Absolute installation target
+        :type target: str
+        """
+        for table in ["installs", "paths"]:
+            connection.execute(
+                "DELETE FROM {0} WHERE tool = ? AND target = ?".format(table),
+                (tool, target)
+            )
+
+
+def _remove_bytecode(source):
+    """Remove the bytecode compiled from a python source.
+
+    Both Python 2 ``.pyc`` files beside the source and Python 3 files
+    in ``__pycache__/`` are removed, along with ``__pycache__/`` if it
+    is left empty.
+
+    :param source: Path to the ``.py`` file
+    :type source: str
+    """
+    for suffix in ["c", "o"]:
+        if os.path.isfile(source + suffix):
+            os.remove(source + suffix)
+    parent, name = os.path.split(source)
+    cache_dir = os.path.join(parent, "__pycache__")
+    if not os.path.isdir(cache_dir):
+        return
+    prefix = "{0}.".format(name[:-len(".py")])
+    for file_ in os.listdir(cache_dir):
+        if file_.startswith(prefix) and file_.endswith((".pyc", ".pyo")):
+            os.remove(os.path.join(cache_dir, file_))
+    if not os.listdir(cache_dir):
+        os.rmdir(cache_dir)
+
+
+def _remove_empty_parents(path, target):
+    """Remove empty directories, stopping at the site directories.
+
+    :param path: Directory to start at
+    :type path: str
+    :param target: Installation target
+    :type target: str
+    """
+    while path.startswith(target + os.sep) \
+            and os.path.dirname(path) != target:
+        if not os.path.isdir(path) or os.listdir(path):
+            return
+        os.rmdir(path)
+        path = os.path.dirname(path)
@@ -0,0 +1,199 @@
+"""Install Journal
+
+A large install that is killed part way through, by a preempted node or
+a dropped ``ssh`` session, would otherwise start again from nothing. An
+:class:`InstallJournal` records every file as it is copied, so the next
+run skips the files that were already finished and only copies the rest.
+::
+    <target>/
+        .htooldeploy_journal/
+            my_tool.journal
+
+A file is only skipped if its source hasn't changed since it was
+copied, and its target still has the right size and modification time.
+Finished files are written to the journal in batches of
+:data:`SYNC_INTERVAL`, so a copy costs no extra writes on network
+storage. An interrupted install loses at most one batch, and copies
+those files again. The journal is removed once an install finishes.
+::
+    htooldeploy --no-journal ~/dev/test_tool
+"""
+import errno
+import json
+import logging
+import os
+
+logger = logging.getLogger("htooldeploy")
+
+JOURNAL_DIR = ".htooldeploy_journal"
+SYNC_INTERVAL = 64
+
+
+class InstallJournal(object):
+    """Checkpoint the progress of one install into one target"""
+
+    def __init__(self, target_dir, tool_name):
+        """Constructor for InstallJournal.
+
+        Progress left behind by an interrupted install is loaded.
+
+        :param target_dir: Installation target
+        :type target_dir: str
+        :param tool_name: Name of the tool
+        :type tool_name: str
+        """
+        super(InstallJournal, self).__init__()
+        self.target_dir = os.path.abspath(target_dir)
+        self.path = os.path.join(
+            self.target_dir, JOURNAL_DIR, "{0}.journal".format(tool_name)
+        )
+        self.finished = dict()
+        self.in_flight = None
+        self._file = None
+        self._pending = list()
+        self._load()
+
+    def __repr__(self):
+        return "Install journal {0}".format(self.path)
+
+    def __len__(self):
+        return len(self.finished)
+
+    def done(self, source, target):
+        """Whether a file was already copied by an interrupted install.
+
+        :param source: Source file
+        :type source: str
+        :param target: Target file
+        :type target: str
+        :return: File can be skipped
+        :rtype: bool
+        """
+        entry = self.finished.get(self._relpath(target))
+        if not entry:
+            return False
+        try:
+            source_stat = os.stat(source)
+            target_stat = os.stat(target)
+        except OSError:
+            return False
+        return (
+            entry == [source_stat.st_size, int(source_stat.st_mtime)]
+            and target_stat.st_size == source_stat.st_size
+            and int(target_stat.st_mtime) == int(source_stat.st_mtime)
+        )
+
+    def start(self, target):
+        """Note that a file is about to be copied.
+
+        Nothing is written, a file that isn't finished is copied again
+        anyway.
+
+        :param target: Target file
+        :type target: str
+        """
+        self.in_flight = self._relpath(target)
+
+    def finish(self, source, target):
+        """Record that a file has been copied.
+
+        :param source: Source file
+        :type source: str
+        :param target: Target file
+        :type target: str
+        """
+        stat = os.stat(source)
+        self.in_flight = None
+        self._write({
+            "done": self._relpath(target),
+            "size": stat.st_size,
+            "mtime": int(stat.st_mtime)
+        })
+
+    def complete(self):
+        """Remove the journal once the install has finished."""
+        self.close()
+        for path in [self.path, os.path.dirname(self.path)]:
+            try:
+                if os.path.isdir(path):
+                    os.rmdir(path)
+                elif os.path.exists(path):
+                    os.remove(path)
+            except OSError as error:
+                # Other tools may still have journals in the directory
+                if error.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+
+    def close(self):
+        """Flush the journal to disk and close it."""
+        self._flush()
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+
+    def _relpath(self, target):
+        """Path of a target file relative to the installation target.
+
+        :param target: Target file
+        :type target: str
+        :return: Relative path with forward slashes
+        :rtype: str
+        """
+        relpath = os.path.relpath(os.path.abspath(target), self.target_dir)
+        return relpath.replace("\\", "/")
+
+    def _load(self):
+        """Read the progress of an interrupted install, if any."""
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, "r") as file_:
+            for line in file_:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The last line may have been cut short
+                    continue
+                if "start" in entry:
+                    self.in_flight = entry["start"]
+                elif "done" in entry:
+                    self.finished[entry["done"]] = [
+                        entry["size"], entry["mtime"]
+                    ]
+                    if self.in_flight == entry["done"]:
+                        self.in_flight = None
+        if self.in_flight:
+            self.finished.pop(self.in_flight, None)
+        logger.info(
+            "Resuming from {0} files already copied".format(
+                len(self.finished))
+        )
+        if self.in_flight:
+            logger.debug("Copying {0} again".format(self.in_flight))
+
+    def _write(self, entry):
+        """Queue an entry for the journal.
+
+        Entries are written and synced to disk every
+        :data:`SYNC_INTERVAL` entries, and when the journal is closed.
+
+        :param entry: Journal entry
+        :type entry: dict
+        """
+        self._pending.append(json.dumps(entry) + "\n")
+        if len(self._pending) >= SYNC_INTERVAL:
+            self._flush()
+
+    def _flush(self):
+        """Write and sync the queued entries in a single write."""
+        if not self._pending:
+            return
+        if self._file is None:
+            parent = os.path.dirname(self.path)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            self._file = open(self.path, "a")
+        self._file.write("".join(self._pending))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = list()
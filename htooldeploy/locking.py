@@ -0,0 +1,198 @@
+"""Deploy Locking
+
+Two deploys into the same target at the same time, such as a CI job and
+an artist, can interleave their copies and package writes. A
+:class:`DeployLock` is taken for the duration of an install. Locks are
+scoped to a target *and* a tool, so deploys of different tools still run
+side by side while deploys of the same tool wait their turn.
+
+Some files are shared by every tool in a target, such as the
+``OPlibraries`` index, the bytecode and ``hotl`` manifests, and compiled
+python libraries. Steps that write them also take the target's
+:data:`SHARED_LOCK`, for as short a time as possible.
+::
+    <target>/
+        .htooldeploy_locks/
+            .shared.lock
+            my_tool.lock
+            other_tool.lock
+
+Only the ``.htooldeploy_locks/`` directory is created, never the target
+itself, so a mistyped target isn't created by taking a lock on it.
+
+The lock is held with ``flock`` (``msvcrt.locking`` on Windows), so it
+is released by the operating system if the process dies.
+::
+    htooldeploy --lock-timeout 60 ~/dev/test_tool
+"""
+import errno
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt  # pylint: disable=import-error
+
+logger = logging.getLogger("htooldeploy")
+
+LOCKS_DIR = ".htooldeploy_locks"
+SHARED_LOCK = ".shared"
+POLL_INTERVAL = 0.05
+MAX_POLL_INTERVAL = 1.0
+
+
+class LockTimeout(Exception):
+    """The lock could not be taken in time"""
+
+
+class DeployLock(object):
+    """Cross-process lock on one tool in one installation target"""
+
+    def __init__(self, target_dir, tool_name, timeout=None):
+        """Constructor for DeployLock.
+
+        :param target_dir: Installation target
+        :type target_dir: str
+        :param tool_name: Name of the tool, or :data:`SHARED_LOCK`
+        :type tool_name: str
+        :param timeout: Seconds to wait for the lock. None waits for as
+            long as it takes, 0 fails straight away if the lock is held,
+            defaults to None
+        :type timeout: float, optional
+        """
+        super(DeployLock, self).__init__()
+        self.path = os.path.join(
+            os.path.abspath(target_dir), LOCKS_DIR,
+            "{0}.lock".format(tool_name)
+        )
+        self.timeout = timeout
+        self.attempts = 0
+        self.wait_seconds = 0.0
+        self._file = None
+
+    def __repr__(self):
+        return "Deploy lock {0}".format(self.path)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+    @property
+    def contended(self):
+        """Whether the lock was held by someone else when first tried.
+
+        :return: Lock was contended
+        :rtype: bool
+        """
+        return self.attempts > 1
+
+    def acquire(self):
+        """Take the lock, waiting according to the timeout.
+
+        :raises LockTimeout: The lock is still held after the timeout
+        :raises OSError: The target doesn't exist
+        """
+        parent = os.path.dirname(self.path)
+        if not os.path.isdir(parent):
+            try:
+                os.mkdir(parent)
+            except OSError as error:
+                if error.errno != errno.EEXIST:
+                    raise
+        self._file = open(self.path, "a+")
+        start = time.time()
+        interval = POLL_INTERVAL
+        while True:
+            self.attempts += 1
+            if _try_lock(self._file):
+                break
+            elapsed = time.time() - start
+            if self.timeout is not None and elapsed >= self.timeout:
+                self.wait_seconds = elapsed
+                holder = self.holder()
+                self._file.close()
+                self._file = None
+                raise LockTimeout(
+                    "{0} still held by {1} after {2:.1f}s".format(
+                        self.path, holder, elapsed)
+                )
+            if self.attempts == 2:
+                logger.info(
+                    "Waiting for {0} held by {1}".format(
+                        self.path, self.holder())
+                )
+            if self.timeout is not None:
+                interval = min(interval, self.timeout - elapsed)
+            time.sleep(max(interval, 0))
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+        self.wait_seconds = time.time() - start
+
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write("{0}\n".format(os.getpid()))
+        self._file.flush()
+        logger.debug(
+            "Locked {0} after {1} attempts ({2:.2f}s)".format(
+                self.path, self.attempts, self.wait_seconds)
+        )
+
+    def release(self):
+        """Release the lock, if held."""
+        if self._file is None:
+            return
+        _unlock(self._file)
+        self._file.close()
+        self._file = None
+
+    def holder(self):
+        """Process ID written by whoever holds the lock.
+
+        :return: Process ID, "unknown" if it can't be read
+        :rtype: str
+        """
+        try:
+            with open(self.path, "r") as file_:
+                return file_.read().strip() or "unknown"
+        except (IOError, OSError):
+            return "unknown"
+
+
+def _try_lock(file_):
+    """Take an exclusive lock on an open file without blocking.
+
+    :param file_: Lock file
+    :type file_: file
+    :return: Lock was taken
+    :rtype: bool
+    """
+    try:
+        if fcntl:
+            fcntl.flock(file_.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            file_.seek(0)
+            msvcrt.locking(file_.fileno(), msvcrt.LK_NBLCK, 1)
+    except (IOError, OSError) as error:
+        if error.errno in (errno.EAGAIN, errno.EACCES, errno.EWOULDBLOCK,
+                           errno.EDEADLK):
+            return False
+        raise
+    return True
+
+
+def _unlock(file_):
+    """Release a lock taken with :func:`_try_lock`.
+
+    :param file_: Lock file
+    :type file_: file
+    """
+    if fcntl:
+        fcntl.flock(file_.fileno(), fcntl.LOCK_UN)
+    else:
+        file_.seek(0)
+        msvcrt.locking(file_.fileno(), msvcrt.LK_UNLCK, 1)
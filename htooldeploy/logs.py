@@ -0,0 +1,229 @@
+"""Log Pipeline
+
+Writing every log record straight to the console and the log file
+blocks the thread that logged it until the write is done, which slows a
+large copy down at high verbosity. Instead, records are put on a queue
+by a :class:`QueueHandler`, and a :class:`QueueListener` thread formats
+and writes them, so logging costs the copy loop little more than a
+queue append.
+
+A new log file is written in ``/tmp/htooldeploy/`` for every run. Old
+log files are removed once they are older than ``--keep-logs`` days, or
+once the directory holds more than :data:`MAX_LOG_BYTES`.
+::
+    htooldeploy --keep-logs 3 -v 3 ~/dev/test_tool
+"""
+import logging
+import os
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue  # pylint: disable=import-error
+
+try:
+    from logging.handlers import QueueHandler as _QueueHandler
+    from logging.handlers import QueueListener
+except ImportError:  # Python 2
+    _QueueHandler = None
+    QueueListener = None
+
+logger = logging.getLogger("htooldeploy")
+
+LOG_DIR = "/tmp/htooldeploy/"
+KEEP_DAYS = 14
+MAX_LOG_BYTES = 256 * 1024 * 1024
+
+
+if _QueueHandler is None:
+    class _QueueHandler(logging.Handler):
+        """Put log records on a queue"""
+
+        def __init__(self, queue_):
+            """Constructor for QueueHandler.
+
+            :param queue_: Queue to put records on
+            :type queue_: :class:`Queue.Queue`
+            """
+            logging.Handler.__init__(self)
+            self.queue = queue_
+
+        def emit(self, record):
+            """Put a record on the queue.
+
+            :param record: Record to put
+            :type record: :class:`logging.LogRecord`
+            """
+            try:
+                self.queue.put_nowait(self.prepare(record))
+            except Exception:  # pylint: disable=broad-except
+                self.handleError(record)
+
+
+if QueueListener is None:
+    class QueueListener(object):
+        """Pass records from a queue to handlers, on a thread"""
+
+        _sentinel = None
+
+        def __init__(self, queue_, *handlers, **kwargs):
+            """Constructor for QueueListener.
+
+            :param queue_: Queue to take records from
+            :type queue_: :class:`Queue.Queue`
+            :param handlers: Handlers to pass records to
+            :type handlers: :class:`logging.Handler`
+            :param respect_handler_level: Only pass records at or above
+                each handler's level, defaults to False
+            :type respect_handler_level: bool, optional
+            """
+            super(QueueListener, self).__init__()
+            self.queue = queue_
+            self.handlers = handlers
+            self.respect_handler_level = kwargs.get(
+                "respect_handler_level", False
+            )
+            self._thread = None
+
+        def start(self):
+            """Start passing records on."""
+            self._thread = threading.Thread(target=self._monitor)
+            self._thread.daemon = True
+            self._thread.start()
+
+        def stop(self):
+            """Pass on every queued record, then stop."""
+            self.queue.put_nowait(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+        def handle(self, record):
+            """Pass a record to the handlers.
+
+            :param record: Record to handle
+            :type record: :class:`logging.LogRecord`
+            """
+            for handler in self.handlers:
+                if not self.respect_handler_level \
+                        or record.levelno >= handler.level:
+                    handler.handle(record)
+
+        def _monitor(self):
+            """Handle records until the sentinel is taken."""
+            while True:
+                record = self.queue.get()
+                if record is self._sentinel:
+                    break
+                self.handle(record)
+
+
+class QueueHandler(_QueueHandler):
+    """Put log records on a queue, leaving formatting to the listener.
+
+    The standard handler formats each record before queueing it, in the
+    thread that logged it. The queue here never leaves the process, so
+    the record is queued as it is and formatted on the listener thread.
+    """
+
+    def prepare(self, record):
+        """Prepare a record for the queue.
+
+        :param record: Record to prepare
+        :type record: :class:`logging.LogRecord`
+        :return: The same record
+        :rtype: :class:`logging.LogRecord`
+        """
+        return record
+
+
+class LogPipeline(object):
+    """Queue between a logger and its handlers"""
+
+    def __init__(self, target_logger, handlers):
+        """Constructor for LogPipeline.
+
+        :param target_logger: Logger to take records from
+        :type target_logger: :class:`logging.Logger`
+        :param handlers: Handlers that write the records
+        :type handlers: list
+        """
+        super(LogPipeline, self).__init__()
+        self.logger = target_logger
+        self.queue = queue.Queue(-1)
+        self.handler = QueueHandler(self.queue)
+        self.listener = QueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self.running = False
+
+    def __repr__(self):
+        return "Log pipeline for {0}".format(self.logger.name)
+
+    def start(self):
+        """Start the listener and route the logger through the queue."""
+        self.listener.start()
+        self.logger.addHandler(self.handler)
+        self.running = True
+
+    def stop(self):
+        """Write every queued record and stop the listener.
+
+        Safe to call more than once.
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.logger.removeHandler(self.handler)
+        self.listener.stop()
+
+
+def prune(log_dir=LOG_DIR, keep_days=KEEP_DAYS, max_bytes=MAX_LOG_BYTES,
+          keep=()):
+    """Remove old log files.
+
+    Files older than ``keep_days`` are removed first. If the rest still
+    take up more than ``max_bytes``, the oldest of them are removed too.
+
+    :param log_dir: Directory holding the log files, defaults to
+        :data:`LOG_DIR`
+    :type log_dir: str, optional
+    :param keep_days: Age in days to keep files for, defaults to 14
+    :type keep_days: float, optional
+    :param max_bytes: Total size of files to keep, defaults to 256MB
+    :type max_bytes: int, optional
+    :param keep: Files never to remove, such as the current log file
+    :type keep: list, optional
+    :return: Files removed
+    :rtype: list
+    """
+    if not os.path.isdir(log_dir):
+        return list()
+    keep = set(os.path.abspath(x) for x in keep)
+    files = list()
+    for name in os.listdir(log_dir):
+        path = os.path.abspath(os.path.join(log_dir, name))
+        if not name.endswith(".log") or path in keep \
+                or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        files.append((stat.st_mtime, stat.st_size, path))
+    files.sort(reverse=True)
+
+    oldest = time.time() - keep_days * 24 * 60 * 60
+    total = sum(os.path.getsize(x) for x in keep if os.path.isfile(x))
+    removed = list()
+    for mtime, size, path in files:
+        if mtime >= oldest and total + size <= max_bytes:
+            total += size
+            continue
+        try:
+            os.remove(path)
+        except OSError as error:
+            logger.debug("Unable to remove {0}: {1}".format(path, error))
+            continue
+        removed.append(path)
+    if removed:
+        logger.debug("Removed {0} old log files".format(len(removed)))
+    return removed
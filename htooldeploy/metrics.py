@@ -0,0 +1,268 @@
+"""Deploy Metrics
+
+Each run can export what it did, so deploy times and failures can be
+trended across every host:
+
+``--metrics-dir``
+    Writes ``htooldeploy_<tool>_<target>.prom`` into a directory read by
+    the node exporter's textfile collector, with the target's path
+    separators replaced by underscores. Each target of a tool gets its
+    own file. Gauges describe the last run, and the run and failure
+    counters carry on from the previous file.
+``--metrics-log``
+    Appends one JSON object per run to a file, for log shippers.
+::
+    htooldeploy --metrics-dir /var/lib/node_exporter ~/dev/test_tool
+    htooldeploy --metrics-log /var/log/htooldeploy.jsonl ~/dev/test_tool
+
+Exporting never fails a deploy. Problems are logged as warnings.
+Deploys of the same tool update its textfile under a
+:class:`~htooldeploy.locking.DeployLock`, so no run is left out of the
+counters.
+"""
+import json
+import logging
+import os
+import re
+import socket
+import time
+
+from .locking import DeployLock, LockTimeout
+
+logger = logging.getLogger("htooldeploy")
+
+PREFIX = "htooldeploy"
+LOCK_TIMEOUT = 30
+GAUGES = [
+    ("duration_seconds", "Seconds the last deploy took"),
+    ("success", "Whether the last deploy succeeded"),
+    ("bytes_copied", "Bytes written or linked by the last deploy"),
+    ("files_copied", "Files written or linked by the last deploy"),
+    ("files_skipped", "Files the last deploy found already up to date"),
+    ("packages_written", "Houdini Packages written by the last deploy"),
+    ("lock_wait_seconds", "Seconds the last deploy waited for its lock"),
+    ("throttle_wait_seconds", "Seconds the last deploy was throttled"),
+    ("last_run_timestamp_seconds", "When the last deploy finished"),
+]
+COUNTERS = [
+    ("runs_total", "Deploys run"),
+    ("failures_total", "Deploys that failed"),
+]
+COUNTER_PATTERN = re.compile(
+    r"^{0}_(?P<name>\w+_total)(?:{{.*}})?\s+(?P<value>\S+)$".format(PREFIX)
+)
+
+
+class RunMetrics(object):
+    """Measurements of a single deploy"""
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, tool, target, mode, version=None):
+        """Constructor for RunMetrics.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param target: Installation target
+        :type target: str
+        :param mode: How the tool was installed, such as ``copy`` or
+            ``develop``
+        :type mode: str
+        :param version: Tool version, defaults to None
+        :type version: str, optional
+        """
+        super(RunMetrics, self).__init__()
+        self.tool = tool
+        self.target = target
+        self.mode = mode
+        self.version = version
+        self.host = socket.gethostname()
+        self.duration_seconds = 0.0
+        self.success = False
+        self.bytes_copied = 0
+        self.files_copied = 0
+        self.files_skipped = 0
+        self.packages_written = 0
+        self.lock_wait_seconds = 0.0
+        self.throttle_wait_seconds = 0.0
+        self.last_run_timestamp_seconds = time.time()
+
+    def __repr__(self):
+        return "Metrics for {0} in {1}".format(self.tool, self.target)
+
+    def as_dict(self):
+        """Every field of the run.
+
+        :return: Fields, keyed by name
+        :rtype: dict
+        """
+        values = dict(
+            tool=self.tool,
+            target=self.target,
+            mode=self.mode,
+            version=self.version,
+            host=self.host
+        )
+        for name, _ in GAUGES:
+            values[name] = getattr(self, name)
+        values["success"] = bool(self.success)
+        return values
+
+    def write_textfile(self, directory):
+        """Write the run for the Prometheus textfile collector.
+
+        The file is written beside its final name and renamed over it,
+        so the collector never reads a half written file. The counters
+        are read and rewritten while holding a lock on the file.
+
+        :param directory: Directory read by the collector
+        :type directory: str
+        :raises LockTimeout: Another run held the lock for too long
+        :return: Path to the file
+        :rtype: str
+        """
+        name = "{0}_{1}_{2}".format(
+            PREFIX, _file_name(self.tool), _file_name(self.target)
+        )
+        path = os.path.join(directory, "{0}.prom".format(name))
+        with DeployLock(directory, name, timeout=LOCK_TIMEOUT):
+            self._write_textfile(path)
+        return path
+
+    def _write_textfile(self, path):
+        """Update the counters in a textfile and write the run to it.
+
+        :param path: Textfile to write
+        :type path: str
+        """
+        counters = _read_counters(path)
+        counters["runs_total"] = counters.get("runs_total", 0) + 1
+        if not self.success:
+            counters["failures_total"] = counters.get("failures_total", 0) + 1
+
+        labels = _labels(tool=self.tool, target=self.target, mode=self.mode)
+        lines = list()
+        for name, help_ in GAUGES:
+            lines.extend(_metric(name, "gauge", help_, labels,
+                                 float(getattr(self, name))))
+        for name, help_ in COUNTERS:
+            lines.extend(_metric(name, "counter", help_,
+                                 _labels(tool=self.tool, target=self.target),
+                                 counters.get(name, 0)))
+
+        temp = "{0}.{1}.tmp".format(path, os.getpid())
+        with open(temp, "w") as file_:
+            file_.write("\n".join(lines) + "\n")
+        if os.name == "nt" and os.path.isfile(path):
+            os.remove(path)
+        os.rename(temp, path)
+
+    def append_json(self, path):
+        """Append the run to a JSON lines file.
+
+        :param path: File to append to
+        :type path: str
+        """
+        parent = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        line = json.dumps(self.as_dict(), sort_keys=True) + "\n"
+        with open(path, "a") as file_:
+            file_.write(line)
+
+    def export(self, textfile_dir=None, json_path=None):
+        """Write the run to every configured destination.
+
+        :param textfile_dir: Prometheus textfile collector directory,
+            defaults to None
+        :type textfile_dir: str, optional
+        :param json_path: JSON lines file, defaults to None
+        :type json_path: str, optional
+        """
+        for destination, write in [(textfile_dir, self.write_textfile),
+                                   (json_path, self.append_json)]:
+            if not destination:
+                continue
+            try:
+                write(destination)
+            except (IOError, OSError, LockTimeout) as error:
+                logger.warning("Unable to write metrics to {0}: {1}".format(
+                    destination, error))
+            else:
+                logger.debug("Wrote metrics to {0}".format(destination))
+
+
+def _read_counters(path):
+    """Counters from an earlier textfile.
+
+    :param path: Textfile to read
+    :type path: str
+    :return: Counter values, keyed by name without the prefix
+    :rtype: dict
+    """
+    counters = dict()
+    if not os.path.isfile(path):
+        return counters
+    with open(path, "r") as file_:
+        for line in file_:
+            match = COUNTER_PATTERN.match(line.strip())
+            if match:
+                try:
+                    counters[match.group("name")] = int(
+                        float(match.group("value")))
+                except ValueError:
+                    pass
+    return counters
+
+
+def _file_name(value):
+    """Make a value safe to use in a file name.
+
+    :param value: Tool name or target path
+    :type value: str
+    :return: Value with anything but word characters, dots and dashes
+        replaced by underscores
+    :rtype: str
+    """
+    return re.sub(r"[^\w.-]+", "_", value).strip("_")
+
+
+def _labels(**labels):
+    """Format Prometheus labels.
+
+    :param labels: Label values, keyed by label name
+    :type labels: str
+    :return: Labels in braces
+    :rtype: str
+    """
+    return "{{{0}}}".format(",".join(
+        "{0}=\"{1}\"".format(
+            key,
+            str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+            .replace("\n", "\\n")
+        )
+        for key, value in sorted(labels.items())
+    ))
+
+
+def _metric(name, kind, help_, labels, value):
+    """Lines of a Prometheus metric.
+
+    :param name: Metric name, without the prefix
+    :type name: str
+    :param kind: ``gauge`` or ``counter``
+    :type kind: str
+    :param help_: Description of the metric
+    :type help_: str
+    :param labels: Formatted labels
+    :type labels: str
+    :param value: Value
+    :type value: float
+    :return: Lines
+    :rtype: list
+    """
+    full_name = "{0}_{1}".format(PREFIX, name)
+    return [
+        "# HELP {0} {1}".format(full_name, help_),
+        "# TYPE {0} {1}".format(full_name, kind),
+        "{0}{1} {2}".format(full_name, labels, repr(value)),
+    ]
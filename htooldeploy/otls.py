@@ -0,0 +1,147 @@
+"""OTL Index
+
+Houdini opens every Digital Asset library it finds in an ``otls/``
+directory when it starts. Writing an ``OPlibraries`` index alongside the
+libraries tells Houdini exactly which files to load, and the per
+directory counts help spot tools that ship too many small libraries.
+"""
+import logging
+import os
+
+logger = logging.getLogger("htooldeploy")
+
+HDA_EXTENSIONS = (".hda", ".otl", ".hdanc", ".otlnc", ".hdalc", ".otllc")
+OTLS_DIRS = ["otls", "hda"]
+INDEX_FILE = "OPlibraries"
+INDEX_HEADER = "# Generated by htooldeploy"
+
+
+def otls_dirs(root):
+    """Find the Digital Asset directories in a site structured root.
+
+    :param root: Directory containing :ref:`Houdini Site Folders`
+    :type root: str
+    :return: Existing ``otls/`` and ``hda/`` directories
+    :rtype: list
+    """
+    dirs = [os.path.join(root, x) for x in OTLS_DIRS]
+    return [x for x in dirs if os.path.isdir(x)]
+
+
+def hda_files(otls_dir):
+    """List the Digital Asset libraries in a directory.
+
+    Expanded (ascii) libraries are directories, so both files and
+    directories with an HDA extension are included.
+
+    :param otls_dir: Directory to list
+    :type otls_dir: str
+    :return: Sorted library names
+    :rtype: list
+    """
+    return sorted(
+        x for x in os.listdir(otls_dir)
+        if x.lower().endswith(HDA_EXTENSIONS) and not x.startswith(".")
+    )
+
+
+def hda_counts(dirs):
+    """Count the Digital Asset libraries in each directory.
+
+    :param dirs: Directories to count
+    :type dirs: list
+    :return: Mapping of directory to library count
+    :rtype: dict
+    """
+    return dict((x, len(hda_files(x))) for x in dirs if os.path.isdir(x))
+
+
+def build_index(otls_dir, dry_run=False):
+    """Write an ``OPlibraries`` index for a directory.
+
+    The index is only rewritten if its contents would change, so
+    repeat deploys leave the file untouched. Hand-written indexes
+    (without the htooldeploy header) are never overwritten. The index is
+    written beside its final name and renamed over it, so Houdini never
+    reads a half written index.
+
+    :param otls_dir: Directory containing Digital Asset libraries
+    :type otls_dir: str
+    :param dry_run: Don't write anything, defaults to False
+    :type dry_run: bool, optional
+    :return: Path to the index, None if it was not written
+    :rtype: str, None
+    """
+    index_file = os.path.join(otls_dir, INDEX_FILE)
+    libraries = hda_files(otls_dir)
+    if not libraries:
+        logger.debug("No libraries to index in {0}".format(otls_dir))
+        return None
+    contents = "\n".join([INDEX_HEADER] + libraries) + "\n"
+
+    if os.path.isfile(index_file):
+        with open(index_file, "r") as file_:
+            existing = file_.read()
+        if existing == contents:
+            logger.debug("{0} is up to date".format(index_file))
+            return index_file
+        if not existing.startswith(INDEX_HEADER):
+            logger.warning(
+                "{0} was not created by htooldeploy. Skipping.".format(
+                    index_file)
+            )
+            return None
+
+    logger.info(
+        "Indexing {0} libraries in {1}".format(len(libraries), otls_dir)
+    )
+    if not dry_run:
+        temp = "{0}.{1}.tmp".format(index_file, os.getpid())
+        with open(temp, "w") as file_:
+            file_.write(contents)
+        if os.name == "nt" and os.path.isfile(index_file):
+            os.remove(index_file)
+        os.rename(temp, index_file)
+    return index_file
+
+
+def is_generated(index_file):
+    """Whether an index file was written by htooldeploy.
+
+    :param index_file: Path to an ``OPlibraries`` file
+    :type index_file: str
+    :return: Whether the file exists and starts with the htooldeploy
+        header
+    :rtype: bool
+    """
+    if not os.path.isfile(index_file):
+        return False
+    with open(index_file, "r") as file_:
+        return file_.readline().rstrip("\n") == INDEX_HEADER
+
+
+def refresh_index(otls_dir, dry_run=False):
+    """Bring an existing htooldeploy index up to date.
+
+    Directories without a generated index are left alone. Once an
+    ``otls/`` directory is indexed, Houdini only loads the libraries the
+    index lists, so any install or uninstall that changes the directory
+    has to refresh it, whether or not it asked for indexing. An index
+    with no libraries left is removed.
+
+    :param otls_dir: Directory containing Digital Asset libraries
+    :type otls_dir: str
+    :param dry_run: Don't write anything, defaults to False
+    :type dry_run: bool, optional
+    :return: Path to the index, None if there is none
+    :rtype: str, None
+    """
+    index_file = os.path.join(otls_dir, INDEX_FILE)
+    if not is_generated(index_file):
+        return None
+    if hda_files(otls_dir):
+        return build_index(otls_dir, dry_run=dry_run)
+    logger.info("Removing {0}, no libraries are left".format(index_file))
+    if not dry_run:
+        os.remove(index_file)
+    return None
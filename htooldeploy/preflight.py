@@ -0,0 +1,169 @@
+"""Pre-flight Checks
+
+Running out of disk space, or finding a directory that can't be written
+to, part way through a long install leaves the target half updated. The
+pre-flight check looks at every file that is about to be written before
+anything is copied:
+
+* Every file is counted, since an install rewrites every file, even
+  those that are already up to date.
+* The bytes each file adds over its existing target are added up per
+  filesystem, and checked against the free space of each filesystem
+  once. When installing from an object store, the store's filesystem
+  is checked instead, for the size of each file the store doesn't
+  already hold. Links into the store take no space.
+* Each directory that will be written to is checked for write access
+  once. Directories that don't exist yet are checked through the
+  nearest parent that does.
+* Existing target files are checked for write access, since they are
+  rewritten in place. Links, which are replaced instead, are not.
+::
+    htooldeploy --no-preflight ~/dev/test_tool
+"""
+import logging
+import os
+import shutil
+import stat
+
+logger = logging.getLogger("htooldeploy")
+
+HEADROOM = 16 * 1024 * 1024
+
+
+class PreflightReport(object):
+    """Outcome of a pre-flight check"""
+
+    def __init__(self):
+        super(PreflightReport, self).__init__()
+        self.files = 0
+        self.bytes = 0
+        self.problems = list()
+
+    def __nonzero__(self):
+        return not self.problems
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        if self.problems:
+            return "Pre-flight failed:\n\t{0}".format(
+                "\n\t".join(self.problems)
+            )
+        return "Pre-flight passed: {0} files, {1} bytes to write".format(
+            self.files, self.bytes
+        )
+
+
+def check(files, headroom=HEADROOM, store=None):
+    """Check that files can be written before writing any of them.
+
+    :param files: List of ``(source, target)`` file paths
+    :type files: list
+    :param headroom: Bytes to leave free on each filesystem, defaults
+        to 16MB
+    :type headroom: int, optional
+    :param store: Object store the targets will be linked from,
+        defaults to None
+    :type store: :class:`~htooldeploy.store.ObjectStore`, optional
+    :return: Report, which is False if there are problems
+    :rtype: :class:`PreflightReport`
+    """
+    # pylint: disable=too-many-locals
+    report = PreflightReport()
+    needed = dict()
+    checked = dict()
+    if store:
+        store_dir = _existing_parent(store.root)
+        _check_dir(store_dir, report)
+        store_device = os.stat(store_dir).st_dev
+        needed[store_device] = [store_dir, 0]
+        stored = set()
+    for source, target in files:
+        source_stat = os.stat(source)
+        try:
+            target_stat = os.lstat(target)
+        except OSError:
+            target_stat = None
+        report.files += 1
+        report.bytes += source_stat.st_size
+
+        parent = os.path.dirname(os.path.abspath(target))
+        if parent not in checked:
+            existing = _existing_parent(parent)
+            _check_dir(existing, report)
+            checked[parent] = (existing, os.stat(existing).st_dev)
+        existing, device = checked[parent]
+        if store:
+            key = store.key(source)
+            if key not in stored and not store.has(key):
+                needed[store_device][1] += source_stat.st_size
+            stored.add(key)
+            continue
+
+        if target_stat and (stat.S_ISLNK(target_stat.st_mode)
+                            or target_stat.st_nlink > 1):
+            # Links are removed and replaced, not written through
+            target_stat = None
+        if target_stat and not os.access(target, os.W_OK):
+            report.problems.append("No write access to {0}".format(target))
+        needed.setdefault(device, [existing, 0])
+        growth = source_stat.st_size
+        if target_stat:
+            growth = max(0, growth - target_stat.st_size)
+        needed[device][1] += growth
+
+    for path, size in needed.values():
+        free = free_space(path)
+        if free is not None and size + headroom > free:
+            report.problems.append(
+                "Not enough space on {0}: {1} bytes needed, {2} free".format(
+                    path, size + headroom, free)
+            )
+    return report
+
+
+def free_space(path):
+    """Bytes available to this user on the filesystem holding a path.
+
+    :param path: Existing path
+    :type path: str
+    :return: Free bytes, None if it can't be found
+    :rtype: int, None
+    """
+    disk_usage = getattr(shutil, "disk_usage", None)
+    if disk_usage:
+        return disk_usage(path).free
+    if hasattr(os, "statvfs"):
+        stat = os.statvfs(path)
+        return stat.f_bavail * stat.f_frsize
+    return None
+
+
+def _check_dir(path, report):
+    """Report a directory that can't be written to, once.
+
+    :param path: Existing directory
+    :type path: str
+    :param report: Report to add the problem to
+    :type report: :class:`PreflightReport`
+    """
+    problem = "No write access to {0}".format(path)
+    if not os.access(path, os.W_OK | os.X_OK) \
+            and problem not in report.problems:
+        report.problems.append(problem)
+
+
+def _existing_parent(path):
+    """Nearest directory that exists, starting with the path itself.
+
+    :param path: Directory
+    :type path: str
+    :return: Existing directory
+    :rtype: str
+    """
+    while not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
@@ -0,0 +1,317 @@
+"""Profiling Hooks
+
+When a deploy is much slower on one storage backend than another, the
+first question is where the time goes. Two options wrap the whole run:
+
+``--profile``
+    Runs under :mod:`cProfile`, writes the stats to a file that can be
+    loaded with :mod:`pstats` or a viewer such as snakeviz, and logs the
+    costliest calls.
+``--trace-io``
+    Counts and times every file system call made through :mod:`os` and
+    :func:`open`, grouped into categories such as ``stat``, ``open``,
+    ``read`` and ``write``, and logs a summary at the end.
+::
+    htooldeploy --profile /tmp/deploy.prof --trace-io ~/dev/test_tool
+
+Tracing replaces functions of :mod:`os` and the builtin :func:`open`
+while it is active, so it only measures calls made from Python.
+:func:`os.read` and :func:`os.write` are only counted for regular
+files, and :func:`io.open` and files opened from a file descriptor
+aren't traced, so the pipes :mod:`subprocess` uses never end up in the
+``read`` and ``write`` totals. Any file opened by path with
+:func:`open` while tracing is counted, including a log file.
+
+:mod:`cProfile` only profiles the thread that started it. Work done in
+worker threads, such as the copies of ``--push`` and the conversions of
+``--collapse-hdas``, is missing from the profile, though its file
+system calls are still traced.
+"""
+import logging
+import numbers
+import os
+import stat
+import threading
+import timeit
+
+try:
+    import builtins
+except ImportError:  # Python 2
+    import __builtin__ as builtins  # pylint: disable=import-error
+
+try:
+    from StringIO import StringIO
+except ImportError:  # Python 3
+    from io import StringIO
+
+import cProfile
+import pstats
+
+logger = logging.getLogger("htooldeploy")
+
+CATEGORIES = {
+    "stat": ["stat", "lstat", "fstat", "access"],
+    "list": ["listdir", "scandir"],
+    "open": ["open"],
+    "read": ["read"],
+    "write": ["write"],
+    "copy": ["sendfile", "copy_file_range"],
+    "metadata": [
+        "rename", "replace", "remove", "unlink", "rmdir", "mkdir",
+        "symlink", "link", "readlink", "chmod", "utime"
+    ],
+}
+SIZED = ["read", "write", "copy"]
+DESCRIPTOR_CATEGORIES = ["read", "write"]
+TOP_CALLS = 20
+
+_fstat = os.fstat
+
+
+class IOTracer(object):
+    """Count and time file system calls, by category"""
+
+    def __init__(self):
+        super(IOTracer, self).__init__()
+        self.stats = dict()
+        self._originals = list()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "IOTracer({0} categories)".format(len(self.stats))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Replace the file system functions with traced ones."""
+        for category, names in sorted(CATEGORIES.items()):
+            for name in names:
+                function = getattr(os, name, None)
+                if function is not None:
+                    self._patch(os, name, self._wrap(
+                        category, function,
+                        descriptor=category in DESCRIPTOR_CATEGORIES
+                    ))
+        self._patch(builtins, "open", self._wrap_open(builtins.open))
+
+    def stop(self):
+        """Put the original functions back."""
+        while self._originals:
+            module, name, function = self._originals.pop()
+            setattr(module, name, function)
+
+    def record(self, category, seconds, size=0):
+        """Add a call to the stats.
+
+        :param category: Category of the call
+        :type category: str
+        :param seconds: Time the call took
+        :type seconds: float
+        :param size: Bytes read or written, defaults to 0
+        :type size: int, optional
+        """
+        with self._lock:
+            stats = self.stats.setdefault(category, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] += size
+
+    def report(self):
+        """Log the stats, costliest category first.
+
+        :return: Mapping of category to ``(calls, seconds, bytes)``
+        :rtype: dict
+        """
+        logger.info("I/O trace:")
+        ranked = sorted(
+            self.stats.items(), key=lambda x: x[1][1], reverse=True
+        )
+        for category, (calls, seconds, size) in ranked:
+            message = "\t{0}: {1} calls, {2:.3f}s, {3:.1f}us per call".format(
+                category, calls, seconds, seconds / calls * 1e6
+            )
+            if category in SIZED:
+                message += ", {0} bytes".format(size)
+            logger.info(message)
+        return dict((k, tuple(v)) for k, v in self.stats.items())
+
+    def _patch(self, module, name, function):
+        """Replace a function, remembering the original.
+
+        :param module: Module holding the function
+        :type module: module
+        :param name: Function name
+        :type name: str
+        :param function: Replacement
+        :type function: callable
+        """
+        self._originals.append((module, name, getattr(module, name)))
+        setattr(module, name, function)
+
+    def _wrap(self, category, function, descriptor=False):
+        """Trace a function.
+
+        :param category: Category to record calls under
+        :type category: str
+        :param function: Function to trace
+        :type function: callable
+        :param descriptor: The function takes a file descriptor first,
+            and is only traced for regular files, defaults to False
+        :type descriptor: bool, optional
+        :return: Traced function
+        :rtype: callable
+        """
+        timer = timeit.default_timer
+        sized = category in SIZED
+
+        def traced(*args, **kwargs):
+            if descriptor and args and not _regular_file(args[0]):
+                return function(*args, **kwargs)
+            start = timer()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                size = 0
+                if sized:
+                    # Python 2 file writes return None, so measure the data
+                    data = args[0] if result is None and args else result
+                    size = _size(data)
+                self.record(category, timer() - start, size)
+
+        traced.__name__ = function.__name__
+        traced.__doc__ = function.__doc__
+        return traced
+
+    def _wrap_open(self, function):
+        """Trace a builtin ``open``, and the files it returns.
+
+        Files opened from a file descriptor, such as pipes, are returned
+        as they are.
+
+        :param function: ``open`` to trace
+        :type function: callable
+        :return: Traced function
+        :rtype: callable
+        """
+        traced_open = self._wrap("open", function)
+
+        def traced(*args, **kwargs):
+            file_ = args[0] if args else kwargs.get("file")
+            if isinstance(file_, numbers.Integral):
+                return function(*args, **kwargs)
+            return TracedFile(traced_open(*args, **kwargs), self)
+
+        traced.__name__ = function.__name__
+        traced.__doc__ = function.__doc__
+        return traced
+
+
+class TracedFile(object):
+    """File object whose reads and writes are traced"""
+
+    def __init__(self, file_, tracer):
+        """Constructor for TracedFile.
+
+        :param file_: File object to wrap
+        :type file_: file
+        :param tracer: Tracer to record calls in
+        :type tracer: :class:`IOTracer`
+        """
+        # pylint: disable=protected-access
+        super(TracedFile, self).__init__()
+        self._file = file_
+        self.read = tracer._wrap("read", file_.read)
+        self.write = tracer._wrap("write", file_.write)
+        if hasattr(file_, "readinto"):
+            self.readinto = tracer._wrap("read", file_.readinto)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __enter__(self):
+        self._file.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        return self._file.__exit__(*args)
+
+
+class Profiler(object):
+    """Profile and trace everything run inside it"""
+
+    def __init__(self, profile_path=None, trace_io=False):
+        """Constructor for Profiler.
+
+        :param profile_path: Write :mod:`cProfile` stats to this file,
+            defaults to not profiling
+        :type profile_path: str, optional
+        :param trace_io: Trace file system calls, defaults to False
+        :type trace_io: bool, optional
+        """
+        super(Profiler, self).__init__()
+        self.profile_path = profile_path
+        self.profile = cProfile.Profile() if profile_path else None
+        self.tracer = IOTracer() if trace_io else None
+
+    def __enter__(self):
+        if self.tracer:
+            self.tracer.start()
+        if self.profile:
+            self.profile.enable()
+        return self
+
+    def __exit__(self, *args):
+        if self.profile:
+            self.profile.disable()
+        if self.tracer:
+            self.tracer.stop()
+            self.tracer.report()
+        if self.profile:
+            self.profile.dump_stats(self.profile_path)
+            stream = StringIO()
+            stats = pstats.Stats(self.profile, stream=stream)
+            stats.sort_stats("cumulative").print_stats(TOP_CALLS)
+            logger.debug(stream.getvalue())
+            logger.info("Wrote profile to {0}".format(self.profile_path))
+
+
+def _regular_file(descriptor):
+    """Whether a file descriptor refers to a regular file.
+
+    :param descriptor: File descriptor
+    :type descriptor: int
+    :return: Regular file, False for pipes, sockets and terminals
+    :rtype: bool
+    """
+    try:
+        return stat.S_ISREG(_fstat(descriptor).st_mode)
+    except (OSError, TypeError):
+        return False
+
+
+def _size(result):
+    """Bytes moved by a read, write or copy call.
+
+    :param result: Return value of the call, either the data read or
+        the number of bytes read or written. The data written for calls
+        that return nothing
+    :type result: object
+    :return: Bytes
+    :rtype: int
+    """
+    if isinstance(result, numbers.Integral):
+        return int(result)
+    try:
+        return len(result)
+    except TypeError:
+        return 0
@@ -0,0 +1,303 @@
+"""Stale Version Pruning
+
+Every version bump of a tool in Development Mode writes a new
+``<tool>-<version>.json`` Houdini Package, and leaves the old one
+behind. Houdini loads all of them, so startup slows down and the same
+Digital Assets are defined more than once. Install slots pile up old
+versions in the same way.
+
+:class:`StaleVersions` groups the packages and slots in an installation
+target by tool, keeps the newest versions of each, and removes the rest
+in parallel.
+::
+    htooldeploy --gc --dry-run "*"
+    htooldeploy --gc --keep 2 test_tool ~/houdini18.0
+
+The active and previous slots of a tool are always kept. Only packages
+written by htooldeploy in Development Mode are pruned, so third-party
+packages that happen to be named ``<name>-<version>.json`` are left
+alone. Each tool's versions are removed while holding its
+:class:`~htooldeploy.locking.DeployLock`, so a deploy of the same tool
+never runs at the same time.
+"""
+import fnmatch
+import json
+import logging
+import os
+import re
+import shutil
+
+from multiprocessing.pool import ThreadPool
+
+from .locking import DeployLock, LockTimeout
+from .slots import COMPLETE_MARKER, SLOTS_DIR, SlotManager, version_key
+
+logger = logging.getLogger("htooldeploy")
+
+PACKAGE_PATTERN = re.compile(r"^(?P<tool>.+?)-(?P<version>\d[^-]*)\.json$")
+DEVELOP_SOURCE_DIR = "source"
+
+
+def develop_package(path, tool):
+    """Whether a package file was written by htooldeploy in Development
+    Mode.
+
+    Those packages only point ``path`` at the tool repo's ``source/``
+    directory, and may append its ``otls/`` to ``HOUDINI_OTLSCAN_PATH``.
+
+    :param path: Package file
+    :type path: str
+    :param tool: Name of the tool the file is named after
+    :type tool: str
+    :return: Written by htooldeploy
+    :rtype: bool
+    """
+    try:
+        with open(path, "r") as file_:
+            package = json.load(file_)
+    except (IOError, OSError, ValueError):
+        return False
+    if not isinstance(package, dict) \
+            or not set(package).issubset(["path", "env"]):
+        return False
+    source = package.get("path")
+    if not isinstance(source, (str, type(u""))):
+        return False
+    source = os.path.normpath(source)
+    if os.path.basename(source) != DEVELOP_SOURCE_DIR \
+            or os.path.basename(os.path.dirname(source)) != tool:
+        return False
+    for item in package.get("env", list()):
+        if not isinstance(item, dict) \
+                or list(item) != ["HOUDINI_OTLSCAN_PATH"]:
+            return False
+    return True
+
+
+class StaleVersion(object):
+    """An old version of a tool that can be removed"""
+
+    # pylint: disable=too-few-public-methods
+    def __init__(self, tool, version, path, kind):
+        """Constructor for StaleVersion.
+
+        :param tool: Name of the tool
+        :type tool: str
+        :param version: Tool version
+        :type version: str
+        :param path: Package file or slot directory
+        :type path: str
+        :param kind: ``package`` or ``slot``
+        :type kind: str
+        """
+        super(StaleVersion, self).__init__()
+        self.tool = tool
+        self.version = version
+        self.path = path
+        self.kind = kind
+
+    def __repr__(self):
+        return "{0} {1} {2} ({3})".format(
+            self.tool, self.version, self.kind, self.path
+        )
+
+    def size(self):
+        """Bytes used on disk.
+
+        :return: Size in bytes
+        :rtype: int
+        """
+        if not os.path.isdir(self.path):
+            return os.path.getsize(self.path)
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                path = os.path.join(root, name)
+                if not os.path.islink(path):
+                    total += os.path.getsize(path)
+        return total
+
+
+class StaleVersions(object):
+    """Find and remove old versions of tools in an installation target"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, target_dir, tool="*", keep=1, jobs=4, dry_run=False,
+                 lock_timeout=None):
+        """Constructor for StaleVersions.
+
+        :param target_dir: Installation target, typically the User
+            Preferences directory
+        :type target_dir: str
+        :param tool: Glob matching the tools to prune, defaults to "*"
+        :type tool: str, optional
+        :param keep: Number of newest versions of each tool to keep,
+            defaults to 1
+        :type keep: int, optional
+        :param jobs: Number of versions to remove at once, defaults to 4
+        :type jobs: int, optional
+        :param dry_run: Only report what would be removed, defaults to
+            False
+        :type dry_run: bool, optional
+        :param lock_timeout: Seconds to wait for a deploy of a tool to
+            finish before skipping it. None waits for as long as it
+            takes, defaults to None
+        :type lock_timeout: float, optional
+        """
+        super(StaleVersions, self).__init__()
+        self.target_dir = os.path.abspath(target_dir)
+        self.tool = tool
+        self.keep = max(1, keep)
+        self.jobs = max(1, jobs)
+        self.dry_run = dry_run
+        self.lock_timeout = lock_timeout
+
+    def __repr__(self):
+        return "Stale versions of {0} in {1}".format(
+            self.tool, self.target_dir
+        )
+
+    def find(self):
+        """Find every stale version.
+
+        :return: Stale versions, oldest first within each tool
+        :rtype: list
+        """
+        return self._stale_packages() + self._stale_slots()
+
+    def prune(self):
+        """Remove every stale version, or report them in a dry run.
+
+        :return: Versions removed, or that would be removed
+        :rtype: list
+        """
+        stale = self.find()
+        sizes = dict()
+        for item in stale:
+            sizes[item.path] = item.size()
+            logger.info("{0} {1} ({2} bytes)".format(
+                "Would remove" if self.dry_run else "Removing", item,
+                sizes[item.path]))
+        if stale and not self.dry_run:
+            tools = dict()
+            for item in stale:
+                tools.setdefault(item.tool, list()).append(item)
+            pool = ThreadPool(min(self.jobs, len(tools)))
+            try:
+                pool.map(self._remove_tool, [tools[x] for x in sorted(tools)])
+            finally:
+                pool.close()
+                pool.join()
+        logger.info(
+            "{0} {1} stale versions, {2} bytes".format(
+                "Found" if self.dry_run else "Removed", len(stale),
+                sum(sizes.values()))
+        )
+        return stale
+
+    def _stale_packages(self):
+        """Versioned Houdini Packages beyond the newest.
+
+        :return: Stale versions
+        :rtype: list
+        """
+        packages_dir = os.path.join(self.target_dir, "packages")
+        if not os.path.isdir(packages_dir):
+            return list()
+        versions = dict()
+        for name in os.listdir(packages_dir):
+            match = PACKAGE_PATTERN.match(name)
+            if not match or not fnmatch.fnmatch(match.group("tool"),
+                                                self.tool):
+                continue
+            path = os.path.join(packages_dir, name)
+            if not develop_package(path, match.group("tool")):
+                logger.debug("{0} wasn't written by htooldeploy".format(path))
+                continue
+            versions.setdefault(match.group("tool"), list()).append(
+                StaleVersion(
+                    match.group("tool"),
+                    match.group("version"),
+                    path,
+                    "package"
+                )
+            )
+        stale = list()
+        for tool in sorted(versions):
+            stale.extend(self._oldest(versions[tool]))
+        return stale
+
+    def _stale_slots(self):
+        """Install slots beyond the newest, other than the active and
+        previous ones.
+
+        :return: Stale versions
+        :rtype: list
+        """
+        slots_dir = os.path.join(self.target_dir, SLOTS_DIR)
+        if not os.path.isdir(slots_dir):
+            return list()
+        stale = list()
+        for tool in sorted(os.listdir(slots_dir)):
+            if not fnmatch.fnmatch(tool, self.tool):
+                continue
+            manager = SlotManager(self.target_dir, tool)
+            protected = [manager.active(), manager.previous()]
+            versions = [
+                StaleVersion(tool, x, manager.slot_path(x), "slot")
+                for x in manager.versions()
+            ]
+            stale.extend(
+                x for x in self._oldest(versions)
+                if x.version not in protected
+            )
+        return stale
+
+    def _oldest(self, versions):
+        """Versions other than the newest ones to keep.
+
+        :param versions: Versions of one tool
+        :type versions: list
+        :return: Older versions
+        :rtype: list
+        """
+        ordered = sorted(versions, key=lambda x: version_key(x.version))
+        return ordered[:-self.keep]
+
+    def _remove_tool(self, items):
+        """Remove the stale versions of one tool, holding its deploy
+        lock.
+
+        :param items: Versions of one tool to remove
+        :type items: list
+        """
+        lock = DeployLock(
+            self.target_dir, items[0].tool, timeout=self.lock_timeout
+        )
+        try:
+            with lock:
+                for item in items:
+                    self._remove(item)
+        except LockTimeout as error:
+            logger.error("Not pruning {0}, another deploy is running: "
+                         "{1}".format(items[0].tool, error))
+
+    @staticmethod
+    def _remove(item):
+        """Remove a stale version.
+
+        :param item: Version to remove
+        :type item: :class:`StaleVersion`
+        """
+        try:
+            if item.kind == "slot":
+                marker = os.path.join(os.path.dirname(item.path),
+                                      COMPLETE_MARKER.format(item.version))
+                if os.path.isfile(marker):
+                    os.remove(marker)
+            if os.path.isdir(item.path) and not os.path.islink(item.path):
+                shutil.rmtree(item.path)
+            else:
+                os.remove(item.path)
+        except OSError as error:
+            logger.error("Unable to remove {0}: {1}".format(item, error))
@@ -0,0 +1,94 @@
+"""Transfer Receiver
+
+Unpacks a compressed tool stream (see :mod:`htooldeploy.transfer`) read
+from stdin into a target directory. Run it on the receiving host, or
+locally as a stand-in.
+::
+    python -m htooldeploy.receiver /home/artist/houdini18.0
+
+With ``--manifest``, relative paths are read from stdin instead, and the
+hashes of those that exist in the target are written to stdout as JSON.
+"""
+import argparse
+import json
+import logging
+import sys
+
+from .hashing import HashCache
+from .transfer import CHUNK_SIZE, receive
+from .transport import local_manifest
+
+logger = logging.getLogger("htooldeploy")
+
+
+def build_argument_parser():
+    """Create the argument parser for the receiver.
+
+    :return: Argument Parser
+    :rtype: :class:`argparse.ArgumentParser`
+    """
+    parser = argparse.ArgumentParser(
+        prog="htooldeploy.receiver",
+        description="Unpack a compressed htooldeploy stream from stdin."
+    )
+    parser.add_argument(
+        "target",
+        type=str,
+        action="store",
+        help="Directory to unpack into"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        metavar="BYTES",
+        help="Bytes to read from stdin at a time"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Create the target, and site directories missing from it"
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="Report hashes of the files named on stdin instead"
+    )
+    parser.add_argument(
+        "--no-hash-cache",
+        dest="hash_cache",
+        action="store_false",
+        help="Hash every file in full, instead of reusing cached hashes"
+    )
+    return parser
+
+
+def main():
+    """Receive a stream on stdin"""
+    args = build_argument_parser().parse_args()
+    logger.addHandler(logging.StreamHandler())
+    stdin = getattr(sys.stdin, "buffer", sys.stdin)
+    if args.manifest:
+        relpaths = [
+            x for x in stdin.read().decode("utf-8").splitlines() if x
+        ]
+        cache = HashCache() if args.hash_cache else None
+        try:
+            manifest = local_manifest(args.target, relpaths, cache=cache)
+        finally:
+            if cache:
+                cache.close()
+        sys.stdout.write(json.dumps(manifest))
+        return
+    try:
+        received = receive(
+            stdin, args.target, chunk_size=args.chunk_size, force=args.force
+        )
+    except IOError as error:
+        logger.error(error)
+        sys.exit(1)
+    logger.debug("Received {0} files".format(len(received)))
+
+
+if __name__ == "__main__":
+    main()
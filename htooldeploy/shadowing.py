@@ -0,0 +1,228 @@
+"""Shadowed File Detector
+
+When several tools are installed into the same User Preferences
+directory, or added to ``HOUDINI_PATH`` by Houdini Packages, files with
+the same relative path shadow each other. Only the copy in the first
+directory on ``HOUDINI_PATH`` is used, so a stale HDA, python module or
+shelf can hide a newer one without any warning.
+
+A :class:`ShadowIndex` walks every ``HOUDINI_PATH`` entry once, in
+parallel, and indexes the files by relative path. Any relative path
+found in more than one entry is reported, along with the copy that wins.
+::
+    htooldeploy --shadowed ~/houdini18.0
+
+Copies with the same contents are reported as duplicates rather than
+conflicts. No Houdini license is needed, only the filesystem is
+inspected.
+"""
+import fnmatch
+import logging
+import os
+
+from multiprocessing.pool import ThreadPool
+
+from .analyze import StartupAnalyzer
+from .hashing import file_hash
+from .slots import SLOTS_DIR
+
+logger = logging.getLogger("htooldeploy")
+
+IGNORE_PATTERNS = ["*.pyc", "*.pyo", "__pycache__", ".*"]
+IGNORE_TOP_LEVEL = ["packages", SLOTS_DIR]
+
+
+class ShadowedFile(object):
+    """A relative path found in more than one ``HOUDINI_PATH`` entry"""
+
+    def __init__(self, relpath, copies):
+        """Constructor for ShadowedFile.
+
+        :param relpath: Path relative to the ``HOUDINI_PATH`` entries
+        :type relpath: str
+        :param copies: List of ``(root, origin)`` tuples, in search path
+            order
+        :type copies: list
+        """
+        super(ShadowedFile, self).__init__()
+        self.relpath = relpath
+        self.copies = copies
+
+    def __repr__(self):
+        return "{0} ({1} copies)".format(self.relpath, len(self.copies))
+
+    @property
+    def paths(self):
+        """Every copy on disk, in search path order.
+
+        :return: File paths
+        :rtype: list
+        """
+        return [os.path.join(x, self.relpath) for x, _ in self.copies]
+
+    @property
+    def winner(self):
+        """The copy Houdini will use.
+
+        :return: File path
+        :rtype: str
+        """
+        return self.paths[0]
+
+    def identical(self):
+        """Whether every copy has the same contents.
+
+        Sizes are compared first, so files are only hashed when all of
+        them are the same size. Copies that can't be read, such as
+        broken symbolic links, never match.
+
+        :return: All copies are the same
+        :rtype: bool
+        """
+        sizes = set()
+        for path in self.paths:
+            try:
+                sizes.add(os.path.getsize(path))
+            except OSError:
+                return False
+        if len(sizes) > 1:
+            return False
+        try:
+            return len(set(file_hash(x) for x in self.paths)) == 1
+        except (IOError, OSError):
+            return False
+
+
+class ShadowIndex(object):
+    """Index the files on ``HOUDINI_PATH`` by relative path"""
+
+    def __init__(self, path, jobs=4):
+        """Constructor for ShadowIndex.
+
+        :param path: User Preferences directory, or a ``packages/``
+            directory within one
+        :type path: str
+        :param jobs: Number of ``HOUDINI_PATH`` entries to walk at once,
+            defaults to 4
+        :type jobs: int, optional
+        """
+        super(ShadowIndex, self).__init__()
+        self.analyzer = StartupAnalyzer(path)
+        self.jobs = max(1, jobs)
+        self.roots = list()
+        self.index = dict()
+
+    def __repr__(self):
+        return "Shadowed files in {0}".format(self.analyzer.prefs_dir)
+
+    def build(self):
+        """Walk every ``HOUDINI_PATH`` entry and index its files.
+
+        Entries that resolve to a directory already on the path are only
+        walked once.
+
+        :return: Mapping of relative path to a list of ``(root, origin)``
+            tuples, in search path order
+        :rtype: dict
+        """
+        houdini_path, _ = self.analyzer.search_path()
+        self.roots = list()
+        seen = set()
+        for root, origin in houdini_path:
+            real = os.path.realpath(root)
+            if real in seen or not os.path.isdir(root):
+                continue
+            seen.add(real)
+            self.roots.append((root, origin))
+
+        pool = ThreadPool(max(1, min(self.jobs, len(self.roots))))
+        try:
+            listings = pool.map(self._walk, [x for x, _ in self.roots])
+        finally:
+            pool.close()
+            pool.join()
+
+        self.index = dict()
+        for (root, origin), relpaths in zip(self.roots, listings):
+            for relpath in relpaths:
+                self.index.setdefault(relpath, list()).append((root, origin))
+        return self.index
+
+    def shadowed(self):
+        """Relative paths found in more than one entry.
+
+        :return: Shadowed files, sorted by relative path
+        :rtype: list
+        """
+        return [
+            ShadowedFile(k, v) for k, v in sorted(self.index.items())
+            if len(v) > 1
+        ]
+
+    def report(self):
+        """Index and log every shadowed file.
+
+        :return: Whether any conflicts were found
+        :rtype: bool
+        """
+        self.build()
+        logger.info(
+            "Indexed {0} files in {1} HOUDINI_PATH entries".format(
+                len(self.index), len(self.roots))
+        )
+        conflicts = False
+        duplicates = 0
+        for item in self.shadowed():
+            if item.identical():
+                duplicates += 1
+                logger.debug("{0} is duplicated in {1}".format(
+                    item.relpath, ", ".join(x for _, x in item.copies)))
+                continue
+            conflicts = True
+            logger.warning(
+                "{0} from {1} shadows:".format(item.winner, item.copies[0][1])
+            )
+            for (_, origin), path in zip(item.copies[1:], item.paths[1:]):
+                logger.warning("\t{0} ({1})".format(path, origin))
+        if duplicates:
+            logger.info("{0} files are duplicated with the same contents"
+                        .format(duplicates))
+        if not conflicts:
+            logger.info("No conflicting files found")
+        return conflicts
+
+    @staticmethod
+    def _walk(root):
+        """List the files beneath a ``HOUDINI_PATH`` entry.
+
+        :param root: Entry to walk
+        :type root: str
+        :return: Paths relative to the entry, with ``/`` separators
+        :rtype: list
+        """
+        relpaths = list()
+        for path, dirs, files in os.walk(root):
+            relpath = os.path.relpath(path, root)
+            dirs[:] = [
+                x for x in dirs
+                if not _ignored(x)
+                and not (relpath == "." and x in IGNORE_TOP_LEVEL)
+            ]
+            for name in files:
+                if _ignored(name):
+                    continue
+                if relpath != ".":
+                    name = os.path.join(relpath, name)
+                relpaths.append(name.replace(os.sep, "/"))
+        return relpaths
+
+
+def _ignored(name):
+    """Whether a file or directory is left out of the index.
+
+    :param name: File or directory name
+    :type name: str
+    :return: Ignored
+    :rtype: bool
+    """
+    return any(fnmatch.fnmatch(name, x) for x in IGNORE_PATTERNS)
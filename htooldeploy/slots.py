@@ -0,0 +1,276 @@
+"""Versioned Install Slots
+
+Installing over the top of an existing tool means rolling back requires
+a full reinstall of the previous version. With install slots, each
+version of a tool is installed once into its own directory, and a
+``current`` link selects which one Houdini sees through a Houdini
+Package.
+::
+    <target>/
+        packages/my_tool.json       -> {"path": ".../my_tool/current"}
+        htooldeploy/my_tool/
+            0.1.0/
+            0.2.0/
+            current -> 0.2.0
+            previous -> 0.1.0
+
+Switching versions only swaps a link, so activating or rolling back is
+instant no matter how large the tool is.
+
+A hidden ``.<version>.complete`` marker is written beside a slot once
+it is fully installed. Slots without one, such as those left by an
+interrupted copy, aren't counted as installed, so they are never
+activated and are copied again on the next install.
+::
+    htooldeploy --slots ~/dev/my_tool
+    htooldeploy --activate 0.1.0 my_tool
+    htooldeploy --rollback my_tool
+"""
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger("htooldeploy")
+
+SLOTS_DIR = "htooldeploy"
+CURRENT = "current"
+PREVIOUS = "previous"
+COMPLETE_MARKER = ".{0}.complete"
+
+
+def version_key(version):
+    """Sort key for a version string, such as ``1.10.0`` or ``2.0b1``.
+
+    Numbers compare as numbers, so ``1.10.0`` is newer than ``1.9.0``,
+    and pre-releases are older than the release, so ``2.0b1`` is older
+    than ``2.0``.
+
+    :param version: Version string
+    :type version: str
+    :return: Sort key
+    :rtype: tuple
+    """
+    parts = [
+        (2, int(x)) if x.isdigit() else (0, x)
+        for x in re.findall(r"\d+|[a-zA-Z]+", version)
+    ]
+    return tuple(parts + [(1,)])
+
+
+class SlotManager(object):
+    """Manage the versioned install slots of one tool"""
+
+    def __init__(self, target_dir, tool_name, dry_run=False):
+        """Constructor for SlotManager.
+
+        :param target_dir: Installation target, typically the User
+            Preferences directory
+        :type target_dir: str
+        :param tool_name: Name of the tool
+        :type tool_name: str
+        :param dry_run: Don't create or change anything, defaults to
+            False
+        :type dry_run: bool, optional
+        """
+        super(SlotManager, self).__init__()
+        self.target_dir = os.path.abspath(target_dir)
+        self.tool_name = tool_name
+        self.dry_run = dry_run
+
+    def __repr__(self):
+        return "Install slots for {0} in {1}".format(
+            self.tool_name, self.root()
+        )
+
+    def root(self):
+        """Directory holding every slot of the tool.
+
+        :return: Slots root
+        :rtype: str
+        """
+        return os.path.join(self.target_dir, SLOTS_DIR, self.tool_name)
+
+    def slot_path(self, version):
+        """Directory a version is installed in.
+
+        :param version: Tool version
+        :type version: str
+        :return: Slot directory
+        :rtype: str
+        """
+        return os.path.join(self.root(), version)
+
+    def package_file(self):
+        """Houdini Package pointing at the active slot.
+
+        :return: Path to the package file
+        :rtype: str
+        """
+        return os.path.join(
+            self.target_dir, "packages", "{0}.json".format(self.tool_name)
+        )
+
+    def marker_path(self, version):
+        """Marker written once a version is fully installed.
+
+        :param version: Tool version
+        :type version: str
+        :return: Marker file
+        :rtype: str
+        """
+        return os.path.join(self.root(), COMPLETE_MARKER.format(version))
+
+    def versions(self):
+        """Fully installed versions.
+
+        :return: Installed version names, oldest first
+        :rtype: list
+        """
+        if not os.path.isdir(self.root()):
+            return list()
+        return sorted(
+            (x for x in os.listdir(self.root())
+             if x not in (CURRENT, PREVIOUS) and not x.startswith(".")
+             and os.path.isdir(os.path.join(self.root(), x))
+             and not os.path.islink(os.path.join(self.root(), x))
+             and os.path.isfile(self.marker_path(x))),
+            key=version_key
+        )
+
+    def set_complete(self, version, complete=True):
+        """Mark a version as fully installed, or as being installed.
+
+        :param version: Tool version
+        :type version: str
+        :param complete: Whether the slot is complete, defaults to True
+        :type complete: bool, optional
+        """
+        if self.dry_run:
+            return
+        marker = self.marker_path(version)
+        if complete:
+            with open(marker, "w"):
+                pass
+        elif os.path.isfile(marker):
+            os.remove(marker)
+
+    def active(self):
+        """Currently active version.
+
+        :return: Active version, None if no version is active
+        :rtype: str, None
+        """
+        return self._read_link(CURRENT)
+
+    def previous(self):
+        """Version that was active before the current one.
+
+        :return: Previous version, None if there is none
+        :rtype: str, None
+        """
+        return self._read_link(PREVIOUS)
+
+    def activate(self, version):
+        """Make an installed version the active one.
+
+        :param version: Version to activate
+        :type version: str
+        :return: Success
+        :rtype: bool
+        """
+        if version not in self.versions() and not self.dry_run:
+            logger.error(
+                "{0} {1} is not installed in {2}".format(
+                    self.tool_name, version, self.root())
+            )
+            return False
+        active = self.active()
+        if version == active:
+            logger.info("{0} {1} is already active".format(
+                self.tool_name, version))
+            return True
+
+        logger.info("Activating {0} {1}".format(self.tool_name, version))
+        if self.dry_run:
+            return True
+        if active:
+            self._write_link(PREVIOUS, active)
+        self._write_link(CURRENT, version)
+        return self.write_package()
+
+    def rollback(self):
+        """Re-activate the previously active version.
+
+        :return: Success
+        :rtype: bool
+        """
+        previous = self.previous()
+        if not previous:
+            logger.error(
+                "No previous version of {0} to roll back to".format(
+                    self.tool_name)
+            )
+            return False
+        return self.activate(previous)
+
+    def write_package(self):
+        """Write the Houdini Package pointing at the ``current`` link.
+
+        The package never changes between versions, so it is only
+        written if missing or different.
+
+        :return: Success
+        :rtype: bool
+        """
+        package_file = self.package_file()
+        package_entry = {"path": os.path.join(self.root(), CURRENT)}
+        if os.path.isfile(package_file):
+            try:
+                with open(package_file, "r") as file_:
+                    if json.load(file_) == package_entry:
+                        return True
+            except ValueError:
+                pass
+        if self.dry_run:
+            return True
+
+        package_dir = os.path.dirname(package_file)
+        if not os.path.isdir(package_dir):
+            os.makedirs(package_dir)
+        temp = "{0}.{1}.tmp".format(package_file, os.getpid())
+        with open(temp, "w") as file_:
+            json.dump(package_entry, file_, indent=4)
+        if os.name == "nt" and os.path.isfile(package_file):
+            os.remove(package_file)
+        os.rename(temp, package_file)
+        return True
+
+    def _read_link(self, name):
+        """Version a slot link points at.
+
+        :param name: Link name
+        :type name: str
+        :return: Version, None if the link doesn't exist
+        :rtype: str, None
+        """
+        link = os.path.join(self.root(), name)
+        if not os.path.islink(link):
+            return None
+        return os.path.basename(os.readlink(link))
+
+    def _write_link(self, name, version):
+        """Atomically point a slot link at a version.
+
+        The new link is created beside the old one and renamed over it,
+        so Houdini never sees a missing link.
+
+        :param name: Link name
+        :type name: str
+        :param version: Version to point at
+        :type version: str
+        """
+        link = os.path.join(self.root(), name)
+        temp = "{0}.{1}.tmp".format(link, os.getpid())
+        os.symlink(version, temp)
+        os.rename(temp, link)
@@ -0,0 +1,176 @@
+"""Shared Object Store
+
+Many tools ship identical files, and every version of a tool ships
+mostly the same files as the last. The :class:`ObjectStore` keeps one
+copy of each unique file, named by the hash of its contents, and
+installs tools by linking to those copies instead of writing new ones.
+::
+    htooldeploy --store /opt/htooldeploy/store ~/dev/test_tool
+
+Files in the store are made read-only, since every installed link
+shares the same data. Tools installed from a store are therefore
+read-only too: edit the tool's source and deploy again rather than
+editing installed files. Objects are keyed by their permissions as well
+as their contents, so an executable and a plain copy of the same file
+never share an inode, and nothing is ever re-chmodded once stored.
+"""
+import logging
+import os
+import shutil
+import stat
+
+from . import hashing
+from . import throttle
+
+logger = logging.getLogger("htooldeploy")
+
+
+class ObjectStore(object):
+    """Content-addressed store of deployed files"""
+
+    def __init__(self, root, dry_run=False, cache=None):
+        """Constructor for ObjectStore.
+
+        :param root: Directory to keep the objects in
+        :type root: str
+        :param dry_run: Don't create or link anything, defaults to False
+        :type dry_run: bool, optional
+        :param cache: Cache of file hashes, defaults to None
+        :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+        """
+        super(ObjectStore, self).__init__()
+        self.root = os.path.abspath(root)
+        self.dry_run = dry_run
+        self.cache = cache
+        self._keys = dict()
+
+    def __repr__(self):
+        return "Object Store at {0}".format(self.root)
+
+    def object_path(self, key):
+        """Path to the object with the given key.
+
+        :param key: Object key, as returned by :meth:`add`
+        :type key: str
+        :return: Path to the object
+        :rtype: str
+        """
+        return os.path.join(self.root, "objects", key[:2], key[2:])
+
+    def key(self, path, digest=None):
+        """Object key a file would be stored under.
+
+        Keys are remembered for as long as the file's size, modification
+        time and permissions stay the same, so checking a file before
+        adding it only hashes it once.
+
+        :param path: File to key
+        :type path: str
+        :param digest: Content hash of the file if already known,
+            defaults to None
+        :type digest: str, optional
+        :return: Object key, the content hash and the object's read-only
+            permissions
+        :rtype: str
+        """
+        path_stat = os.stat(path)
+        mode = stat.S_IMODE(path_stat.st_mode) & ~(
+            stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+        signature = (path_stat.st_size, path_stat.st_mtime, mode)
+        known = self._keys.get(path)
+        if not digest and known and known[0] == signature:
+            return known[1]
+        digest = digest or hashing.file_hash(path, cache=self.cache)
+        key = "{0}-{1:o}".format(digest, mode)
+        self._keys[path] = (signature, key)
+        return key
+
+    def has(self, key):
+        """Whether an object is already in the store.
+
+        :param key: Object key, as returned by :meth:`key`
+        :type key: str
+        :return: Object exists
+        :rtype: bool
+        """
+        return os.path.isfile(self.object_path(key))
+
+    def add(self, path, digest=None):
+        """Add a file to the store, if it isn't already there.
+
+        :param path: File to add
+        :type path: str
+        :param digest: Content hash of the file if already known,
+            defaults to None
+        :type digest: str, optional
+        :return: Object key, as returned by :meth:`key`
+        :rtype: str
+        """
+        key = self.key(path, digest=digest)
+        mode = int(key.rsplit("-", 1)[1], 8)
+        object_path = self.object_path(key)
+        if os.path.isfile(object_path) or self.dry_run:
+            return key
+
+        object_dir = os.path.dirname(object_path)
+        if not os.path.isdir(object_dir):
+            try:
+                os.makedirs(object_dir)
+            except OSError:
+                if not os.path.isdir(object_dir):
+                    raise
+        temp = "{0}.{1}.tmp".format(object_path, os.getpid())
+        throttle.consume(os.path.getsize(path))
+        shutil.copy2(path, temp)
+        os.chmod(temp, mode)
+        os.rename(temp, object_path)
+        logger.debug("Stored %s as %s", path, key)
+        return key
+
+    def materialize(self, key, target):
+        """Link an object into place.
+
+        Hard links are used where possible. If the store lives on a
+        different device than the target, a symbolic link is used
+        instead.
+
+        :param key: Object key, as returned by :meth:`add`
+        :type key: str
+        :param target: Path to link the object to
+        :type target: str
+        :return: Whether the target was changed
+        :rtype: bool
+        """
+        object_path = self.object_path(key)
+        if self.dry_run:
+            return True
+        if os.path.lexists(target):
+            if (os.path.realpath(target) == object_path
+                    or self._same_file(object_path, target)):
+                return False
+
+        temp = "{0}.{1}.tmp".format(target, os.getpid())
+        try:
+            os.link(object_path, temp)
+        except OSError:
+            os.symlink(object_path, temp)
+        os.rename(temp, target)
+        return True
+
+    @staticmethod
+    def _same_file(first, second):
+        """Whether two paths point at the same file on disk.
+
+        :param first: First path
+        :type first: str
+        :param second: Second path
+        :type second: str
+        :return: Same inode on the same device
+        :rtype: bool
+        """
+        first_stat = os.stat(first)
+        second_stat = os.lstat(second)
+        return (
+            first_stat.st_ino == second_stat.st_ino
+            and first_stat.st_dev == second_stat.st_dev
+        )
@@ -7,17 +7,38 @@ and deployment.
     htooldeploy --template .
 
 :ref:`Full Template`
+
+Many tools can be created at once, without prompts, from a JSON or YAML
+spec. YAML needs PyYAML to be installed.
+::
+    htooldeploy --template --spec show_tools.yaml ~/dev
+
+:ref:`Template Spec`
 """
+import errno
+import json
 import logging
 import os
 import re
-import shutil
+import stat
 import xml.etree.cElementTree as ET
 from xml.dom import minidom
 
+try:
+    import yaml  # pylint: disable=import-error
+except ImportError:
+    yaml = None
+
 # pylint: disable=superfluous-parens
 logger = logging.getLogger("htooldeploy")
 
+RESOURCE_DIR = os.path.join(os.path.dirname(__file__), "resource")
+SPEC_OPTIONS = [
+    "name", "author", "version", "pythonlib", "shelf", "help_card", "git"
+]
+
+_resources = dict()
+
 
 class TemplateTool(object):
     """Template tool object for creating Tool directories"""
@@ -43,6 +64,8 @@ class TemplateTool(object):
         self.shelf = shelf
         self.help_card = help_card
         self.git = git
+        self._dirs = set()
+        self._files = list()
 
     def __repr__(self):
         return (
@@ -51,11 +74,16 @@ class TemplateTool(object):
         )
 
     def create(self):
-        """Create template files and directories"""
+        """Create template files and directories.
+
+        Directories are created first, and every file is written once
+        they all exist.
+        """
         self.exists()
         self._create_directories()
         self._create_readme()
         self._create_version_file()
+        self._write_files()
 
     def exists(self):
         """Determine if the tool already exists.
@@ -67,7 +95,7 @@ class TemplateTool(object):
         try:
             os.makedirs(os.path.join(self.parent_dir, self._name))
         except OSError as error:
-            if "File exists" in error:
+            if error.errno == errno.EEXIST:
                 logger.error(
                     "This tool already exists in {0}".format(self.parent_dir)
                 )
@@ -95,32 +123,49 @@ class TemplateTool(object):
         if self.author:
             contents = "{0}\nCreated by {1}".format(contents, self.author)
 
-        with open(os.path.join(self.root(), "README.md"), "w") as file_:
-            file_.write(contents)
+        self._add_file(os.path.join(self.root(), "README.md"), contents)
 
     def _create_version_file(self):
         """Create version tracker file"""
-        with open(os.path.join(self.root(), "_version"), "w") as file_:
-            file_.write(self._version_str())
+        self._add_file(
+            os.path.join(self.root(), "_version"), self._version_str()
+        )
 
     def _git_prep(self):
-        resource = os.path.join(os.path.dirname(__file__), "resource")
-        gitignore = os.path.join(resource, "gitignore")
-        shell_scripts = ["bin_to_ascii.sh", "ascii_to_bin.sh"]
-        try:
-            shutil.copy2(gitignore, os.path.join(self.root(), ".gitignore"))
-        except OSError as error:
-            if "File exists" in error:
-                print("exist")
-                # pass
-        for file_ in shell_scripts:
-            filepath = os.path.join(resource, file_)
-            shutil.copy2(
-                filepath, os.path.join(
-                    self._source_dir(), "otls", file_
-                )
+        """Add a ``.gitignore`` and the HDA conversion scripts"""
+        self._add_file(
+            os.path.join(self.root(), ".gitignore"), *_resource("gitignore")
+        )
+        for file_ in ["bin_to_ascii.sh", "ascii_to_bin.sh"]:
+            self._add_file(
+                os.path.join(self._source_dir(), "otls", file_),
+                *_resource(file_)
             )
 
+    def _add_file(self, path, contents, mode=None):
+        """Queue a file to be written by :meth:`_write_files`.
+
+        :param path: File to write
+        :type path: str
+        :param contents: Contents of the file
+        :type contents: str
+        :param mode: Permission bits to set, defaults to leaving them as
+            created
+        :type mode: int, optional
+        """
+        self._files.append((path, contents, mode))
+
+    def _write_files(self):
+        """Write every queued file."""
+        for path, contents, mode in self._files:
+            with open(path, "w") as file_:
+                file_.write(contents)
+            if mode is not None:
+                os.chmod(path, mode)
+        logger.debug("Wrote {0} files for {1}".format(
+            len(self._files), self._name))
+        self._files = list()
+
     def _version_str(self):
         """Create a Version String to save in the _version file.
 
@@ -162,8 +207,7 @@ class TemplateTool(object):
         """
         parent_dir = os.path.join(self._source_dir(), "python2.7libs")
         package_root = self._makedir(os.path.join(parent_dir, self._name))
-        with open(os.path.join(package_root, "__init__.py"), "w") as file_:
-            file_.write("")
+        self._add_file(os.path.join(package_root, "__init__.py"), "")
 
     def _create_shelf(self):
         """Create toolbar folder and dummy shelf file"""
@@ -185,8 +229,7 @@ class TemplateTool(object):
         doc.insert(0, comment)
         # declaration = """<?xml version="1.0" encoding="UTF-8"?>"""
         xmlstr = minidom.parseString(ET.tostring(doc)).toprettyxml(indent="  ")
-        with open(shelf_file, "w") as file_:
-            file_.write(xmlstr)
+        self._add_file(shelf_file, xmlstr)
 
     def _houdini_help_dirs(self):
         """Create Houdini Help directories"""
@@ -231,22 +274,29 @@ class TemplateTool(object):
         scrubbed_name = re.sub(pattern, "_", name)
         return scrubbed_name
 
-    @staticmethod
-    def _makedir(path):
+    def _makedir(self, path):
         """EAFP directory creation.
 
+        Each directory is only created once, however many times it is
+        asked for.
+
         :param path: Directory to create
         :type path: str
         :return: Directory path, None if not created
         :rtype: str, None
         """
+        if path in self._dirs:
+            return path
         try:
             os.makedirs(path)
             logger.debug("Created {0}".format(path))
         except OSError as error:
-            if "File exists" not in error:
+            if error.errno != errno.EEXIST:
                 logger.error("Unable to create {0}".format(path))
-        return path if os.path.isdir(path) else None
+        if not os.path.isdir(path):
+            return None
+        self._dirs.add(path)
+        return path
 
 
 class WizardLine(object):
@@ -377,3 +427,132 @@ def template_wizard(template_location):
         "Do you plan on using {0} with Git?".format(tool.name), default="y"
     ).show_prompt().value
     tool.create()
+
+
+def _resource(name):
+    """Contents and permissions of a template resource file.
+
+    Each file is only read once, however many tools use it.
+
+    :param name: File name in the ``resource/`` directory
+    :type name: str
+    :return: ``(contents, mode)``
+    :rtype: tuple
+    """
+    if name not in _resources:
+        path = os.path.join(RESOURCE_DIR, name)
+        with open(path, "r") as file_:
+            _resources[name] = (
+                file_.read(), stat.S_IMODE(os.stat(path).st_mode)
+            )
+    return _resources[name]
+
+
+def load_spec(path):
+    """Read a spec of tools to create.
+
+    The spec is a JSON or YAML mapping with a list of ``tools``, and
+    optional ``defaults`` shared by all of them. Each tool takes the
+    keys in :data:`SPEC_OPTIONS`, and needs at least a ``name``.
+    Versions must be strings, as YAML reads an unquoted ``1.10`` as the
+    number ``1.1``.
+
+    :param path: ``.json``, ``.yaml`` or ``.yml`` file
+    :type path: str
+    :raises ValueError: The spec can't be read, or is invalid
+    :return: Options for each tool
+    :rtype: list
+    """
+    with open(path, "r") as file_:
+        if os.path.splitext(path)[1].lower() in [".yaml", ".yml"]:
+            if yaml is None:
+                raise ValueError(
+                    "PyYAML is needed to read {0}. Install it, or use a "
+                    "JSON spec".format(path)
+                )
+            spec = yaml.safe_load(file_)
+        else:
+            spec = json.load(file_)
+    if isinstance(spec, list):
+        spec = {"tools": spec}
+    if not isinstance(spec, dict) or not isinstance(spec.get("tools"), list):
+        raise ValueError("{0} has no list of tools".format(path))
+
+    defaults = spec.get("defaults") or dict()
+    tools = list()
+    for entry in spec["tools"]:
+        if not isinstance(entry, dict):
+            entry = {"name": entry}
+        options = dict(defaults, **entry)
+        unknown = sorted(set(options) - set(SPEC_OPTIONS))
+        if unknown:
+            raise ValueError("Unknown options for {0}: {1}".format(
+                options.get("name"), ", ".join(unknown)))
+        if not options.get("name"):
+            raise ValueError("Every tool in {0} needs a name".format(path))
+        options["name"] = str(options["name"])
+        version = options.get("version")
+        if version is not None:
+            if not isinstance(version, (str, type(u""))):
+                raise ValueError(
+                    "The version of {0} must be a string, quote {1}".format(
+                        options["name"], version)
+                )
+            options["version"] = str(version)
+        tools.append(options)
+    return tools
+
+
+def template_from_spec(spec_path, template_location):
+    """Create every tool in a spec, without prompting.
+
+    Tools that already exist are skipped. A tool that can't be created
+    is logged and left as it is, and the rest are still created.
+
+    :param spec_path: Spec file, see :func:`load_spec`
+    :type spec_path: str
+    :param template_location: Directory in which to create the tools
+    :type template_location: str
+    :return: Tools created
+    :rtype: list
+    """
+    template_location = os.path.abspath(template_location)
+    try:
+        specs = load_spec(spec_path)
+    except (IOError, OSError, ValueError) as error:
+        logger.error("Unable to read {0}: {1}".format(spec_path, error))
+        return list()
+
+    tools = list()
+    names = set()
+    for options in specs:
+        tool = TemplateTool(template_location, **options)
+        if tool.name in names:
+            logger.warning("{0} is in the spec more than once".format(
+                tool.name))
+            continue
+        names.add(tool.name)
+        if os.path.exists(os.path.join(template_location, tool.name)):
+            logger.warning("Skipping {0}, which already exists".format(
+                tool.name))
+            continue
+        tools.append(tool)
+
+    created = list()
+    for tool in tools:
+        try:
+            tool.create()
+        except (IOError, OSError) as error:
+            path = os.path.join(template_location, tool.name)
+            logger.error("Unable to create {0}: {1}".format(path, error))
+            if os.path.isdir(path):
+                logger.warning(
+                    "Remove the partly created {0} before trying "
+                    "again".format(path)
+                )
+            continue
+        logger.info("Created {0}".format(tool.root()))
+        created.append(tool)
+    logger.info("Created {0} of {1} tools in {2}".format(
+        len(created), len(specs), template_location))
+    return created
@@ -0,0 +1,187 @@
+"""I/O Throttling
+
+A deploy running flat out competes with render jobs for the same disks
+and network. With a :class:`Throttle`, every stage that reads or writes
+file data, such as copying, hashing and delta checks, draws from the
+same token buckets, so the whole deploy stays under a limit on bytes and
+files per second.
+::
+    htooldeploy --max-rate 20M --max-file-rate 200 ~/dev/test_tool
+
+The deploy can also drop to idle I/O priority, so the kernel only gives
+it disk time nobody else wants.
+::
+    htooldeploy --idle-io ~/dev/test_tool
+"""
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger("htooldeploy")
+
+UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+_active = None
+
+
+class TokenBucket(object):
+    """Allow an average rate of some quantity, with bursts"""
+
+    def __init__(self, rate, burst=None):
+        """Constructor for TokenBucket.
+
+        :param rate: Tokens added per second
+        :type rate: float
+        :param burst: Most tokens that can be saved up, defaults to one
+            second's worth
+        :type burst: float, optional
+        """
+        super(TokenBucket, self).__init__()
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.waited = 0.0
+        self._stamp = time.time()
+        self._lock = threading.Lock()
+
+    def consume(self, tokens):
+        """Take tokens, sleeping until the rate allows it.
+
+        Taking more tokens than are saved up is allowed. The bucket goes
+        into debt, and the next caller waits for it to be repaid.
+
+        :param tokens: Tokens to take
+        :type tokens: float
+        :return: Seconds slept
+        :rtype: float
+        """
+        with self._lock:
+            now = time.time()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self._stamp) * self.rate
+            )
+            self._stamp = now
+            self.tokens -= tokens
+            wait = max(0.0, -self.tokens / self.rate)
+            self.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class Throttle(object):
+    """Limits on bytes and files per second"""
+
+    def __init__(self, max_rate=None, max_file_rate=None):
+        """Constructor for Throttle.
+
+        :param max_rate: Bytes per second, defaults to unlimited
+        :type max_rate: float, optional
+        :param max_file_rate: Files per second, defaults to unlimited
+        :type max_file_rate: float, optional
+        """
+        super(Throttle, self).__init__()
+        self.bytes = TokenBucket(max_rate) if max_rate else None
+        self.files = TokenBucket(max_file_rate) if max_file_rate else None
+
+    def __nonzero__(self):
+        return bool(self.bytes or self.files)
+
+    __bool__ = __nonzero__
+
+    def __repr__(self):
+        return "Throttle({0} bytes/s, {1} files/s)".format(
+            self.bytes.rate if self.bytes else "unlimited",
+            self.files.rate if self.files else "unlimited"
+        )
+
+    @property
+    def waited(self):
+        """Total seconds spent waiting.
+
+        :return: Seconds
+        :rtype: float
+        """
+        return sum(x.waited for x in [self.bytes, self.files] if x)
+
+    def __enter__(self):
+        enable(self)
+        return self
+
+    def __exit__(self, *args):
+        enable(None)
+
+
+def enable(throttle):
+    """Apply a throttle to every stage of the deploy.
+
+    :param throttle: Throttle, None to stop throttling
+    :type throttle: :class:`Throttle`, None
+    """
+    global _active  # pylint: disable=global-statement
+    _active = throttle if throttle else None
+    if _active:
+        logger.debug("Throttling to {0}".format(_active))
+
+
+def consume(size=0, files=0):
+    """Account for I/O, sleeping if it is over the active throttle.
+
+    :param size: Bytes read or written, defaults to 0
+    :type size: int, optional
+    :param files: Files opened, defaults to 0
+    :type files: int, optional
+    """
+    throttle = _active
+    if throttle is None:
+        return
+    if size and throttle.bytes:
+        throttle.bytes.consume(size)
+    if files and throttle.files:
+        throttle.files.consume(files)
+
+
+def parse_rate(value):
+    """Parse a rate such as ``512K`` or ``20M``.
+
+    :param value: Number with an optional K, M or G suffix
+    :type value: str
+    :return: Bytes per second
+    :rtype: float
+    :raises ValueError: Not a rate
+    """
+    match = re.match(r"^\s*([\d.]+)\s*([KMG]?)(?:I?B)?(?:/S)?\s*$",
+                     value.upper())
+    if not match:
+        raise ValueError("Invalid rate: {0}".format(value))
+    return float(match.group(1)) * UNITS[match.group(2)]
+
+
+def idle_priority():
+    """Lower this process to idle I/O priority.
+
+    Threads started afterwards inherit the priority.
+
+    :return: Success
+    :rtype: bool
+    """
+    if os.name != "posix":
+        logger.warning("Idle I/O priority is not supported on this platform")
+        return False
+    try:
+        with open(os.devnull, "w") as devnull:
+            returncode = subprocess.call(
+                ["ionice", "-c", "3", "-p", str(os.getpid())],
+                stdout=devnull,
+                stderr=subprocess.STDOUT
+            )
+    except OSError:
+        returncode = None
+    if returncode != 0:
+        logger.warning("Unable to set idle I/O priority with ionice")
+        return False
+    logger.debug("Running with idle I/O priority")
+    return True
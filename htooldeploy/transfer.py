@@ -0,0 +1,239 @@
+"""Compressed Transfer
+
+When the installation target is on the other end of a slow link, it is
+cheaper to compress a tool on the way out than to copy raw bytes. The
+tool's files are packed into a tar stream, compressed with :mod:`zlib`
+and piped to a receiver (see :mod:`htooldeploy.receiver`) which unpacks
+them into the target site directories.
+::
+    htooldeploy --remote "ssh farm01 python -m htooldeploy.receiver \\
+        /home/artist/houdini18.0" ~/dev/test_tool
+
+The receiver can run locally as a stand-in for a remote host.
+"""
+import logging
+import os
+import tarfile
+import zlib
+
+from . import throttle
+
+logger = logging.getLogger("htooldeploy")
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+class CompressedWriter(object):
+    """File-like object compressing everything written to it"""
+
+    def __init__(self, fileobj, level=COMPRESS_LEVEL, chunk_size=CHUNK_SIZE):
+        """Constructor for CompressedWriter.
+
+        :param fileobj: File object to write compressed data to
+        :type fileobj: file
+        :param level: :mod:`zlib` compression level from 0-9, defaults
+            to 6
+        :type level: int, optional
+        :param chunk_size: Bytes to collect before compressing, defaults
+            to 1MB
+        :type chunk_size: int, optional
+        """
+        super(CompressedWriter, self).__init__()
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._compressor = zlib.compressobj(level)
+        self._buffer = list()
+        self._buffered = 0
+
+    def write(self, data):
+        """Buffer data and compress it a chunk at a time.
+
+        :param data: Data to write
+        :type data: bytes
+        """
+        throttle.consume(len(data))
+        self._buffer.append(data)
+        self._buffered += len(data)
+        self.bytes_in += len(data)
+        if self._buffered >= self.chunk_size:
+            self._flush_buffer()
+
+    def close(self):
+        """Compress any remaining data and finish the stream"""
+        self._flush_buffer()
+        self._write(self._compressor.flush())
+        self.fileobj.flush()
+
+    def _flush_buffer(self):
+        """Compress and write the buffered data"""
+        if self._buffer:
+            self._write(self._compressor.compress(b"".join(self._buffer)))
+        self._buffer = list()
+        self._buffered = 0
+
+    def _write(self, data):
+        """Write compressed data to the underlying file object.
+
+        :param data: Compressed data
+        :type data: bytes
+        """
+        if data:
+            self.bytes_out += len(data)
+            self.fileobj.write(data)
+
+
+class CompressedReader(object):
+    """File-like object decompressing a stream as it is read"""
+
+    def __init__(self, fileobj, chunk_size=CHUNK_SIZE):
+        """Constructor for CompressedReader.
+
+        :param fileobj: File object to read compressed data from
+        :type fileobj: file
+        :param chunk_size: Compressed bytes to read at a time, defaults
+            to 1MB
+        :type chunk_size: int, optional
+        """
+        super(CompressedReader, self).__init__()
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self._decompressor = zlib.decompressobj()
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size=-1):
+        """Read decompressed data.
+
+        :param size: Number of bytes to read, defaults to everything
+        :type size: int, optional
+        :return: Decompressed data
+        :rtype: bytes
+        """
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            data = (
+                self._decompressor.unconsumed_tail
+                or self.fileobj.read(self.chunk_size)
+            )
+            if data:
+                self._buffer += self._decompressor.decompress(
+                    data, self.chunk_size
+                )
+            else:
+                self._buffer += self._decompressor.flush()
+                self._eof = True
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def send(files, fileobj, level=COMPRESS_LEVEL, chunk_size=CHUNK_SIZE):
+    """Pack files into a compressed stream.
+
+    :param files: List of ``(path, relative_path)`` tuples to send.
+        Directories are sent without their contents
+    :type files: list
+    :param fileobj: File object to write the stream to, such as a
+        receiver's stdin
+    :type fileobj: file
+    :param level: :mod:`zlib` compression level from 0-9, defaults to 6
+    :type level: int, optional
+    :param chunk_size: Bytes to compress at a time, defaults to 1MB
+    :type chunk_size: int, optional
+    :return: Tuple of ``(bytes_in, bytes_out)``
+    :rtype: tuple
+    """
+    writer = CompressedWriter(fileobj, level=level, chunk_size=chunk_size)
+    archive = tarfile.open(
+        fileobj=writer, mode="w|", bufsize=chunk_size, dereference=True
+    )
+    for path, relpath in files:
+        archive.add(path, arcname=relpath, recursive=False)
+    archive.close()
+    writer.close()
+    logger.debug(
+        "Sent {0} bytes as {1} compressed bytes".format(
+            writer.bytes_in, writer.bytes_out)
+    )
+    return writer.bytes_in, writer.bytes_out
+
+
+def check_site_dir(target_root, relpath, is_dir=False):
+    """Make sure the target already has a path's top level directory.
+
+    :param target_root: Installation target
+    :type target_root: str
+    :param relpath: Path relative to the target
+    :type relpath: str
+    :param is_dir: The path is a directory, defaults to False
+    :type is_dir: bool, optional
+    :raises IOError: The target or the top level directory is missing
+    """
+    parts = relpath.replace("\\", "/").split("/")
+    if not os.path.isdir(target_root):
+        missing = target_root
+    elif (is_dir or len(parts) > 1) \
+            and not os.path.isdir(os.path.join(target_root, parts[0])):
+        missing = os.path.join(target_root, parts[0])
+    else:
+        return
+    raise IOError(
+        "Missing {0}. Try running again with the \"--force\" flag".format(
+            missing)
+    )
+
+
+def receive(fileobj, target_root, chunk_size=CHUNK_SIZE, force=True):
+    """Unpack a compressed stream into a target directory.
+
+    Members with absolute paths or paths leaving the target directory,
+    including through symbolic links already in the target, are
+    skipped.
+
+    :param fileobj: File object to read the stream from
+    :type fileobj: file
+    :param target_root: Directory to unpack into
+    :type target_root: str
+    :param chunk_size: Bytes to read at a time, defaults to 1MB
+    :type chunk_size: int, optional
+    :param force: Create the target, and top level directories sent in
+        the stream that are missing from it, defaults to True
+    :type force: bool, optional
+    :raises IOError: The target or a top level directory is missing,
+        without force
+    :return: Relative paths of the unpacked files
+    :rtype: list
+    """
+    target_root = os.path.realpath(target_root)
+    reader = CompressedReader(fileobj, chunk_size=chunk_size)
+    archive = tarfile.open(fileobj=reader, mode="r|", bufsize=chunk_size)
+    received = list()
+    for member in archive:
+        path = os.path.realpath(os.path.join(target_root, member.name))
+        if not path.startswith(target_root + os.sep):
+            logger.warning("Skipping unsafe path {0}".format(member.name))
+            continue
+        if not force:
+            try:
+                check_site_dir(
+                    target_root, os.path.relpath(path, target_root),
+                    member.isdir()
+                )
+            except IOError:
+                archive.close()
+                raise
+        if member.isfile():
+            parent = os.path.dirname(path)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            if os.path.islink(path) or (
+                    os.path.isfile(path) and os.stat(path).st_nlink > 1):
+                os.remove(path)
+        archive.extract(member, target_root)
+        if not member.isdir():
+            received.append(member.name)
+    archive.close()
+    return received
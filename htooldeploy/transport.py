@@ -0,0 +1,341 @@
+"""Multi-Host Push
+
+Deploying the same tool to many hosts one at a time repeats the same
+scanning and copying for every host. Instead, a :class:`Snapshot` of the
+tool is taken once and pushed to many hosts at the same time. Each host
+reports the hashes of the files it already has, so only changed files
+are sent.
+::
+    htooldeploy --push farm01 farm02 farm03 ~/dev/test_tool /opt/houdini
+
+Hosts are reached through a :class:`Transport`. A
+:class:`LocalTransport` writes to a directory on this machine, and a
+:class:`ShellTransport` runs :mod:`htooldeploy.receiver` through a
+remote shell such as ``ssh``.
+
+As with a local install, a missing target or site directory on a host
+is only created with ``--force``.
+"""
+import abc
+import json
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import time
+
+from multiprocessing.pool import ThreadPool
+
+from . import hashing
+from . import transfer
+
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote  # pylint: disable=deprecated-module
+
+logger = logging.getLogger("htooldeploy")
+
+# Abstract base usable from both Python 2 and 3
+ABC = abc.ABCMeta("ABC", (object,), {})
+
+
+class Snapshot(object):
+    """Files and hashes of a tool, taken once before pushing"""
+
+    def __init__(self, files, cache=None):
+        """Constructor for Snapshot.
+
+        :param files: List of ``(path, relative_path)`` tuples
+        :type files: list
+        :param cache: Cache of file hashes, defaults to None
+        :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+        """
+        super(Snapshot, self).__init__()
+        self.files = [
+            (path, relpath, hashing.file_hash(path, cache=cache))
+            for path, relpath in files
+        ]
+
+    def __len__(self):
+        return len(self.files)
+
+    def changed(self, manifest):
+        """Files that differ from a host's manifest.
+
+        :param manifest: Mapping of relative path to hash on the host
+        :type manifest: dict
+        :return: List of ``(path, relative_path)`` tuples to send
+        :rtype: list
+        """
+        return [
+            (path, relpath) for path, relpath, digest in self.files
+            if manifest.get(relpath) != digest
+        ]
+
+
+class PushResult(object):
+    """Outcome of pushing a snapshot to one host"""
+
+    def __init__(self, host):
+        super(PushResult, self).__init__()
+        self.host = host
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.error = None
+
+    def __repr__(self):
+        if self.error:
+            return "{0}: failed ({1})".format(self.host, self.error)
+        return "{0}: {1} files, {2} bytes in {3:.2f}s ({4:.2f} MB/s)".format(
+            self.host, self.files, self.bytes, self.seconds, self.throughput
+        )
+
+    @property
+    def throughput(self):
+        """Transfer rate in megabytes per second.
+
+        :return: MB/s
+        :rtype: float
+        """
+        if not self.seconds:
+            return 0.0
+        return self.bytes / self.seconds / (1024.0 * 1024.0)
+
+
+class Transport(ABC):
+    """Abstract base class for reaching an installation target.
+
+    Subclasses implement :meth:`manifest` and :meth:`send`.
+    """
+
+    def __init__(self, host, root, force=True):
+        """Constructor for Transport.
+
+        :param host: Name of the host
+        :type host: str
+        :param root: Installation target on the host
+        :type root: str
+        :param force: Create the target and site directories missing on
+            the host, defaults to True
+        :type force: bool, optional
+        """
+        super(Transport, self).__init__()
+        self.host = host
+        self.root = root
+        self.force = force
+
+    def __repr__(self):
+        return "{0}({1}:{2})".format(
+            self.__class__.__name__, self.host, self.root
+        )
+
+    @abc.abstractmethod
+    def manifest(self, relpaths):
+        """Hashes of files already on the host.
+
+        :param relpaths: Relative paths to look up
+        :type relpaths: list
+        :return: Mapping of relative path to hash, for files that exist
+        :rtype: dict
+        """
+
+    @abc.abstractmethod
+    def send(self, files):
+        """Send files to the host.
+
+        :param files: List of ``(path, relative_path)`` tuples
+        :type files: list
+        :return: Number of bytes sent
+        :rtype: int
+        """
+
+
+class LocalTransport(Transport):
+    """Copy to a directory on this machine"""
+
+    def __init__(self, root, host="localhost", force=True):
+        super(LocalTransport, self).__init__(host, root, force=force)
+
+    def manifest(self, relpaths):
+        return local_manifest(self.root, relpaths)
+
+    def send(self, files):
+        if not self.force:
+            for _, relpath in files:
+                transfer.check_site_dir(self.root, relpath)
+        sent = 0
+        for path, relpath in files:
+            target = os.path.join(self.root, relpath)
+            parent = os.path.dirname(target)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            temp = "{0}.{1}.tmp".format(target, os.getpid())
+            shutil.copy2(path, temp)
+            os.rename(temp, target)
+            sent += os.path.getsize(path)
+        return sent
+
+
+class ShellTransport(Transport):
+    """Run :mod:`htooldeploy.receiver` through a remote shell"""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+            self,
+            host,
+            root,
+            shell="ssh",
+            python="python",
+            compress_level=transfer.COMPRESS_LEVEL,
+            chunk_size=transfer.CHUNK_SIZE,
+            force=True
+    ):
+        """Constructor for ShellTransport.
+
+        :param host: Host to connect to
+        :type host: str
+        :param root: Installation target on the host
+        :type root: str
+        :param shell: Remote shell command, the host is appended to it.
+            An empty string runs the receiver locally, defaults to "ssh"
+        :type shell: str, optional
+        :param python: Python interpreter on the host, defaults to
+            "python"
+        :type python: str, optional
+        :param compress_level: Compression level from 0-9, defaults to 6
+        :type compress_level: int, optional
+        :param chunk_size: Bytes to compress at a time, defaults to 1MB
+        :type chunk_size: int, optional
+        :param force: Pass ``--force`` to the receiver, defaults to True
+        :type force: bool, optional
+        """
+        super(ShellTransport, self).__init__(host, root, force=force)
+        self.shell = shell
+        self.python = python
+        self.compress_level = compress_level
+        self.chunk_size = chunk_size
+
+    def command(self, *args):
+        """Build the command that runs the receiver on the host.
+
+        :param args: Arguments for the receiver
+        :type args: str
+        :return: Command
+        :rtype: list
+        """
+        command = [self.python, "-m", "htooldeploy.receiver"] + list(args)
+        if not self.shell:
+            return command
+        return (
+            shlex.split(self.shell) + [self.host]
+            + [" ".join(quote(x) for x in command)]
+        )
+
+    def manifest(self, relpaths):
+        process = subprocess.Popen(
+            self.command("--manifest", self.root),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+        output, _ = process.communicate("\n".join(relpaths).encode("utf-8"))
+        if process.returncode:
+            raise IOError(
+                "Manifest exited with code {0}".format(process.returncode)
+            )
+        return json.loads(output.decode("utf-8"))
+
+    def send(self, files):
+        args = ["--chunk-size", str(self.chunk_size), self.root]
+        if self.force:
+            args.insert(0, "--force")
+        process = subprocess.Popen(
+            self.command(*args), stdin=subprocess.PIPE
+        )
+        try:
+            bytes_in, _ = transfer.send(
+                files,
+                process.stdin,
+                level=self.compress_level,
+                chunk_size=self.chunk_size
+            )
+        finally:
+            try:
+                process.stdin.close()
+            except (IOError, OSError):
+                # The receiver has already gone, its exit code says why
+                pass
+            process.wait()
+        if process.returncode:
+            raise IOError(
+                "Receiver exited with code {0}".format(process.returncode)
+            )
+        return bytes_in
+
+
+def local_manifest(root, relpaths, cache=None):
+    """Hash the files that exist beneath a directory.
+
+    :param root: Directory to look in
+    :type root: str
+    :param relpaths: Relative paths to hash
+    :type relpaths: list
+    :param cache: Cache of file hashes, defaults to None
+    :type cache: :class:`~htooldeploy.hashing.HashCache`, optional
+    :return: Mapping of relative path to hash, for files that exist
+    :rtype: dict
+    """
+    manifest = dict()
+    for relpath in relpaths:
+        path = os.path.join(root, relpath)
+        if os.path.isfile(path):
+            manifest[relpath] = hashing.file_hash(path, cache=cache)
+    return manifest
+
+
+def push(snapshot, transports, jobs=4):
+    """Push a snapshot to many hosts at once.
+
+    :param snapshot: Snapshot of the tool
+    :type snapshot: :class:`Snapshot`
+    :param transports: One transport per host
+    :type transports: list
+    :param jobs: Number of hosts to push to at once, defaults to 4
+    :type jobs: int, optional
+    :return: One result per host
+    :rtype: list
+    """
+    relpaths = [x[1] for x in snapshot.files]
+
+    def _push(transport):
+        result = PushResult(transport.host)
+        start = time.time()
+        try:
+            changed = snapshot.changed(transport.manifest(relpaths))
+            logger.debug(
+                "{0}: {1} of {2} files changed".format(
+                    transport.host, len(changed), len(snapshot))
+            )
+            if changed:
+                result.bytes = transport.send(changed)
+            result.files = len(changed)
+        except (IOError, OSError, ValueError) as error:
+            result.error = error
+        result.seconds = time.time() - start
+        return result
+
+    pool = ThreadPool(max(1, min(jobs, len(transports))))
+    try:
+        results = pool.map(_push, transports)
+    finally:
+        pool.close()
+        pool.join()
+
+    for result in results:
+        if result.error:
+            logger.error(result)
+        else:
+            logger.info(result)
+    return results
@@ -0,0 +1,93 @@
+"""Unit Tests"""
+# pylint: disable=protected-access
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.analyze import StartupAnalyzer
+
+
+class TestStartupAnalyzer(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.prefs = tempfile.mkdtemp()
+        self.tool = tempfile.mkdtemp()
+        for dir_ in ["otls", "toolbar", "packages"]:
+            os.makedirs(os.path.join(self.prefs, dir_))
+        os.makedirs(os.path.join(self.tool, "otls"))
+        os.makedirs(os.path.join(self.tool, "python2.7libs", "tool"))
+        for name in ["a.hda", "b.hda"]:
+            open(os.path.join(self.tool, "otls", name), "w").close()
+        package = {
+            "path": self.tool,
+            "env": [
+                {
+                    "HOUDINI_OTLSCAN_PATH": {
+                        "value": [os.path.join(self.tool, "otls")],
+                        "method": "append"
+                    }
+                }
+            ]
+        }
+        package_file = os.path.join(self.prefs, "packages", "tool-1.0.json")
+        with open(package_file, "w") as file_:
+            json.dump(package, file_)
+
+    def tearDown(self):
+        shutil.rmtree(self.prefs)
+        shutil.rmtree(self.tool)
+
+    def test_entries(self):
+        """Package paths add implicit scan entries"""
+        analyzer = StartupAnalyzer(self.prefs)
+        analyzer.analyze()
+        otlscan = analyzer.totals()["HOUDINI_OTLSCAN_PATH"]
+        self.assertEqual(otlscan, (3, 3, 4))
+        self.assertIn("HOUDINI_PYTHONPATH", analyzer.totals())
+
+    def test_packages_dir(self):
+        """A packages directory resolves to its prefs directory"""
+        analyzer = StartupAnalyzer(os.path.join(self.prefs, "packages"))
+        self.assertEqual(analyzer.prefs_dir, os.path.abspath(self.prefs))
+
+    def test_redundant_otlscan(self):
+        """Explicitly appended otls are already scanned"""
+        analyzer = StartupAnalyzer(self.prefs)
+        analyzer.analyze()
+        redundant = analyzer.redundant_otlscan()
+        self.assertEqual(len(redundant), 1)
+        self.assertEqual(len(analyzer.duplicates()), 1)
+        self.assertTrue(analyzer.report())
+
+    def test_non_path_env(self):
+        """Variables that aren't search paths are ignored"""
+        package = {
+            "env": [
+                {"HOUDINI_NO_START_PAGE_SPLASH": 1},
+                {"HOUDINI_OTLSCAN_PATH": [2, self.tool]}
+            ]
+        }
+        package_file = os.path.join(self.prefs, "packages", "other.json")
+        with open(package_file, "w") as file_:
+            json.dump(package, file_)
+        analyzer = StartupAnalyzer(self.prefs)
+        analyzer.analyze()
+        self.assertNotIn("HOUDINI_NO_START_PAGE_SPLASH", analyzer.totals())
+
+    def test_invalid_package(self):
+        """Packages that aren't JSON objects are reported, not fatal"""
+        packages_dir = os.path.join(self.prefs, "packages")
+        with open(os.path.join(packages_dir, "list.json"), "w") as file_:
+            json.dump([self.tool], file_)
+        with open(os.path.join(packages_dir, "env.json"), "w") as file_:
+            json.dump({"env": "HOUDINI_PATH"}, file_)
+        analyzer = StartupAnalyzer(self.prefs)
+        analyzer.analyze()
+        invalid = [os.path.basename(path) for path, _ in analyzer.invalid]
+        self.assertEqual(invalid, ["list.json"])
+        self.assertTrue(analyzer.report())
@@ -0,0 +1,78 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from htooldeploy import bytecode
+
+
+class TestBytecode(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.lib_dir = os.path.join(
+            self.root, "python{0}.{1}libs".format(*sys.version_info[:2])
+        )
+        os.makedirs(os.path.join(self.lib_dir, "tool"))
+        for name in ["__init__.py", "tools.py"]:
+            with open(os.path.join(self.lib_dir, "tool", name), "w") as file_:
+                file_.write("VALUE = 1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_lib_version(self):
+        """Version is parsed from the directory name"""
+        self.assertEqual(bytecode.lib_version("python2.7libs"), "2.7")
+        self.assertIsNone(bytecode.lib_version("otls"))
+
+    def test_compile_lib(self):
+        """Sources are compiled and tracked"""
+        self.assertTrue(bytecode.compile_lib(self.lib_dir, jobs=2))
+        manifest = os.path.join(self.lib_dir, bytecode.BYTECODE_MANIFEST)
+        with open(manifest, "r") as file_:
+            compiled = file_.read().splitlines()
+        self.assertEqual(len(compiled), 2)
+
+    def test_compile_paths(self):
+        """Only the given sources are compiled"""
+        source = os.path.join(self.lib_dir, "tool", "tools.py")
+        self.assertTrue(bytecode.compile_lib(
+            self.lib_dir, paths=[source, "/elsewhere/other.py"]))
+        manifest = os.path.join(self.lib_dir, bytecode.BYTECODE_MANIFEST)
+        with open(manifest, "r") as file_:
+            compiled = file_.read().splitlines()
+        self.assertEqual(len(compiled), 1)
+        self.assertIn("tools.", compiled[0])
+
+    def test_orphans(self):
+        """Bytecode of removed sources is cleaned up"""
+        bytecode.compile_lib(self.lib_dir)
+        os.remove(os.path.join(self.lib_dir, "tool", "tools.py"))
+        removed = bytecode.remove_orphans(self.lib_dir)
+        self.assertEqual(len(removed), 1)
+
+    def test_orphans_roots(self):
+        """Only the given top level names are checked"""
+        other = os.path.join(self.lib_dir, "other")
+        os.makedirs(other)
+        with open(os.path.join(other, "__init__.py"), "w") as file_:
+            file_.write("VALUE = 1\n")
+        bytecode.compile_lib(self.lib_dir)
+        os.remove(os.path.join(other, "__init__.py"))
+        os.remove(os.path.join(self.lib_dir, "tool", "tools.py"))
+        removed = bytecode.remove_orphans(self.lib_dir, roots={"tool"})
+        self.assertEqual(len(removed), 1)
+        self.assertIn("tools.", removed[0])
+        manifest = os.path.join(self.lib_dir, bytecode.BYTECODE_MANIFEST)
+        with open(manifest, "r") as file_:
+            compiled = file_.read().splitlines()
+        self.assertEqual(len(compiled), 2)
+        removed = bytecode.remove_orphans(self.lib_dir)
+        self.assertEqual(len(removed), 1)
+        self.assertIn("other", removed[0])
@@ -0,0 +1,70 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from htooldeploy import copier
+
+
+class TestCopier(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "source.bgeo")
+        self.data = os.urandom(100000)
+        with open(self.source, "wb") as file_:
+            file_.write(self.data)
+        os.chmod(self.source, 0o750)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_backends(self):
+        """Every backend copies contents, mode and times"""
+        for backend in copier.BACKENDS:
+            target = os.path.join(self.root, backend)
+            copied = copier.copy_file(
+                self.source, target, backend=backend, buffer_size=4096
+            )
+            self.assertEqual(copied, len(self.data))
+            with open(target, "rb") as file_:
+                self.assertEqual(file_.read(), self.data)
+            self.assertEqual(
+                stat.S_IMODE(os.stat(target).st_mode), 0o750
+            )
+            self.assertEqual(
+                int(os.path.getmtime(target)),
+                int(os.path.getmtime(self.source))
+            )
+
+    def test_no_zero_copy(self):
+        """Asking for zero-copy without it warns and streams"""
+        names = [x for x in ["copy_file_range", "sendfile"]
+                 if hasattr(os, x)]
+        functions = [getattr(os, x) for x in names]
+        for name in names:
+            delattr(os, name)
+        # pylint: disable=protected-access
+        copier._warned = False
+        target = os.path.join(self.root, "target")
+        try:
+            copier.copy_file(self.source, target, backend="sendfile")
+        finally:
+            for name, function in zip(names, functions):
+                setattr(os, name, function)
+        self.assertTrue(copier._warned)
+        with open(target, "rb") as file_:
+            self.assertEqual(file_.read(), self.data)
+
+    def test_overwrite(self):
+        """A longer existing target is replaced"""
+        target = os.path.join(self.root, "target")
+        with open(target, "wb") as file_:
+            file_.write(self.data * 2)
+        copier.copy_file(self.source, target)
+        self.assertEqual(os.path.getsize(target), len(self.data))
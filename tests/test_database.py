@@ -0,0 +1,52 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from htooldeploy import database
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (name TEXT PRIMARY KEY);
+CREATE INDEX IF NOT EXISTS items_name ON items (name);
+"""
+
+
+class TestDatabase(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "db", "test.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_first_use(self):
+        """Many connections can create the schema at once"""
+        errors = list()
+
+        def _connect():
+            try:
+                connection = database.connect(self.path, SCHEMA)
+                connection.execute("SELECT * FROM items").fetchall()
+                connection.close()
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+
+        threads = [threading.Thread(target=_connect) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_version(self):
+        """The schema version is recorded"""
+        connection = database.connect(self.path, SCHEMA, version=2)
+        version = connection.execute("PRAGMA user_version").fetchall()
+        connection.close()
+        self.assertEqual(version[0][0], 2)
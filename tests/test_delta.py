@@ -0,0 +1,78 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from htooldeploy import delta
+
+BLOCK_SIZE = 1024
+
+
+class TestDelta(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "source.bgeo")
+        self.target = os.path.join(self.root, "target.bgeo")
+        self.data = bytearray(os.urandom(BLOCK_SIZE * 20 + 100))
+        with open(self.target, "wb") as file_:
+            file_.write(bytes(self.data))
+        # Older than any source, so the size and mtime check never skips
+        mtime = time.time() - 3600
+        os.utime(self.target, (mtime, mtime))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _sync(self):
+        """Write the source and sync it to the target"""
+        with open(self.source, "wb") as file_:
+            file_.write(bytes(self.data))
+        written = delta.sync_file(self.source, self.target, BLOCK_SIZE)
+        with open(self.target, "rb") as file_:
+            self.assertEqual(file_.read(), bytes(self.data))
+        return written
+
+    def test_in_place(self):
+        """Only the changed block is written"""
+        self.data[BLOCK_SIZE * 5 + 10] ^= 0xff
+        self.assertEqual(self._sync(), BLOCK_SIZE)
+
+    def test_insertion(self):
+        """Shifted blocks are still found"""
+        self.data[100:100] = b"inserted"
+        with open(self.source, "wb") as file_:
+            file_.write(bytes(self.data))
+        operations = delta.delta(
+            self.source, delta.signature(self.target, BLOCK_SIZE), BLOCK_SIZE
+        )
+        literal = sum(x[2] for x in operations if x[0] == "data")
+        self.assertLessEqual(literal, BLOCK_SIZE + len(b"inserted"))
+        self.assertLessEqual(self._sync(), BLOCK_SIZE + len(b"inserted"))
+
+    def test_truncate(self):
+        """A shorter source truncates the target"""
+        del self.data[-500:]
+        self._sync()
+
+    def test_up_to_date(self):
+        """Files with the same size and mtime are not scanned"""
+        shutil.copy2(self.target, self.source)
+        self.assertEqual(
+            delta.sync_file(self.source, self.target, BLOCK_SIZE), 0
+        )
+
+    def test_too_many_changes(self):
+        """A delta isn't worth it for a mostly rewritten file"""
+        with open(self.source, "wb") as file_:
+            file_.write(os.urandom(len(self.data)))
+        self.assertIsNone(
+            delta.sync_file(self.source, self.target, BLOCK_SIZE)
+        )
+        with open(self.target, "rb") as file_:
+            self.assertEqual(file_.read(), bytes(self.data))
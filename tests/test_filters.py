@@ -0,0 +1,92 @@
+"""Unit Tests"""
+
+
+import unittest
+
+from htooldeploy.filters import IgnoreRules, PathFilter
+
+
+class TestPathFilter(unittest.TestCase):
+    """Unit tests"""
+
+    def test_empty(self):
+        """An empty filter allows everything"""
+        path_filter = PathFilter()
+        self.assertFalse(path_filter)
+        self.assertTrue(path_filter.site_dir_allowed("otls"))
+        self.assertTrue(path_filter.file_allowed("otls/a.hda"))
+
+    def test_site_dirs(self):
+        """Only chosen site directories are allowed"""
+        path_filter = PathFilter(site_dirs=["python2.7libs"])
+        self.assertTrue(path_filter.site_dir_allowed("python2.7libs"))
+        self.assertFalse(path_filter.site_dir_allowed("otls"))
+
+    def test_include(self):
+        """Unrelated directories are pruned"""
+        path_filter = PathFilter(include=["python2.7libs/tool/*.py"])
+        self.assertTrue(path_filter.dir_allowed("python2.7libs"))
+        self.assertTrue(path_filter.dir_allowed("python2.7libs/tool"))
+        self.assertFalse(path_filter.dir_allowed("python2.7libs/other"))
+        self.assertFalse(path_filter.site_dir_allowed("otls"))
+        self.assertTrue(path_filter.file_allowed("python2.7libs/tool/a.py"))
+
+        path_filter = PathFilter(include=["otls"])
+        self.assertTrue(path_filter.file_allowed("otls/sub/a.hda"))
+
+    def test_same_globs(self):
+        """Patterns follow the same glob rules as ignore files"""
+        path_filter = PathFilter(include=["otls/*.hda"])
+        self.assertTrue(path_filter.file_allowed("otls/a.hda"))
+        self.assertFalse(path_filter.file_allowed("otls/sub/a.hda"))
+        self.assertFalse(IgnoreRules(["otls/*.hda"]).ignored("otls/sub/a.hda"))
+
+        path_filter = PathFilter(exclude=["scripts/*.py"])
+        self.assertFalse(path_filter.file_allowed("scripts/a.py"))
+        self.assertTrue(path_filter.file_allowed("scripts/sub/a.py"))
+
+        path_filter = PathFilter(include=["**/*.py"])
+        self.assertTrue(path_filter.file_allowed("python2.7libs/tool/a.py"))
+
+    def test_exclude(self):
+        """Names are excluded at any depth"""
+        path_filter = PathFilter(exclude=["*.bak", "geo/cache"])
+        self.assertFalse(path_filter.file_allowed("otls/sub/a.hda.bak"))
+        self.assertFalse(path_filter.dir_allowed("geo/cache"))
+        self.assertTrue(path_filter.dir_allowed("geo/other"))
+
+
+class TestIgnoreRules(unittest.TestCase):
+    """Unit tests"""
+
+    def test_patterns(self):
+        """Gitignore style patterns"""
+        rules = IgnoreRules(
+            [
+                "# comment",
+                "*.py[cod]",
+                "__pycache__/",
+                "/source/geo/cache",
+                "**/otls/backup",
+                "*.bak",
+                "!keep.bak",
+            ],
+            base="source"
+        )
+        self.assertEqual(len(rules), 6)
+        self.assertTrue(rules.ignored("python2.7libs/tool/a.pyc"))
+        self.assertFalse(rules.ignored("python2.7libs/tool/a.py"))
+        self.assertTrue(rules.ignored("scripts/__pycache__", is_dir=True))
+        self.assertFalse(rules.ignored("scripts/__pycache__"))
+        self.assertTrue(rules.ignored("geo/cache", is_dir=True))
+        self.assertFalse(rules.ignored("otls/geo/cache", is_dir=True))
+        self.assertTrue(rules.ignored("otls/backup", is_dir=True))
+        self.assertTrue(rules.ignored("otls/a.hda.bak"))
+        self.assertFalse(rules.ignored("otls/keep.bak"))
+
+    def test_filter(self):
+        """Ignored directories are pruned"""
+        path_filter = PathFilter(ignore=IgnoreRules(["backup/"]))
+        self.assertTrue(path_filter)
+        self.assertFalse(path_filter.dir_allowed("otls/backup"))
+        self.assertTrue(path_filter.file_allowed("otls/backup"))
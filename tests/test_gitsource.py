@@ -0,0 +1,105 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import unittest
+
+from htooldeploy.gitsource import GitTree, blob_hash, current_umask
+
+
+def git(repo, *args):
+    """Run a git command in a test repo"""
+    with open(os.devnull, "w") as devnull:
+        subprocess.check_call(
+            ["git", "-C", repo, "-c", "user.name=test",
+             "-c", "user.email=test@example.com"] + list(args),
+            stdout=devnull,
+            stderr=devnull
+        )
+
+
+def write(path, contents):
+    """Write a file, creating its directory"""
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, "w") as file_:
+        file_.write(contents)
+
+
+class TestGitTree(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.repo = os.path.join(self.root, "test_tool")
+        self.target = os.path.join(self.root, "target")
+        os.makedirs(self.repo)
+        git(self.repo, "init", "-q")
+        write(os.path.join(self.repo, "source", "otls", "a.hda"), "v1")
+        write(os.path.join(self.repo, "source", "scripts", "b.py"), "b")
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "v1")
+        git(self.repo, "tag", "v1")
+        write(os.path.join(self.repo, "source", "otls", "a.hda"), "v2")
+        git(self.repo, "commit", "-q", "-a", "-m", "v2")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_write(self):
+        """Only blobs that differ from the target are written"""
+        tree = GitTree(self.repo, "v1")
+        self.assertEqual(tree.site_dirs(), ["otls", "scripts"])
+        self.assertEqual(len(tree.changed(self.target)), 2)
+        tree.write(tree.changed(self.target), self.target)
+        hda = os.path.join(self.target, "otls", "a.hda")
+        with open(hda) as file_:
+            self.assertEqual(file_.read(), "v1")
+        self.assertEqual(blob_hash(hda), tree.entries()["otls/a.hda"].sha)
+        self.assertEqual(tree.changed(self.target), [])
+
+        tree = GitTree(self.repo, "HEAD")
+        self.assertEqual(
+            [x.relpath for x in tree.changed(self.target)], ["otls/a.hda"]
+        )
+
+    @unittest.skipIf(os.name == "nt", "No executable bit")
+    def test_modes(self):
+        """Permissions follow the umask and mode changes are written"""
+        tree = GitTree(self.repo, "HEAD")
+        tree.write(tree.changed(self.target), self.target)
+        script = os.path.join(self.target, "scripts", "b.py")
+        self.assertEqual(
+            stat.S_IMODE(os.stat(script).st_mode), 0o666 & ~current_umask()
+        )
+        git(self.repo, "update-index", "--chmod=+x", "source/scripts/b.py")
+        git(self.repo, "commit", "-q", "-m", "executable")
+        tree = GitTree(self.repo, "HEAD")
+        self.assertEqual(
+            [x.relpath for x in tree.changed(self.target)], ["scripts/b.py"]
+        )
+        tree.write(tree.changed(self.target), self.target)
+        self.assertTrue(os.stat(script).st_mode & stat.S_IXUSR)
+        self.assertEqual(tree.changed(self.target), [])
+
+    def test_write_error(self):
+        """A failed write stops cat-file instead of waiting on it"""
+        write(os.path.join(self.repo, "source", "geo", "big.bgeo"),
+              "0" * 4 * 1024 * 1024)
+        git(self.repo, "add", "-A")
+        git(self.repo, "commit", "-q", "-m", "big")
+        tree = GitTree(self.repo, "HEAD")
+        write(os.path.join(self.target, "geo"), "not a directory")
+        self.assertRaises(
+            OSError, tree.write, [tree.entries()["geo/big.bgeo"]],
+            self.target
+        )
+
+    def test_diff(self):
+        """Changes between refs are listed"""
+        tree = GitTree(self.repo, "HEAD")
+        self.assertEqual(tree.diff("v1"), [("M", "otls/a.hda")])
@@ -0,0 +1,85 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from htooldeploy import hashing
+
+
+class TestHashCache(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "a.hda")
+        self.write("original")
+        self.cache_path = os.path.join(self.root, "hashes.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write(self, contents):
+        """Write the test file with a fixed modification time"""
+        with open(self.path, "w") as file_:
+            file_.write(contents)
+        mtime = int(time.time()) - 60
+        os.utime(self.path, (mtime, mtime))
+
+    def test_cached(self):
+        """Unchanged files aren't read again, across runs"""
+        cache = hashing.HashCache(self.cache_path)
+        digest = hashing.file_hash(self.path, cache=cache)
+        self.assertEqual(digest, hashing.file_hash(self.path))
+        cache.close()
+
+        # Same size and time, so the cached hash is trusted as is
+        stat = os.stat(self.path)
+        self.write("modified")
+        os.utime(self.path, (stat.st_atime, stat.st_mtime))
+        cache = hashing.HashCache(self.cache_path)
+        self.assertEqual(hashing.file_hash(self.path, cache=cache), digest)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+
+        self.write("modified again")
+        self.assertNotEqual(
+            hashing.file_hash(self.path, cache=cache), digest
+        )
+        cache.close()
+
+    def test_evict(self):
+        """Entries beyond the maximum are evicted"""
+        cache = hashing.HashCache(self.cache_path, max_entries=0)
+        hashing.file_hash(self.path, cache=cache)
+        cache.close()
+        cache = hashing.HashCache(self.cache_path)
+        hashing.file_hash(self.path, cache=cache)
+        self.assertEqual(cache.misses, 1)
+        cache.close()
+
+    def test_broken_database(self):
+        """A cache that can't be used is a miss, not an error"""
+        with open(self.cache_path, "w") as file_:
+            file_.write("not a database")
+        cache = hashing.HashCache(self.cache_path)
+        self.assertEqual(
+            hashing.file_hash(self.path, cache=cache),
+            hashing.file_hash(self.path)
+        )
+        self.assertEqual(cache.misses, 1)
+        cache.close()
+
+    def test_default_path(self):
+        """The cache location can be set from the environment"""
+        variable = os.environ.get(hashing.CACHE_VARIABLE)
+        os.environ[hashing.CACHE_VARIABLE] = self.cache_path
+        try:
+            self.assertEqual(hashing.HashCache().path, self.cache_path)
+        finally:
+            if variable is None:
+                del os.environ[hashing.CACHE_VARIABLE]
+            else:
+                os.environ[hashing.CACHE_VARIABLE] = variable
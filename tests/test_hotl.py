@@ -0,0 +1,84 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+from htooldeploy.hotl import HDAConverter
+
+HOTL_STUB = """#!{0}
+import os
+import shutil
+import sys
+
+flag, first, second = sys.argv[1:]
+if flag == "-t":
+    os.makedirs(first)
+    shutil.copy(second, os.path.join(first, "Sections.list"))
+else:
+    shutil.copy(os.path.join(first, "Sections.list"), second)
+"""
+
+
+class TestHDAConverter(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.hotl = os.path.join(self.root, "hotl")
+        with open(self.hotl, "w") as file_:
+            file_.write(HOTL_STUB.format(sys.executable))
+        os.chmod(self.hotl, os.stat(self.hotl).st_mode | stat.S_IEXEC)
+        self.otls_dir = os.path.join(self.root, "otls")
+        os.makedirs(self.otls_dir)
+        for name in ["a.hda", "b.hda", "c.hda"]:
+            with open(os.path.join(self.otls_dir, name), "w") as file_:
+                file_.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_expand_in_place(self):
+        """Binary libraries become directories"""
+        converter = HDAConverter(hotl=self.hotl, jobs=2)
+        results = converter.expand(self.otls_dir)
+        self.assertEqual(set(results.values()), set(["converted"]))
+        for name in results:
+            self.assertTrue(os.path.isdir(os.path.join(self.otls_dir, name)))
+
+    def test_collapse_skips_unchanged(self):
+        """Unchanged libraries are not collapsed twice"""
+        converter = HDAConverter(hotl=self.hotl, jobs=2)
+        converter.expand(self.otls_dir)
+        target_dir = os.path.join(self.root, "target")
+        converter.collapse(self.otls_dir, target_dir)
+        with open(os.path.join(target_dir, "a.hda"), "r") as file_:
+            self.assertEqual(file_.read(), "a.hda")
+
+        with open(os.path.join(self.otls_dir, "b.hda", "Sections.list"),
+                  "w") as file_:
+            file_.write("changed")
+        results = converter.collapse(self.otls_dir, target_dir)
+        self.assertEqual(results["a.hda"], "skipped")
+        self.assertEqual(results["b.hda"], "converted")
+
+    def test_collapse_allowed(self):
+        """Only allowed libraries are collapsed"""
+        converter = HDAConverter(hotl=self.hotl)
+        converter.expand(self.otls_dir)
+        target_dir = os.path.join(self.root, "target")
+        results = converter.collapse(
+            self.otls_dir, target_dir, allowed=lambda x: x == "a.hda"
+        )
+        self.assertEqual(list(results), ["a.hda"])
+
+    def test_missing_hotl(self):
+        """A missing hotl fails every library"""
+        converter = HDAConverter(hotl=os.path.join(self.root, "missing"))
+        results = converter.expand(self.otls_dir)
+        self.assertEqual(set(results.values()), set(["failed"]))
+        self.assertTrue(os.path.isfile(os.path.join(self.otls_dir, "a.hda")))
@@ -2,14 +2,22 @@
 # pylint: disable=protected-access,superfluous-parens
 
 
+import glob
+import json
 import os
 import shutil
+import subprocess
 import tempfile
 import unittest
 import sys
 
 # import htooldeploy.htool
 from htooldeploy.htool import HTool
+from htooldeploy.hashing import CACHE_VARIABLE
+from htooldeploy.inventory import INVENTORY_VARIABLE
+from htooldeploy.journal import InstallJournal
+from htooldeploy.locking import SHARED_LOCK, DeployLock
+from htooldeploy.slots import SlotManager
 
 
 if "darwin" not in sys.platform:
@@ -40,6 +48,22 @@ class TestHtool(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         remove_dirs()
+        # Keep installs out of the real inventory and hash cache
+        cls.database_dir = tempfile.mkdtemp()
+        cls.environ = dict()
+        for variable, name in [(INVENTORY_VARIABLE, "inventory.db"),
+                               (CACHE_VARIABLE, "hashes.db")]:
+            cls.environ[variable] = os.environ.get(variable)
+            os.environ[variable] = os.path.join(cls.database_dir, name)
+
+    @classmethod
+    def tearDownClass(cls):
+        for variable, value in cls.environ.items():
+            if value is None:
+                del os.environ[variable]
+            else:
+                os.environ[variable] = value
+        shutil.rmtree(cls.database_dir)
 
     def setUp(self):
         # Only create some, so --force can be tested
@@ -116,3 +140,293 @@ class TestHtool(unittest.TestCase):
             install_destination=TEST_PROJECT
         )
         self.assertFalse(tool.install())
+
+    def test_index_otls(self):
+        """Installed otls get an OPlibraries index"""
+        target = tempfile.mkdtemp()
+        try:
+            tool = HTool(
+                source_tool_repo=TEST_TOOL_REPO,
+                install_destination=target,
+                force=True,
+                index_otls=True
+            )
+            self.assertTrue(tool.install())
+            index_file = os.path.join(target, "otls", "OPlibraries")
+            self.assertTrue(os.path.isfile(index_file))
+        finally:
+            shutil.rmtree(target)
+
+    def test_index_otls_refresh(self):
+        """Installs without index_otls refresh an existing index"""
+        target = tempfile.mkdtemp()
+        try:
+            otls_dir = os.path.join(target, "otls")
+            os.makedirs(otls_dir)
+            index_file = os.path.join(otls_dir, "OPlibraries")
+            with open(index_file, "w") as file_:
+                file_.write("# Generated by htooldeploy\nother.hda\n")
+            open(os.path.join(otls_dir, "other.hda"), "w").close()
+            tool = HTool(
+                source_tool_repo=TEST_TOOL_REPO,
+                install_destination=target,
+                force=True
+            )
+            self.assertTrue(tool.install())
+            with open(index_file, "r") as file_:
+                lines = file_.read().splitlines()
+            self.assertIn("other.hda", lines)
+            self.assertGreater(len(lines), 2)
+        finally:
+            shutil.rmtree(target)
+
+    def test_index_otls_develop(self):
+        """Development Mode never indexes the tool's source"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            develop=True,
+            force=True,
+            index_otls=True
+        )
+        self.assertTrue(tool.install())
+        for otls_dir in tool.source_site_dirs():
+            self.assertFalse(os.path.isfile(os.path.join(
+                tool.source_path(), otls_dir, "OPlibraries")))
+
+    def test_compile_failure(self):
+        """A library that doesn't compile fails the install"""
+        broken = os.path.join(
+            TEST_TOOL_REPO, "source", "python2.7libs", "test_tool",
+            "broken.py"
+        )
+        with open(broken, "w") as file_:
+            file_.write("def broken(:\n")
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            compile_python=True
+        )
+        self.assertFalse(tool.install())
+
+    def test_shared_lock(self):
+        """Shared files wait for other tools in the same target"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            lock_timeout=0
+        )
+        with DeployLock(TEST_PROJECT, SHARED_LOCK):
+            self.assertFalse(tool.install())
+        self.assertTrue(tool.install())
+
+    def test_install_store(self):
+        """Installed files are linked from the object store"""
+        store = os.path.join(TEMP_DIR, "test_store")
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            store=store
+        )
+        try:
+            self.assertTrue(tool.install())
+            shelf = os.path.join(TEST_PROJECT, "toolbar", "test_tool.shelf")
+            self.assertGreater(os.stat(shelf).st_nlink, 1)
+            self.assertGreater(tool.bytes_copied, 0)
+
+            tool = HTool(
+                source_tool_repo=TEST_TOOL_REPO,
+                install_destination=TEST_PROJECT,
+                force=True,
+                store=store
+            )
+            self.assertTrue(tool.install())
+            self.assertEqual(tool.files_copied, 0)
+            self.assertGreater(tool.files_skipped, 0)
+        finally:
+            shutil.rmtree(store)
+
+    def test_install_slots(self):
+        """Versions install side by side and roll back"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            slots=True
+        )
+        self.assertTrue(tool.install())
+        with open(os.path.join(TEST_TOOL_REPO, "_version"), "w") as file_:
+            file_.write("__version__ = \"0.0.2\"")
+        self.assertTrue(tool.install())
+
+        manager = SlotManager(TEST_PROJECT, "tool_repo")
+        self.assertEqual(manager.versions(), ["0.0.1", "0.0.2"])
+        self.assertEqual(manager.active(), "0.0.2")
+        self.assertTrue(manager.rollback())
+        self.assertEqual(manager.active(), "0.0.1")
+        self.assertTrue(os.path.isfile(manager.package_file()))
+
+    def test_install_remote(self):
+        """Stream the tool to a local receiver"""
+        receiver = "{0} -m htooldeploy.receiver {1}".format(
+            sys.executable, TEST_PROJECT
+        )
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            remote=receiver
+        )
+        self.assertFalse(tool.install())
+        tool.force = True
+        self.assertTrue(tool.install())
+        shelf = os.path.join(TEST_PROJECT, "toolbar", "test_tool.shelf")
+        self.assertTrue(os.path.isfile(shelf))
+
+    def test_install_only(self):
+        """Only the chosen site directory is installed"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            only=["toolbar"]
+        )
+        self.assertTrue(tool.install())
+        self.assertTrue(
+            os.path.isfile(
+                os.path.join(TEST_PROJECT, "toolbar", "test_tool.shelf")
+            )
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(TEST_PROJECT, "python2.7libs"))
+        )
+
+    def test_install_missing_target(self):
+        """Missing targets are only created with force"""
+        target = os.path.join(TEST_PROJECT, "missing")
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=target
+        )
+        self.assertFalse(tool.install())
+        self.assertFalse(os.path.exists(target))
+
+    def test_install_only_missing(self):
+        """Filters that match nothing, or Development Mode, fail"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            only=["vex"]
+        )
+        self.assertFalse(tool.install())
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            develop=True,
+            force=True,
+            only=["toolbar"]
+        )
+        self.assertFalse(tool.install())
+
+    def test_install_resume(self):
+        """Files finished by an interrupted install are skipped"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True
+        )
+        self.assertTrue(tool.install())
+        journal = InstallJournal(TEST_PROJECT, tool.tool_name())
+        for source, relpath in tool.source_files():
+            target = os.path.join(TEST_PROJECT, relpath)
+            journal.start(target)
+            journal.finish(source, target)
+        journal.close()
+
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True
+        )
+        self.assertTrue(tool.install())
+        self.assertEqual(tool.files_copied, 0)
+        self.assertGreater(tool.files_skipped, 0)
+        self.assertFalse(os.path.exists(journal.path))
+
+    def test_install_inventory(self):
+        """Installs are recorded, and can be uninstalled"""
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            inventory=os.path.join(TEMP_DIR, "test_inventory.db")
+        )
+        try:
+            self.assertTrue(tool.install())
+            installs = tool.inventory.query(target=TEST_PROJECT)
+            self.assertEqual(len(installs), 1)
+            self.assertEqual(installs[0]["mode"], "copy")
+            shelf = os.path.join(TEST_PROJECT, "toolbar", "test_tool.shelf")
+            self.assertTrue(os.path.isfile(shelf))
+            self.assertTrue(
+                tool.inventory.uninstall(tool.tool_name(), TEST_PROJECT)
+            )
+            self.assertFalse(os.path.exists(shelf))
+        finally:
+            tool.inventory.close()
+            os.remove(tool.inventory.path)
+
+    def test_install_git_ref(self):
+        """Tools install from a git ref without a checkout"""
+        with open(os.devnull, "w") as devnull:
+            for args in [["init", "-q"], ["add", "-A"],
+                         ["commit", "-q", "-m", "Release"]]:
+                subprocess.check_call(
+                    ["git", "-C", TEST_TOOL_REPO, "-c", "user.name=test",
+                     "-c", "user.email=test@example.com"] + args,
+                    stdout=devnull
+                )
+        shutil.rmtree(os.path.join(TEST_TOOL_REPO, "source"))
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            git_ref="HEAD",
+            inventory=os.path.join(TEMP_DIR, "test_inventory.db")
+        )
+        try:
+            self.assertTrue(tool.install())
+            self.assertTrue(
+                os.path.isfile(
+                    os.path.join(TEST_PROJECT, "toolbar", "test_tool.shelf")
+                )
+            )
+            self.assertGreater(tool.files_copied, 0)
+        finally:
+            os.remove(tool.inventory.path)
+
+    def test_install_metrics(self):
+        """Installs export metrics of the run"""
+        metrics_log = os.path.join(TEST_PROJECT, "metrics.jsonl")
+        tool = HTool(
+            source_tool_repo=TEST_TOOL_REPO,
+            install_destination=TEST_PROJECT,
+            force=True,
+            inventory=os.path.join(TEMP_DIR, "test_inventory.db"),
+            metrics_dir=TEST_PROJECT,
+            metrics_log=metrics_log
+        )
+        try:
+            self.assertTrue(tool.install())
+            with open(metrics_log, "r") as file_:
+                run = json.load(file_)
+            self.assertTrue(run["success"])
+            self.assertEqual(run["mode"], "copy")
+            self.assertEqual(run["files_copied"], tool.files_copied)
+            self.assertTrue(
+                glob.glob(
+                    os.path.join(TEST_PROJECT, "htooldeploy_tool_repo_*.prom")
+                )
+            )
+        finally:
+            os.remove(tool.inventory.path)
@@ -0,0 +1,102 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.inventory import Inventory
+from htooldeploy.locking import DeployLock
+
+
+class TestInventory(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.target = os.path.join(self.root, "target")
+        self.inventory = Inventory(os.path.join(self.root, "inventory.db"))
+        self.files = ["otls/a.hda", "python2.7libs/tool/__init__.py"]
+        for relpath in self.files:
+            path = os.path.join(self.target, relpath)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, "w") as file_:
+                file_.write(relpath)
+
+    def tearDown(self):
+        self.inventory.close()
+        shutil.rmtree(self.root)
+
+    def test_query(self):
+        """Installs are found by tool glob and target"""
+        self.inventory.record(
+            "test_tool", self.target, "copy", self.files, version="0.1.0"
+        )
+        self.inventory.record("other", self.root, "develop", [])
+        installs = self.inventory.query("test_*")
+        self.assertEqual(len(installs), 1)
+        self.assertEqual(installs[0]["version"], "0.1.0")
+        self.assertEqual(installs[0]["files"], 2)
+        self.assertEqual(len(self.inventory.query(target=self.root)), 1)
+
+        self.inventory.record(
+            "test_tool", self.target, "copy", self.files[:1], version="0.2.0"
+        )
+        self.assertEqual(self.inventory.paths("test_tool", self.target),
+                         self.files[:1])
+
+    def test_uninstall(self):
+        """Installed files are removed, site directories are kept"""
+        self.inventory.record("test_tool", self.target, "copy", self.files)
+        self.assertTrue(self.inventory.uninstall("test_tool", self.target))
+        self.assertEqual(os.listdir(os.path.join(self.target, "otls")), [])
+        self.assertEqual(
+            os.listdir(os.path.join(self.target, "python2.7libs")), []
+        )
+        self.assertFalse(self.inventory.query("test_tool"))
+        self.assertFalse(self.inventory.uninstall("test_tool", self.target))
+
+    def test_uninstall_shared(self):
+        """Paths other tools in the target own are kept"""
+        self.inventory.record("test_tool", self.target, "copy", self.files)
+        self.inventory.record(
+            "other", self.target, "copy", ["python2.7libs/tool"]
+        )
+        self.assertTrue(self.inventory.uninstall("test_tool", self.target))
+        self.assertFalse(
+            os.path.exists(os.path.join(self.target, self.files[0]))
+        )
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.target, self.files[1]))
+        )
+        self.assertEqual(
+            self.inventory.paths("other", self.target), ["python2.7libs/tool"]
+        )
+
+    def test_uninstall_locked(self):
+        """Tools being deployed aren't uninstalled"""
+        self.inventory.record("test_tool", self.target, "copy", self.files)
+        with DeployLock(self.target, "test_tool"):
+            self.assertFalse(self.inventory.uninstall(
+                "test_tool", self.target, lock_timeout=0
+            ))
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.target, self.files[0]))
+        )
+        self.assertTrue(self.inventory.query("test_tool"))
+
+    def test_uninstall_bytecode(self):
+        """Bytecode compiled from installed sources is removed too"""
+        source = os.path.join(self.target, self.files[1])
+        cache_dir = os.path.join(os.path.dirname(source), "__pycache__")
+        os.makedirs(cache_dir)
+        for path in [source + "c",
+                     os.path.join(cache_dir, "__init__.cpython-37.pyc")]:
+            open(path, "w").close()
+        self.inventory.record("test_tool", self.target, "copy", self.files)
+        self.assertTrue(self.inventory.uninstall("test_tool", self.target))
+        self.assertEqual(
+            os.listdir(os.path.join(self.target, "python2.7libs")), []
+        )
@@ -0,0 +1,67 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.journal import SYNC_INTERVAL, InstallJournal
+
+
+class TestInstallJournal(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.target = os.path.join(self.root, "target")
+        os.makedirs(self.target)
+        self.files = list()
+        for name in ["a.txt", "b.txt"]:
+            source = os.path.join(self.root, name)
+            with open(source, "w") as file_:
+                file_.write(name)
+            target = os.path.join(self.target, name)
+            shutil.copy2(source, target)
+            self.files.append((source, target))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_resume(self):
+        """Finished files are skipped, the file in flight is not"""
+        journal = InstallJournal(self.target, "test_tool")
+        (source_a, target_a), (source_b, target_b) = self.files
+        journal.start(target_a)
+        journal.finish(source_a, target_a)
+        journal.start(target_b)
+        journal.close()
+
+        journal = InstallJournal(self.target, "test_tool")
+        self.assertEqual(len(journal), 1)
+        self.assertTrue(journal.done(source_a, target_a))
+        self.assertFalse(journal.done(source_b, target_b))
+
+        with open(source_a, "w") as file_:
+            file_.write("changed")
+        self.assertFalse(journal.done(source_a, target_a))
+
+    def test_complete(self):
+        """The journal is removed once the install finishes"""
+        journal = InstallJournal(self.target, "test_tool")
+        journal.start(self.files[0][1])
+        journal.complete()
+        self.assertEqual(sorted(os.listdir(self.target)), ["a.txt", "b.txt"])
+
+    def test_batched(self):
+        """Entries are only written a batch at a time"""
+        journal = InstallJournal(self.target, "test_tool")
+        source, target = self.files[0]
+        journal.start(target)
+        journal.finish(source, target)
+        self.assertFalse(os.path.exists(journal.path))
+        for _ in range(SYNC_INTERVAL - 1):
+            journal.finish(source, target)
+        with open(journal.path, "r") as file_:
+            self.assertEqual(len(file_.readlines()), SYNC_INTERVAL)
+        journal.close()
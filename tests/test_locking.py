@@ -0,0 +1,43 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.locking import DeployLock, LockTimeout
+
+
+class TestDeployLock(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_same_tool(self):
+        """A held lock makes the same tool wait, then time out"""
+        with DeployLock(self.root, "test_tool") as held:
+            self.assertEqual(held.holder(), str(os.getpid()))
+            lock = DeployLock(self.root, "test_tool", timeout=0.1)
+            self.assertRaises(LockTimeout, lock.acquire)
+            self.assertTrue(lock.contended)
+            self.assertGreaterEqual(lock.wait_seconds, 0.1)
+
+        with DeployLock(self.root, "test_tool", timeout=0) as lock:
+            self.assertFalse(lock.contended)
+
+    def test_other_tool(self):
+        """Different tools don't wait for each other"""
+        with DeployLock(self.root, "test_tool"):
+            with DeployLock(self.root, "other_tool", timeout=0) as lock:
+                self.assertEqual(lock.attempts, 1)
+
+    def test_missing_target(self):
+        """Missing targets aren't created"""
+        target = os.path.join(self.root, "missing")
+        self.assertRaises(OSError, DeployLock(target, "test_tool").acquire)
+        self.assertFalse(os.path.exists(target))
@@ -0,0 +1,80 @@
+"""Unit Tests"""
+
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from htooldeploy import logs
+
+
+class ListHandler(logging.Handler):
+    """Keep formatted records in a list"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.messages = list()
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class TestLogs(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.log_dir)
+
+    def _log_file(self, name, age, size=10):
+        path = os.path.join(self.log_dir, name)
+        with open(path, "w") as file_:
+            file_.write("x" * size)
+        stamp = time.time() - age * 24 * 60 * 60
+        os.utime(path, (stamp, stamp))
+        return path
+
+    def test_pipeline(self):
+        """Records reach the handlers in order, at their levels"""
+        logger = logging.getLogger("htooldeploy.test_logs")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        debug = ListHandler()
+        info = ListHandler()
+        info.setLevel(logging.INFO)
+        pipeline = logs.LogPipeline(logger, [debug, info])
+        pipeline.start()
+        for index in range(100):
+            logger.debug("File %s", index)
+        logger.info("Done")
+        pipeline.stop()
+        pipeline.stop()
+        self.assertEqual(len(debug.messages), 101)
+        self.assertEqual(debug.messages[42], "File 42")
+        self.assertEqual(info.messages, ["Done"])
+        self.assertEqual(logger.handlers, [])
+
+    def test_prune_age(self):
+        """Old log files are removed, the current one is kept"""
+        old = self._log_file("htooldeploy_1.log", 30)
+        new = self._log_file("htooldeploy_2.log", 1)
+        current = self._log_file("htooldeploy_3.log", 60)
+        other = self._log_file("notes.txt", 60)
+        removed = logs.prune(self.log_dir, keep_days=14, keep=[current])
+        self.assertEqual(removed, [old])
+        for path in [new, current, other]:
+            self.assertTrue(os.path.isfile(path))
+
+    def test_prune_size(self):
+        """The oldest log files are removed to stay under the size limit"""
+        paths = [
+            self._log_file("htooldeploy_{0}.log".format(x), x, size=100)
+            for x in range(5)
+        ]
+        removed = logs.prune(self.log_dir, max_bytes=250)
+        self.assertEqual(sorted(removed), paths[2:])
@@ -0,0 +1,78 @@
+"""Unit Tests"""
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy import metrics
+from htooldeploy.locking import LOCKS_DIR, DeployLock
+from htooldeploy.metrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _run(self, success=True, target="/opt/hou\"dini"):
+        run = RunMetrics("test_tool", target, "copy", "1.0")
+        run.success = success
+        run.duration_seconds = 2.5
+        run.bytes_copied = 1024
+        return run
+
+    def test_textfile(self):
+        """Gauges describe the last run, counters carry on"""
+        self._run().write_textfile(self.root)
+        path = self._run(success=False).write_textfile(self.root)
+        self.assertEqual(
+            sorted(os.listdir(self.root)),
+            [LOCKS_DIR, "htooldeploy_test_tool_opt_hou_dini.prom"]
+        )
+        with open(path, "r") as file_:
+            lines = file_.read().splitlines()
+        labels = '{mode="copy",target="/opt/hou\\"dini",tool="test_tool"}'
+        self.assertIn("htooldeploy_duration_seconds{0} 2.5".format(labels),
+                      lines)
+        self.assertIn("htooldeploy_success{0} 0.0".format(labels), lines)
+        labels = '{target="/opt/hou\\"dini",tool="test_tool"}'
+        self.assertIn("htooldeploy_runs_total{0} 2".format(labels), lines)
+        self.assertIn("htooldeploy_failures_total{0} 1".format(labels),
+                      lines)
+
+    def test_targets(self):
+        """Each target of a tool keeps its own series"""
+        first = self._run().write_textfile(self.root)
+        second = self._run(target="/opt/other").write_textfile(self.root)
+        self.assertNotEqual(first, second)
+        with open(first, "r") as file_:
+            self.assertIn("htooldeploy_runs_total", file_.read())
+
+    def test_json(self):
+        """Runs are appended as JSON lines"""
+        path = os.path.join(self.root, "logs", "metrics.jsonl")
+        self._run().append_json(path)
+        self._run(success=False).append_json(path)
+        with open(path, "r") as file_:
+            runs = [json.loads(x) for x in file_]
+        self.assertEqual([x["success"] for x in runs], [True, False])
+        self.assertEqual(runs[0]["bytes_copied"], 1024)
+        self.assertEqual(runs[0]["version"], "1.0")
+
+    def test_locked(self):
+        """Runs don't write the textfile while another run holds it"""
+        timeout = metrics.LOCK_TIMEOUT
+        metrics.LOCK_TIMEOUT = 0
+        try:
+            with DeployLock(self.root, "htooldeploy_test_tool_opt_hou_dini"):
+                self._run().export(textfile_dir=self.root)
+        finally:
+            metrics.LOCK_TIMEOUT = timeout
+        self.assertEqual(os.listdir(self.root), [LOCKS_DIR])
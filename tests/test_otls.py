@@ -0,0 +1,64 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy import otls
+
+
+class TestOtlsIndex(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.otls_dir = os.path.join(self.root, "otls")
+        os.makedirs(os.path.join(self.otls_dir, "expanded.hda"))
+        for name in ["b.hda", "a.otl", "notes.txt"]:
+            open(os.path.join(self.otls_dir, name), "w").close()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_counts(self):
+        """Files and expanded libraries are counted"""
+        self.assertEqual(otls.otls_dirs(self.root), [self.otls_dir])
+        self.assertEqual(otls.hda_counts([self.otls_dir])[self.otls_dir], 3)
+
+    def test_build_index(self):
+        """Index lists every library and is stable"""
+        index_file = otls.build_index(self.otls_dir)
+        with open(index_file, "r") as file_:
+            lines = file_.read().splitlines()
+        self.assertEqual(lines[1:], ["a.otl", "b.hda", "expanded.hda"])
+        self.assertFalse(
+            [x for x in os.listdir(self.otls_dir) if x.endswith(".tmp")]
+        )
+        mtime = os.path.getmtime(index_file)
+        otls.build_index(self.otls_dir)
+        self.assertEqual(os.path.getmtime(index_file), mtime)
+
+    def test_hand_written_index(self):
+        """An existing hand-written index is left alone"""
+        index_file = os.path.join(self.otls_dir, otls.INDEX_FILE)
+        with open(index_file, "w") as file_:
+            file_.write("a.otl\n")
+        self.assertIsNone(otls.build_index(self.otls_dir))
+
+    def test_refresh_index(self):
+        """Only generated indexes are refreshed, empty ones removed"""
+        index_file = os.path.join(self.otls_dir, otls.INDEX_FILE)
+        self.assertIsNone(otls.refresh_index(self.otls_dir))
+        self.assertFalse(os.path.isfile(index_file))
+        otls.build_index(self.otls_dir)
+        os.remove(os.path.join(self.otls_dir, "b.hda"))
+        otls.refresh_index(self.otls_dir)
+        with open(index_file, "r") as file_:
+            lines = file_.read().splitlines()
+        self.assertEqual(lines[1:], ["a.otl", "expanded.hda"])
+        os.remove(os.path.join(self.otls_dir, "a.otl"))
+        shutil.rmtree(os.path.join(self.otls_dir, "expanded.hda"))
+        self.assertIsNone(otls.refresh_index(self.otls_dir))
+        self.assertFalse(os.path.isfile(index_file))
@@ -0,0 +1,97 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from htooldeploy import preflight
+from htooldeploy.store import ObjectStore
+
+
+class TestPreflight(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "a.txt")
+        with open(self.source, "w") as file_:
+            file_.write("contents")
+        self.target = os.path.join(self.root, "target", "otls", "a.txt")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_space(self):
+        """Bytes to write are checked against free space"""
+        report = preflight.check([(self.source, self.target)])
+        self.assertTrue(report)
+        self.assertEqual(report.files, 1)
+        self.assertEqual(report.bytes, len("contents"))
+
+        free = preflight.free_space(self.root)
+        report = preflight.check(
+            [(self.source, self.target)], headroom=free
+        )
+        self.assertFalse(report)
+
+    def test_unchanged(self):
+        """Files that are already up to date are still counted"""
+        os.makedirs(os.path.dirname(self.target))
+        shutil.copy2(self.source, self.target)
+        report = preflight.check([(self.source, self.target)])
+        self.assertEqual(report.files, 1)
+
+    def test_store(self):
+        """The store's filesystem is checked in store mode"""
+        store = ObjectStore(os.path.join(self.root, "store"))
+        free = preflight.free_space(self.root)
+        report = preflight.check(
+            [(self.source, self.target)], headroom=free, store=store
+        )
+        self.assertFalse(report)
+        self.assertIn(self.root, report.problems[0])
+
+    def test_store_hits(self):
+        """Files the store already holds take no space"""
+        with open(self.source, "w") as file_:
+            file_.write("x" * 1024 * 1024)
+        store = ObjectStore(os.path.join(self.root, "store"))
+        headroom = preflight.free_space(self.root) - 512 * 1024
+        report = preflight.check(
+            [(self.source, self.target)], headroom=headroom, store=store
+        )
+        self.assertFalse(report)
+        store.add(self.source)
+        headroom = preflight.free_space(self.root) - 512 * 1024
+        report = preflight.check(
+            [(self.source, self.target)], headroom=headroom, store=store
+        )
+        self.assertTrue(report)
+
+    @unittest.skipIf(
+        not hasattr(os, "geteuid") or os.geteuid() == 0,
+        "Root can write anywhere"
+    )
+    def test_permissions(self):
+        """Read-only directories are reported"""
+        os.makedirs(os.path.dirname(self.target))
+        os.chmod(os.path.dirname(self.target), stat.S_IRUSR | stat.S_IXUSR)
+        try:
+            report = preflight.check([(self.source, self.target)])
+        finally:
+            os.chmod(os.path.dirname(self.target), stat.S_IRWXU)
+        self.assertFalse(report)
+
+    @unittest.skipIf(
+        not hasattr(os, "geteuid") or os.geteuid() == 0,
+        "Root can write anywhere"
+    )
+    def test_read_only_file(self):
+        """Read-only target files are reported"""
+        os.makedirs(os.path.dirname(self.target))
+        shutil.copy2(self.source, self.target)
+        os.chmod(self.target, stat.S_IRUSR)
+        self.assertFalse(preflight.check([(self.source, self.target)]))
@@ -0,0 +1,67 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from htooldeploy import copier
+from htooldeploy.profiling import IOTracer, Profiler
+
+
+class TestProfiling(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "source.bin")
+        with open(self.source, "wb") as file_:
+            file_.write(b"x" * 4096)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_trace(self):
+        """File system calls are counted by category"""
+        original = os.stat
+        with IOTracer() as tracer:
+            copier.copy_file(
+                self.source, os.path.join(self.root, "target.bin"),
+                backend="stream"
+            )
+            os.listdir(self.root)
+        self.assertIs(os.stat, original)
+        stats = tracer.report()
+        self.assertEqual(stats["list"][0], 1)
+        self.assertGreaterEqual(stats["open"][0], 2)
+        self.assertEqual(stats["write"][2], 4096)
+        self.assertIn("stat", stats)
+
+    def test_pipes(self):
+        """Subprocess pipes aren't traced as file reads"""
+        with IOTracer() as tracer:
+            output = subprocess.check_output(
+                [sys.executable, "-c", "print('x' * 4096)"]
+            )
+        self.assertEqual(len(output.strip()), 4096)
+        self.assertNotIn("read", tracer.stats)
+        self.assertNotIn("write", tracer.stats)
+
+        with IOTracer() as tracer:
+            descriptor = os.open(self.source, os.O_RDONLY)
+            try:
+                os.read(descriptor, 100)
+            finally:
+                os.close(descriptor)
+        self.assertEqual(tracer.stats["read"][2], 100)
+
+    def test_profile(self):
+        """Profile stats are written to a file"""
+        path = os.path.join(self.root, "run.prof")
+        with Profiler(path, trace_io=True) as profiler:
+            os.listdir(self.root)
+        self.assertTrue(os.path.isfile(path))
+        self.assertEqual(profiler.tracer.stats["list"][0], 1)
@@ -0,0 +1,86 @@
+"""Unit Tests"""
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.locking import DeployLock
+from htooldeploy.prune import StaleVersions, version_key
+from htooldeploy.slots import SlotManager
+
+
+class TestStaleVersions(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.packages = os.path.join(self.root, "packages")
+        os.makedirs(self.packages)
+        for name in ["test_tool-0.9.0.json", "test_tool-0.10.0.json",
+                     "test_tool-0.1.0.json", "test_tool.json",
+                     "other-1.0.0.json"]:
+            tool = name.split("-")[0].split(".")[0]
+            package = {"path": os.path.join("/dev", tool, "source")}
+            with open(os.path.join(self.packages, name), "w") as file_:
+                json.dump(package, file_)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_version_key(self):
+        """Versions sort by number"""
+        self.assertGreater(version_key("0.10.0"), version_key("0.9.0"))
+        self.assertGreater(version_key("2.0"), version_key("2.0b1"))
+
+    def test_packages(self):
+        """Only the newest packages are kept"""
+        stale = StaleVersions(self.root, dry_run=True).prune()
+        self.assertEqual(
+            [x.version for x in stale], ["0.1.0", "0.9.0"]
+        )
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "packages"))),
+                         5)
+        StaleVersions(self.root, tool="test_*").prune()
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.root, "packages"))),
+            ["other-1.0.0.json", "test_tool-0.10.0.json", "test_tool.json"]
+        )
+
+    def test_third_party(self):
+        """Packages htooldeploy didn't write are never pruned"""
+        for name in ["test_tool-0.0.1.json", "test_tool-0.0.2.json"]:
+            with open(os.path.join(self.packages, name), "w") as file_:
+                json.dump({"hpath": "/opt/vendor", "enable": True}, file_)
+        stale = StaleVersions(self.root, tool="test_tool").find()
+        self.assertEqual(
+            [x.version for x in stale], ["0.1.0", "0.9.0"]
+        )
+
+    def test_locked(self):
+        """Tools being deployed are skipped"""
+        with DeployLock(self.root, "test_tool"):
+            StaleVersions(
+                self.root, tool="test_tool", lock_timeout=0
+            ).prune()
+        self.assertEqual(len(os.listdir(self.packages)), 5)
+
+    def test_slots(self):
+        """Active and previous slots are kept"""
+        manager = SlotManager(self.root, "test_tool")
+        for version in ["0.1.0", "0.2.0", "0.3.0"]:
+            os.makedirs(manager.slot_path(version))
+            manager.set_complete(version)
+        manager.activate("0.1.0")
+        manager.activate("0.2.0")
+        stale = StaleVersions(self.root, tool="test_tool").prune()
+        self.assertEqual([x for x in stale if x.kind == "slot"], [])
+        manager.activate("0.3.0")
+        stale = StaleVersions(self.root, tool="test_tool").prune()
+        self.assertEqual(
+            [x.version for x in stale if x.kind == "slot"], ["0.1.0"]
+        )
+        self.assertEqual(manager.versions(), ["0.2.0", "0.3.0"])
+        self.assertFalse(os.path.exists(manager.marker_path("0.1.0")))
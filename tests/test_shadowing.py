@@ -0,0 +1,77 @@
+"""Unit Tests"""
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.shadowing import ShadowIndex
+
+
+class TestShadowIndex(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.prefs = tempfile.mkdtemp()
+        self.tools = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        os.makedirs(os.path.join(self.prefs, "packages"))
+        for index, tool in enumerate(self.tools):
+            os.makedirs(os.path.join(tool, "otls"))
+            os.makedirs(os.path.join(tool, "python2.7libs"))
+            with open(os.path.join(tool, "otls", "shared.hda"), "w") as file_:
+                file_.write(str(index))
+            with open(os.path.join(tool, "python2.7libs", "util.py"),
+                      "w") as file_:
+                file_.write("VALUE = 1\n")
+            open(os.path.join(tool, "python2.7libs", "util.pyc"), "w").close()
+            package_file = os.path.join(
+                self.prefs, "packages", "tool{0}.json".format(index)
+            )
+            with open(package_file, "w") as file_:
+                json.dump({"path": tool}, file_)
+
+    def tearDown(self):
+        shutil.rmtree(self.prefs)
+        for tool in self.tools:
+            shutil.rmtree(tool)
+
+    def test_index(self):
+        """Files are indexed by relative path in search path order"""
+        index = ShadowIndex(self.prefs)
+        index.build()
+        self.assertEqual(len(index.roots), 3)
+        self.assertEqual(
+            sorted(index.index), ["otls/shared.hda", "python2.7libs/util.py"]
+        )
+        self.assertEqual(
+            [x for x, _ in index.index["otls/shared.hda"]], self.tools
+        )
+
+    def test_shadowed(self):
+        """The first copy wins, identical copies are duplicates"""
+        index = ShadowIndex(self.prefs)
+        self.assertTrue(index.report())
+        shadowed = dict((x.relpath, x) for x in index.shadowed())
+        self.assertEqual(
+            shadowed["otls/shared.hda"].winner,
+            os.path.join(self.tools[0], "otls", "shared.hda")
+        )
+        self.assertFalse(shadowed["otls/shared.hda"].identical())
+        self.assertTrue(shadowed["python2.7libs/util.py"].identical())
+
+    def test_broken_link(self):
+        """Broken links and non-path package values don't stop a report"""
+        for tool in self.tools:
+            os.symlink(
+                os.path.join(tool, "missing.hda"),
+                os.path.join(tool, "otls", "broken.hda")
+            )
+        package_file = os.path.join(self.prefs, "packages", "splash.json")
+        with open(package_file, "w") as file_:
+            json.dump({"env": [{"HOUDINI_NO_START_PAGE_SPLASH": 1}]}, file_)
+        index = ShadowIndex(self.prefs)
+        self.assertTrue(index.report())
+        shadowed = dict((x.relpath, x) for x in index.shadowed())
+        self.assertFalse(shadowed["otls/broken.hda"].identical())
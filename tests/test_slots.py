@@ -0,0 +1,59 @@
+"""Unit Tests"""
+
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy.slots import SlotManager
+
+
+class TestSlotManager(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.manager = SlotManager(self.root, "test_tool")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _install(self, version, complete=True):
+        os.makedirs(self.manager.slot_path(version))
+        self.manager.set_complete(version, complete)
+
+    def test_versions(self):
+        """Versions sort by number, and rollback picks the right one"""
+        for version in ["0.10.0", "0.9.0", "0.2.0"]:
+            self._install(version)
+        self.assertEqual(
+            self.manager.versions(), ["0.2.0", "0.9.0", "0.10.0"]
+        )
+        self.assertTrue(self.manager.activate("0.9.0"))
+        self.assertTrue(self.manager.activate("0.10.0"))
+        self.assertTrue(self.manager.rollback())
+        self.assertEqual(self.manager.active(), "0.9.0")
+
+    def test_incomplete(self):
+        """Slots left by an interrupted install are never activated"""
+        self._install("0.1.0", complete=False)
+        self.assertEqual(self.manager.versions(), [])
+        self.assertFalse(self.manager.activate("0.1.0"))
+        self.manager.set_complete("0.1.0")
+        self.assertTrue(self.manager.activate("0.1.0"))
+
+    def test_package(self):
+        """The package points at the current link"""
+        self._install("0.1.0")
+        self.manager.activate("0.1.0")
+        with open(self.manager.package_file(), "r") as file_:
+            package = json.load(file_)
+        self.assertEqual(
+            package["path"], os.path.join(self.manager.root(), "current")
+        )
+        self.assertEqual(
+            os.listdir(os.path.dirname(self.manager.package_file())),
+            ["test_tool.json"]
+        )
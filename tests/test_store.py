@@ -0,0 +1,59 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from htooldeploy.store import ObjectStore
+
+
+class TestObjectStore(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ObjectStore(os.path.join(self.root, "store"))
+        self.files = list()
+        for name in ["a.txt", "b.txt"]:
+            path = os.path.join(self.root, name)
+            with open(path, "w") as file_:
+                file_.write("same contents")
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_deduplicate(self):
+        """Identical files are stored once"""
+        keys = [self.store.add(x) for x in self.files]
+        self.assertEqual(keys[0], keys[1])
+        objects = list()
+        for _, _, files in os.walk(self.store.root):
+            objects.extend(files)
+        self.assertEqual(len(objects), 1)
+
+    def test_materialize(self):
+        """Targets are linked to the stored object"""
+        key = self.store.add(self.files[0])
+        target = os.path.join(self.root, "target.txt")
+        self.assertTrue(self.store.materialize(key, target))
+        self.assertFalse(self.store.materialize(key, target))
+        self.assertEqual(
+            os.stat(target).st_ino,
+            os.stat(self.store.object_path(key)).st_ino
+        )
+
+    def test_modes(self):
+        """Files that differ only in permissions are stored apart"""
+        os.chmod(self.files[0], 0o755)
+        os.chmod(self.files[1], 0o644)
+        keys = [self.store.add(x) for x in self.files]
+        self.assertNotEqual(keys[0], keys[1])
+        for path, key in zip(self.files, keys):
+            self.assertEqual(
+                stat.S_IMODE(os.stat(self.store.object_path(key)).st_mode),
+                stat.S_IMODE(os.stat(path).st_mode) & ~0o222
+            )
@@ -2,6 +2,7 @@
 # pylint: disable=protected-access,superfluous-parens
 
 
+import json
 import os
 import shutil
 import sys
@@ -9,7 +10,9 @@ import tempfile
 import unittest
 
 
-from htooldeploy.template import TemplateTool
+from htooldeploy.template import (
+    TemplateTool, load_spec, template_from_spec
+)
 
 if "darwin" not in sys.platform:
     TEMP_DIR = tempfile.gettempdir()
@@ -101,3 +104,66 @@ class TestTemplateTool(unittest.TestCase):
         self.assertEqual(template._tool_title(), "Colorado Avalanche")
         # name_2 = "OldMan2"
         # self.assertEqual(template._tool_title(), "Old Man 2")
+
+    def test_spec(self):
+        """Create many tools from a spec, skipping existing ones"""
+        parent = tempfile.mkdtemp()
+        spec_path = os.path.join(parent, "tools.json")
+        spec = {
+            "defaults": {"author": "Obi-Wan", "git": False, "version": "2"},
+            "tools": ["rebels", {"name": "empire", "shelf": False}, "rebels"]
+        }
+        with open(spec_path, "w") as file_:
+            json.dump(spec, file_)
+        try:
+            os.makedirs(os.path.join(parent, "existing"))
+            tools = template_from_spec(spec_path, parent)
+            self.assertEqual([x.name for x in tools], ["rebels", "empire"])
+            self.assertTrue(
+                os.path.isfile(os.path.join(parent, "rebels", "source",
+                                            "toolbar", "rebels.shelf"))
+            )
+            self.assertFalse(
+                os.path.isdir(os.path.join(parent, "empire", "source",
+                                           "toolbar"))
+            )
+            with open(os.path.join(parent, "empire", "_version")) as file_:
+                self.assertEqual(file_.read(), "__version__ = \"2\"")
+            self.assertEqual(template_from_spec(spec_path, parent), [])
+        finally:
+            shutil.rmtree(parent)
+
+    def test_spec_failure(self):
+        """A tool that can't be created doesn't stop the rest"""
+        parent = tempfile.mkdtemp()
+        spec_path = os.path.join(parent, "tools.json")
+        with open(spec_path, "w") as file_:
+            json.dump({"tools": ["rebels", "empire", "jedi"],
+                       "defaults": {"git": False}}, file_)
+        create_readme = TemplateTool._create_readme
+
+        def _create_readme(self):
+            if self.name == "empire":
+                raise OSError("No space left on device")
+            create_readme(self)
+
+        TemplateTool._create_readme = _create_readme
+        try:
+            tools = template_from_spec(spec_path, parent)
+            self.assertEqual([x.name for x in tools], ["rebels", "jedi"])
+        finally:
+            TemplateTool._create_readme = create_readme
+            shutil.rmtree(parent)
+
+    def test_spec_invalid(self):
+        """Unknown options and versions that aren't strings are rejected"""
+        parent = tempfile.mkdtemp()
+        spec_path = os.path.join(parent, "tools.json")
+        try:
+            for entry in [{"name": "rebels", "colour": "red"},
+                          {"name": "rebels", "version": 1.10}]:
+                with open(spec_path, "w") as file_:
+                    json.dump([entry], file_)
+                self.assertRaises(ValueError, load_spec, spec_path)
+        finally:
+            shutil.rmtree(parent)
@@ -0,0 +1,45 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from htooldeploy import copier
+from htooldeploy import throttle
+
+
+class TestThrottle(unittest.TestCase):
+    """Unit tests"""
+
+    def test_token_bucket(self):
+        """Going over the rate waits for the debt to be repaid"""
+        bucket = throttle.TokenBucket(1000)
+        self.assertEqual(bucket.consume(1000), 0.0)
+        self.assertAlmostEqual(bucket.consume(100), 0.1, places=1)
+
+    def test_parse_rate(self):
+        """Rates take K, M and G suffixes"""
+        self.assertEqual(throttle.parse_rate("512"), 512)
+        self.assertEqual(throttle.parse_rate("20M"), 20 * 1024 * 1024)
+        self.assertEqual(throttle.parse_rate("1.5kb/s"), 1536)
+        self.assertRaises(ValueError, throttle.parse_rate, "fast")
+
+    def test_copy(self):
+        """Copies are held to the active throttle"""
+        root = tempfile.mkdtemp()
+        try:
+            source = os.path.join(root, "a.bgeo")
+            with open(source, "wb") as file_:
+                file_.write(b"\0" * 300000)
+            start = time.time()
+            with throttle.Throttle(max_rate=100000) as active:
+                copier.copy_file(
+                    source, os.path.join(root, "b.bgeo"), buffer_size=65536
+                )
+            self.assertGreater(time.time() - start, 1.5)
+            self.assertGreater(active.waited, 1.5)
+        finally:
+            shutil.rmtree(root)
@@ -0,0 +1,82 @@
+"""Unit Tests"""
+
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from htooldeploy import transfer
+
+
+class TestTransfer(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.source = os.path.join(self.root, "source")
+        self.target = os.path.join(self.root, "target")
+        os.makedirs(os.path.join(self.source, "geo"))
+        os.makedirs(self.target)
+        self.files = list()
+        for name in ["a.bgeo", "b.bgeo"]:
+            path = os.path.join(self.source, "geo", name)
+            with open(path, "wb") as file_:
+                file_.write(b"0" * 100000)
+            self.files.append((path, os.path.join("geo", name)))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_round_trip(self):
+        """Files are compressed and unpacked into the target"""
+        stream = io.BytesIO()
+        bytes_in, bytes_out = transfer.send(
+            self.files, stream, level=9, chunk_size=4096
+        )
+        self.assertLess(bytes_out, bytes_in)
+        stream.seek(0)
+        received = transfer.receive(stream, self.target, chunk_size=512)
+        self.assertEqual(sorted(received), sorted(x[1] for x in self.files))
+        with open(os.path.join(self.target, "geo", "a.bgeo"), "rb") as file_:
+            self.assertEqual(file_.read(), b"0" * 100000)
+
+    def test_unsafe_paths(self):
+        """Paths leaving the target are skipped"""
+        stream = io.BytesIO()
+        transfer.send([(self.files[0][0], "../escaped")], stream)
+        stream.seek(0)
+        self.assertEqual(transfer.receive(stream, self.target), [])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "escaped")))
+
+    def test_symlink_escape(self):
+        """Paths leaving the target through a symbolic link are skipped"""
+        outside = os.path.join(self.root, "outside")
+        os.makedirs(outside)
+        os.symlink(outside, os.path.join(self.target, "geo"))
+        stream = io.BytesIO()
+        transfer.send(self.files, stream)
+        stream.seek(0)
+        self.assertEqual(transfer.receive(stream, self.target), [])
+        self.assertEqual(os.listdir(outside), [])
+
+    def test_missing_dirs(self):
+        """Missing top level directories are only created with force"""
+        stream = io.BytesIO()
+        transfer.send(
+            [(os.path.join(self.source, "geo"), "geo")] + self.files, stream
+        )
+        stream.seek(0)
+        with self.assertRaises(IOError):
+            transfer.receive(stream, self.target, force=False)
+        self.assertFalse(os.path.exists(os.path.join(self.target, "geo")))
+        stream.seek(0)
+        self.assertEqual(len(transfer.receive(stream, self.target)), 2)
+
+        stream = io.BytesIO()
+        transfer.send([(self.files[0][0], "vex/a.vfl")], stream)
+        stream.seek(0)
+        with self.assertRaises(IOError):
+            transfer.receive(stream, self.target, force=False)
+        self.assertFalse(os.path.exists(os.path.join(self.target, "vex")))
@@ -0,0 +1,84 @@
+"""Unit Tests"""
+
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from htooldeploy import transport
+from htooldeploy.hashing import CACHE_VARIABLE
+
+
+class TestTransport(unittest.TestCase):
+    """Unit tests"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        source = os.path.join(self.root, "source")
+        os.makedirs(os.path.join(source, "otls"))
+        files = list()
+        for name in ["a.hda", "b.hda"]:
+            path = os.path.join(source, "otls", name)
+            with open(path, "w") as file_:
+                file_.write(name)
+            files.append((path, os.path.join("otls", name)))
+        self.snapshot = transport.Snapshot(files)
+        self.hosts = [os.path.join(self.root, x) for x in ["one", "two"]]
+        # Keep receivers out of the real hash cache
+        self.cache_variable = os.environ.get(CACHE_VARIABLE)
+        os.environ[CACHE_VARIABLE] = os.path.join(self.root, "hashes.db")
+
+    def tearDown(self):
+        if self.cache_variable is None:
+            del os.environ[CACHE_VARIABLE]
+        else:
+            os.environ[CACHE_VARIABLE] = self.cache_variable
+        shutil.rmtree(self.root)
+
+    def test_push_changed_only(self):
+        """Only changed files are sent to each host"""
+        transports = [transport.LocalTransport(x) for x in self.hosts]
+        results = transport.push(self.snapshot, transports, jobs=2)
+        self.assertEqual([x.files for x in results], [2, 2])
+
+        with open(os.path.join(self.hosts[1], "otls", "a.hda"), "w") as file_:
+            file_.write("stale")
+        results = transport.push(self.snapshot, transports, jobs=2)
+        self.assertEqual([x.files for x in results], [0, 1])
+
+    def test_shell_transport(self):
+        """The receiver runs locally with an empty shell"""
+        transports = [
+            transport.ShellTransport(
+                "local", x, shell="", python=sys.executable
+            )
+            for x in self.hosts
+        ]
+        results = transport.push(self.snapshot, transports)
+        self.assertFalse([x for x in results if x.error])
+        for host in self.hosts:
+            self.assertTrue(
+                os.path.isfile(os.path.join(host, "otls", "b.hda"))
+            )
+        results = transport.push(self.snapshot, transports)
+        self.assertFalse([x for x in results if x.error])
+        self.assertEqual([x.files for x in results], [0, 0])
+
+    def test_no_force(self):
+        """Missing targets and site directories need force"""
+        transports = [
+            transport.ShellTransport(
+                "local", self.hosts[0], shell="", python=sys.executable,
+                force=False
+            ),
+            transport.LocalTransport(self.hosts[1], force=False),
+        ]
+        results = transport.push(self.snapshot, transports)
+        self.assertEqual(len([x for x in results if x.error]), 2)
+        for host in self.hosts:
+            self.assertFalse(os.path.exists(host))
+            os.makedirs(os.path.join(host, "otls"))
+        results = transport.push(self.snapshot, transports)
+        self.assertFalse([x for x in results if x.error])